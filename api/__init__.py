@@ -0,0 +1,3 @@
+from api.app import create_app, default_retriever
+from api.metrics import LatencyRecorder, timed
+from api.stub import stub_langflow_app
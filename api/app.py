@@ -0,0 +1,350 @@
+import math
+import os
+from contextlib import asynccontextmanager
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from api.metrics import LatencyRecorder, timed
+from data.data_loader import (
+    INGREDIENTS_SOURCE,
+    RECIPES_SOURCE,
+    load_store,
+    read_ingredients_source,
+    read_micro_nutrient_reference,
+    read_recipes_source,
+)
+from retrieval import (
+    FANOUT_DEADLINE,
+    LANGFLOW_URL,
+    AsyncLangflowClient,
+    CircuitOpenError,
+    QueryCache,
+    RetrievalError,
+    RetrievalTimeout,
+    fan_out,
+    query_cache_key,
+    search_local,
+    search_prompt,
+)
+from scoring import (
+    ENVIRONMENT_METRICS,
+    HEALTH_METRICS,
+    RANK_KEYS,
+    SCORING_COLUMNS,
+    Catalogue,
+    MicronutrientTable,
+    Profile,
+    browse,
+    plan_meals,
+    profile_targets,
+    top_k,
+)
+
+# HTTP recommendation service next to the Streamlit UI:
+#
+#   python -m api.app                 (or: uvicorn api.app:app --port 8000)
+#
+# Configured through environment variables:
+#   RETRIEVAL_BACKEND  "langflow" (default), "local" or "fanout", like retrieval_backend in secrets.toml
+#   LANGFLOW_URL       flow endpoint, e.g. a local `uvicorn api.stub:app` instead of Langflow
+#   DATASTAX_BEARER    authentication key of the flow
+
+NUMBER_OF_RESULTS = 20
+MAX_RESULTS = 100
+MAX_PLAN_BUDGET = 2.0  # seconds a meal plan request may search
+
+
+# ----------------------------------------------------------------------------------------------------
+# Retrieval
+# ----------------------------------------------------------------------------------------------------
+def default_retriever(backend=None, url=None, token=None, transport=None):
+    """
+    Async function (prompt, number_of_results) -> recipe IDs for the configured backend,
+    and the AsyncLangflowClient it uses (None for the local index).
+    """
+    backend = backend or os.environ.get("RETRIEVAL_BACKEND", "langflow")
+    if backend == "local":
+        return search_local, None
+
+    client = AsyncLangflowClient(
+        url or os.environ.get("LANGFLOW_URL", LANGFLOW_URL),
+        token if token is not None else os.environ.get("DATASTAX_BEARER", ""),
+        transport=transport,
+    )
+    if backend == "langflow":
+        return client.run, client
+    if backend == "fanout":
+        async def retrieve(prompt, number_of_results):
+            backends = {
+                "langflow": lambda p: client.run(p, number_of_results=number_of_results),
+                "local": lambda p: search_local(p, number_of_results=number_of_results),
+            }
+            return (await fan_out(prompt, backends, FANOUT_DEADLINE, number_of_results)).recipe_ids
+        return retrieve, client
+    raise ValueError(f"Unknown retrieval backend '{backend}', expected langflow, local or fanout")
+
+
+# ----------------------------------------------------------------------------------------------------
+# Helpers
+# ----------------------------------------------------------------------------------------------------
+def json_safe(value):
+    # numpy scalars and NaN are not valid JSON
+    if isinstance(value, dict):
+        return {str(k): json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [json_safe(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def error(status_code, message):
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+async def read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def recipe_rows(state, rows, scores, rank_by):
+    recipes = state.recipe_store.frame(rows, columns=["Title", "Rating"])
+    order = np.argsort(-getattr(scores, rank_by), kind="stable")
+    return [
+        {
+            "recipe_id": int(scores.recipe_ids[i]),
+            "title": recipes["Title"].iat[i],
+            "rating": json_safe(float(recipes["Rating"].iat[i])),
+            "health_score": float(scores.health_score[i]),
+            "environment_score": float(scores.environment_score[i]),
+            "final_score": float(scores.final_score[i]),
+        }
+        for i in order
+    ]
+
+
+# ----------------------------------------------------------------------------------------------------
+# Endpoints
+# ----------------------------------------------------------------------------------------------------
+@timed("/health")
+async def health(request):
+    return JSONResponse({"status": "ok", "recipes": len(request.app.state.catalogue)})
+
+
+@timed("/metrics")
+async def metrics(request):
+    return JSONResponse(request.app.state.metrics.snapshot())
+
+
+@timed("/targets")
+async def targets(request):
+    """
+    Personal data (the "General" section of a profile) -> the "Macros" and "Micros" sections.
+    """
+    body = await read_json(request)
+    if body is None:
+        return error(400, "Expected a JSON object")
+    general = body.get("General", body)
+    try:
+        result = profile_targets(
+            age=int(general["Age"]),
+            gender=str(general["Gender"]),
+            weight=float(general["Weight"]),
+            height=float(general["Height"]),
+            activity_level=general["Activity_level"],
+            table=request.app.state.micronutrient_table,
+        )
+    except KeyError as e:
+        return error(422, f"Missing field {e}")
+    except (TypeError, ValueError) as e:
+        return error(422, str(e))
+    return JSONResponse(json_safe(result))
+
+
+@timed("/recommendations")
+async def recommendations(request):
+    """
+    {"query": ..., "profile": {...}, "k": 20, "rank_by": "final_score"} -> ranked recipes.
+    Without a query the whole catalogue is ranked, like the browse mode of the Find Recipe page.
+    """
+    state = request.app.state
+    body = await read_json(request)
+    if body is None:
+        return error(400, "Expected a JSON object")
+    try:
+        profile_dict = body["profile"]
+        profile = Profile.from_dict(profile_dict)
+        k = min(int(body.get("k", NUMBER_OF_RESULTS)), MAX_RESULTS)
+        if k < 1:
+            raise ValueError("k must be at least 1")
+    except KeyError as e:
+        return error(422, f"Missing field {e}")
+    except (TypeError, ValueError) as e:
+        return error(422, str(e))
+    rank_by = body.get("rank_by", "final_score")
+    if rank_by not in RANK_KEYS:
+        return error(422, f"rank_by must be one of {list(RANK_KEYS)}")
+
+    query = str(body.get("query") or "").strip()
+    if not query:
+        rows, scores = browse(state.catalogue, profile, k=k, by=rank_by)
+        return JSONResponse({"recipes": recipe_rows(state, rows, scores, rank_by)})
+
+    prompt = search_prompt(query, profile_dict.get("General", {}).get("Allergies_Intolerances", ""))
+    key = query_cache_key(prompt, state.backend, NUMBER_OF_RESULTS)
+    recipe_ids = state.cache.get(key)
+    if recipe_ids is None:
+        try:
+            recipe_ids = await state.retriever(prompt, NUMBER_OF_RESULTS)
+        except RetrievalTimeout as e:
+            return error(504, str(e))
+        except CircuitOpenError as e:
+            return error(503, str(e))
+        except RetrievalError as e:
+            return error(502, str(e))
+        state.cache.set(key, recipe_ids)
+
+    ids = [int(rid) for rid in recipe_ids if str(rid).strip().isdigit()]
+    rows = state.catalogue.rows(list(dict.fromkeys(ids)))
+    scores = state.catalogue.score(profile, rows)
+    best = top_k(getattr(scores, rank_by), k)
+    return JSONResponse({"recipes": recipe_rows(state, rows[best], scores.take(best), rank_by)})
+
+
+@timed("/meal-plan")
+async def meal_plan(request):
+    """
+    {"profile": {...}, "meals": 3, "time_budget": 0.5} -> one recipe per meal whose summed values
+    best fit the daily targets, with the score of the whole day.
+    """
+    state = request.app.state
+    body = await read_json(request)
+    if body is None:
+        return error(400, "Expected a JSON object")
+    try:
+        profile = Profile.from_dict(body["profile"])
+        meals = int(body.get("meals") or profile.meals)
+        time_budget = min(float(body.get("time_budget", MAX_PLAN_BUDGET / 4)), MAX_PLAN_BUDGET)
+        if meals < 1:
+            raise ValueError("meals must be at least 1")
+        # CPU-bound, so it runs off the event loop
+        plan = await run_in_threadpool(plan_meals, state.catalogue, profile, meals, time_budget=time_budget)
+    except KeyError as e:
+        return error(422, f"Missing field {e}")
+    except (TypeError, ValueError) as e:
+        return error(422, str(e))
+
+    titles = state.recipe_store.frame(plan.rows, columns=["Title"])["Title"].tolist()
+    return JSONResponse(json_safe({
+        "recipes": [{"recipe_id": int(i), "title": title} for i, title in zip(plan.recipe_ids, titles)],
+        "health_score": plan.scores.health_score[0],
+        "environment_score": plan.scores.environment_score[0],
+        "final_score": plan.scores.final_score[0],
+        "totals": dict(zip(HEALTH_METRICS + ENVIRONMENT_METRICS, plan.totals)),
+        "complete": plan.complete,
+    }))
+
+
+@timed("/recipes/{recipe_id}")
+async def recipe(request):
+    """
+    Full nutrition and environment breakdown of one recipe. POSTing {"profile": {...}} adds the scores
+    and the contribution of every metric for that profile.
+    """
+    state = request.app.state
+    recipe_id = request.path_params["recipe_id"]
+    row = state.catalogue.row(recipe_id)
+    if row is None:
+        return error(404, f"Unknown recipe {recipe_id}")
+
+    record = state.recipe_store.record(row)
+    values = dict(zip(HEALTH_METRICS + ENVIRONMENT_METRICS, (record[column] for column in SCORING_COLUMNS)))
+    ingredients = state.ingredient_store.frame(state.ingredient_store.key_index("recipe_id").rows(recipe_id))
+    result = {
+        "recipe": {name: value for name, value in record.items() if name not in SCORING_COLUMNS},
+        "nutrition": {name: values[name] for name in HEALTH_METRICS},
+        "environment": {name: values[name] for name in ENVIRONMENT_METRICS},
+        "ingredients": ingredients.to_dict("records"),
+    }
+
+    if request.method == "POST":
+        body = await read_json(request)
+        try:
+            profile = Profile.from_dict((body or {})["profile"])
+        except KeyError as e:
+            return error(422, f"Missing field {e}")
+        except (TypeError, ValueError) as e:
+            return error(422, str(e))
+        scores = state.catalogue.score(profile, np.array([row]))
+        result["scores"] = {
+            "health_score": scores.health_score[0],
+            "environment_score": scores.environment_score[0],
+            "final_score": scores.final_score[0],
+            "health_contributions": dict(zip(HEALTH_METRICS, scores.health_contributions[0])),
+            "environmental_contributions": dict(zip(ENVIRONMENT_METRICS, scores.environmental_contributions[0])),
+        }
+    return JSONResponse(json_safe(result))
+
+
+# ----------------------------------------------------------------------------------------------------
+# Application
+# ----------------------------------------------------------------------------------------------------
+def create_app(retriever=None, backend=None, transport=None):
+    """
+    `retriever` replaces the configured backend with any async (prompt, number_of_results) -> IDs;
+    `transport` routes the Langflow client elsewhere, e.g. httpx.ASGITransport(api.stub.app).
+    """
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Loaded once and shared by every request; the stores are memory-mapped
+        state = app.state
+        state.recipe_store = load_store(RECIPES_SOURCE, read_recipes_source)
+        state.ingredient_store = load_store(INGREDIENTS_SOURCE, read_ingredients_source)
+        state.ingredient_store.key_index("recipe_id")
+        state.catalogue = Catalogue.from_store(state.recipe_store)
+        state.micronutrient_table = MicronutrientTable.from_frame(read_micro_nutrient_reference())
+        state.metrics = LatencyRecorder()
+        state.cache = QueryCache()
+
+        client = None
+        if retriever is not None:
+            state.retriever, state.backend = retriever, backend or "custom"
+        else:
+            state.backend = backend or os.environ.get("RETRIEVAL_BACKEND", "langflow")
+            state.retriever, client = default_retriever(state.backend, transport=transport)
+        try:
+            yield
+        finally:
+            if client is not None:
+                await client.aclose()
+
+    return Starlette(
+        routes=[
+            Route("/health", health),
+            Route("/metrics", metrics),
+            Route("/targets", targets, methods=["POST"]),
+            Route("/recommendations", recommendations, methods=["POST"]),
+            Route("/meal-plan", meal_plan, methods=["POST"]),
+            Route("/recipes/{recipe_id:int}", recipe, methods=["GET", "POST"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.environ.get("HOST", "127.0.0.1"), port=int(os.environ.get("PORT", "8000")))
@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+import numpy as np
+
+LATENCY_WINDOW = 10000  # most recent requests per route the percentiles are computed over
+
+
+class LatencyRecorder:
+    """
+    Request count, error count and latency percentiles per route, over a sliding window.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.counts = {}
+        self.errors = {}
+
+    def record(self, route, seconds, error=False):
+        with self.lock:
+            self.samples.setdefault(route, deque(maxlen=self.window)).append(seconds)
+            self.counts[route] = self.counts.get(route, 0) + 1
+            self.errors[route] = self.errors.get(route, 0) + int(error)
+
+    def snapshot(self):
+        with self.lock:
+            samples = {route: np.fromiter(values, dtype=np.float64) for route, values in self.samples.items()}
+            counts, errors = dict(self.counts), dict(self.errors)
+        report = {}
+        for route, values in samples.items():
+            p50, p99 = np.percentile(values, [50, 99]) * 1000
+            report[route] = {
+                "count": counts[route],
+                "errors": errors[route],
+                "p50_ms": round(float(p50), 3),
+                "p99_ms": round(float(p99), 3),
+            }
+        return report
+
+
+def timed(route):
+    """
+    Record the latency of an endpoint under `route`; responses with status >= 500 count as errors.
+    """
+    def decorator(endpoint):
+        @wraps(endpoint)
+        async def wrapper(request):
+            start = time.perf_counter()
+            error = True
+            try:
+                response = await endpoint(request)
+                error = response.status_code >= 500
+                return response
+            finally:
+                request.app.state.metrics.record(route, time.perf_counter() - start, error)
+        return wrapper
+    return decorator
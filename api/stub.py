@@ -0,0 +1,33 @@
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from retrieval import get_recipe_local
+
+# Stand-in for the Langflow endpoint that answers in the flow's response format from the local index,
+# for tests and offline development:
+#
+#   uvicorn api.stub:app --port 7860
+#   LANGFLOW_URL=http://127.0.0.1:7860/run python -m api.app
+
+
+def flow_response(text):
+    return {"outputs": [{"outputs": [{"results": {"text": {"data": {"text": text}}}}]}]}
+
+
+def stub_langflow_app(search=get_recipe_local):
+    """
+    `search(prompt, number_of_results)` produces the recipe IDs, the local BM25 index by default.
+    """
+
+    async def run(request):
+        payload = await request.json()
+        tweaks = payload.get("tweaks", {})
+        number_of_results = next((t["number_of_results"] for t in tweaks.values() if "number_of_results" in t), 20)
+        recipe_ids = search(payload["input_value"], number_of_results)
+        return JSONResponse(flow_response(", ".join(recipe_ids)))
+
+    return Starlette(routes=[Route("/{path:path}", run, methods=["POST"])])
+
+
+app = stub_langflow_app()
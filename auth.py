@@ -16,7 +16,13 @@ def check_auth():
             if submitted:
                 if user == USERNAME and pwd == PASSWORD:
                     st.session_state["authenticated"] = True
+                    st.session_state["username"] = user
                     st.rerun()
                 else:
                     st.error("Invalid username or password")
         st.stop()
+
+
+def is_admin():
+    # Admin accounts are listed in secrets.toml, e.g. [auth] admins = ["alice"]
+    return st.session_state.get("username") in st.secrets["auth"].get("admins", [])
@@ -0,0 +1,2 @@
+from benchmarks.harness import Skip, compare, measure, run_benchmarks
+from benchmarks.synthetic import async_stub_retriever, stub_retriever, synthetic_profile, synthetic_profiles
@@ -0,0 +1,111 @@
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+REPEAT = 20
+TOLERANCE = 0.25  # a benchmark regresses when its median is more than 25% slower than the baseline
+
+
+class Skip(Exception):
+    """Raised by a benchmark setup when its inputs are not available in this checkout."""
+
+
+def measure(func, repeat=REPEAT, number=1):
+    """
+    Time `number` calls of func, `repeat` times, with the garbage collector paused like timeit does.
+    Returns milliseconds per call.
+    """
+    func()  # warm-up, not recorded
+    samples = np.empty(repeat)
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for i in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples[i] = (time.perf_counter() - start) / number
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    samples *= 1000
+    return {
+        "median_ms": round(float(np.median(samples)), 4),
+        "min_ms": round(float(samples.min()), 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def run_benchmarks(benchmarks, only=None, log=sys.stderr):
+    """
+    `benchmarks` maps a name to (setup, repeat, number); setup() returns the function to time or
+    raises Skip. Returns name -> measurement, or {"skipped": reason}.
+    """
+    results = {}
+    for name, (setup, repeat, number) in benchmarks.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        try:
+            results[name] = measure(setup(), repeat, number)
+            print(f"{name:<40} {results[name]['median_ms']:>12.3f} ms", file=log)
+        except Skip as e:
+            results[name] = {"skipped": str(e)}
+            print(f"{name:<40} {'skipped':>15}  ({e})", file=log)
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+# ----------------------------------------------------------------------------------------------------
+# Baselines
+# ----------------------------------------------------------------------------------------------------
+def write_results(path, results):
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump({"environment": environment(), "results": results}, handle, indent=2)
+
+
+def read_results(path):
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)["results"]
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Rows (name, baseline_ms, current_ms, ratio, status) for every benchmark measured in both runs;
+    status is "regression", "improvement" or "ok".
+    """
+    rows = []
+    for name, current in results.items():
+        before = baseline.get(name, {})
+        if "median_ms" not in current or "median_ms" not in before:
+            continue
+        ratio = current["median_ms"] / before["median_ms"] if before["median_ms"] > 0 else float("inf")
+        if ratio > 1 + tolerance:
+            status = "regression"
+        elif ratio < 1 / (1 + tolerance):
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append((name, before["median_ms"], current["median_ms"], ratio, status))
+    return rows
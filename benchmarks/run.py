@@ -0,0 +1,438 @@
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmarks.harness import REPEAT, TOLERANCE, Skip, compare, read_results, run_benchmarks, write_results
+from benchmarks.synthetic import QUERIES, async_stub_retriever, stub_retriever, synthetic_factor_table, synthetic_profiles
+from data import data_loader
+from data.data_loader import (
+    INGREDIENTS_SOURCE,
+    RECIPES_SOURCE,
+    cache_path,
+    load_ingredients_data,
+    load_recipes_data,
+    read_ingredients_source,
+    read_micro_nutrient_reference,
+    read_recipes_source,
+    store_path,
+)
+from data.recipe_store import ColumnStore, store_exists
+from retrieval import EventLoopThread, QueryCache, RecipeIndex, fan_out, fan_out_stream, load_index, query_cache_key, search_prompt
+from retrieval.local_index import DESCRIPTIONS_PATH, parse_descriptions
+from scoring import (
+    Catalogue,
+    FoodFactors,
+    IngredientEngine,
+    MicronutrientTable,
+    Profile,
+    RecipeEdit,
+    WeekPlanner,
+    attributes_from_descriptions,
+    browse,
+    food_choices,
+    greener_alternatives,
+    plan_meals,
+)
+from scoring.ingredients import AGRIBALYSE_CODE, NEVO_CODE
+from scoring.metrics import ENVIRONMENT_COLUMNS, HEALTH_COLUMNS
+
+# Reproducible timings of the search hot paths, compared against a stored baseline:
+#
+#   python -m benchmarks.run --output benchmarks/baseline.json             (record a baseline)
+#   python -m benchmarks.run --baseline benchmarks/baseline.json           (exit code 1 on regressions)
+#
+# Benchmarks whose data is not part of the checkout (e.g. final_recipes.xlsx) are reported as skipped.
+
+FIND_RECIPE_PAGE = "pages/3_🍽️ Find_Recipe.py"
+NUMBER_OF_RESULTS = 20
+PROFILES = 50
+
+
+class Context:
+    """
+    Shared inputs of the benchmarks, loaded on first use so a missing dataset only skips what needs it.
+    """
+
+    def __init__(self, seed=0):
+        self.seed = seed
+        self.cached = {}
+
+    def get(self, name, build):
+        if name not in self.cached:
+            self.cached[name] = build()
+        return self.cached[name]
+
+    def recipe_store(self):
+        def build():
+            path = store_path(RECIPES_SOURCE)
+            if not store_exists(path):
+                raise Skip(f"no recipe store at {path}, run `python -m data.data_loader`")
+            return ColumnStore(path)
+        return self.get("recipe_store", build)
+
+    def ingredient_store(self):
+        def build():
+            path = store_path(INGREDIENTS_SOURCE)
+            if not store_exists(path):
+                raise Skip(f"no ingredient store at {path}, run `python -m data.data_loader`")
+            store = ColumnStore(path)
+            store.key_index("recipe_id")
+            return store
+        return self.get("ingredient_store", build)
+
+    def catalogue(self):
+        return self.get("catalogue", lambda: Catalogue.from_store(self.recipe_store()))
+
+    def micronutrient_table(self):
+        return self.get("micronutrient_table", lambda: MicronutrientTable.from_frame(read_micro_nutrient_reference()))
+
+    def profiles(self):
+        # Profile objects, so the timings exclude the dict conversion the page does once per action
+        return self.get("profiles", lambda: [
+            Profile.from_dict(profile)
+            for profile in synthetic_profiles(PROFILES, self.micronutrient_table(), self.seed)
+        ])
+
+    def recipe_attributes(self):
+        def build():
+            if not os.path.exists(DESCRIPTIONS_PATH):
+                raise Skip(f"{DESCRIPTIONS_PATH} is missing")
+            return attributes_from_descriptions(self.catalogue().recipe_ids, parse_descriptions(DESCRIPTIONS_PATH))
+        return self.get("recipe_attributes", build)
+
+    def ingredient_engine(self):
+        # Synthetic factor tables, so the timings do not depend on the optional published ones
+        def build():
+            engine = IngredientEngine.from_stores(self.recipe_store(), self.ingredient_store())
+            return engine.with_tables(*(
+                synthetic_factor_table(engine.matrices[system].codes, columns, self.seed)
+                for system, columns in ((NEVO_CODE, HEALTH_COLUMNS), (AGRIBALYSE_CODE, ENVIRONMENT_COLUMNS))
+            ))
+        return self.get("ingredient_engine", build)
+
+    def result_rows(self):
+        # A fixed set of 20 "retrieved" catalogue rows per profile
+        def build():
+            retrieve = stub_retriever(self.catalogue().recipe_ids)
+            return [
+                self.catalogue().rows([int(i) for i in retrieve(query, NUMBER_OF_RESULTS)])
+                for query in itertools.islice(itertools.cycle(QUERIES), PROFILES)
+            ]
+        return self.get("result_rows", build)
+
+
+def rotating(items):
+    # Every call of a benchmark uses the next input, so no single cached input dominates the timing
+    return itertools.cycle(items).__next__
+
+
+# ----------------------------------------------------------------------------------------------------
+# Benchmarks
+# ----------------------------------------------------------------------------------------------------
+def load_data(loader, source, warm):
+    def setup():
+        if not os.path.exists(source) and not os.path.exists(cache_path(source)):
+            raise Skip(f"neither {source} nor its Parquet cache is available")
+        if warm:
+            loader()
+            return loader
+
+        def uncached():
+            loader.clear()  # drop the st.cache_data entry, the Parquet file stays in the OS page cache
+            loader()
+        return uncached
+    return setup
+
+
+def cold_build(source, reader):
+    # The first start of a deployment: spreadsheet -> Parquet cache -> column store, into an empty CACHE_DIR
+    def setup():
+        if not os.path.exists(source):
+            raise Skip(f"{source} is missing")
+
+        def run():
+            with tempfile.TemporaryDirectory() as cache_dir:
+                live, data_loader.CACHE_DIR = data_loader.CACHE_DIR, cache_dir
+                try:
+                    data_loader.build_store(source, reader)
+                finally:
+                    data_loader.CACHE_DIR = live
+        return run
+    return setup
+
+
+def open_store(ctx):
+    ctx.recipe_store()
+    return lambda: ColumnStore(store_path(RECIPES_SOURCE)).numeric_matrix(["protein"])
+
+
+def build_catalogue(ctx):
+    store = ctx.recipe_store()
+    return lambda: Catalogue.from_store(store)
+
+
+def score_results(ctx):
+    catalogue = ctx.catalogue()
+    inputs = rotating(list(zip(ctx.profiles(), ctx.result_rows())))
+
+    def run():
+        profile, rows = inputs()
+        catalogue.score(profile, rows)
+    return run
+
+
+def score_catalogue(ctx):
+    catalogue = ctx.catalogue()
+    profiles = rotating(ctx.profiles())
+    return lambda: catalogue.score(profiles())
+
+
+def rescore_weights(ctx):
+    # Only the weights change between calls, the cached penalties are re-weighted
+    catalogue = ctx.catalogue()
+    profile = ctx.profiles()[0]
+    cached = catalogue.penalties(profile, ctx.result_rows()[0])
+    variants = []
+    for health in (20.0, 40.0, 60.0, 80.0):
+        variants.append(profile._replace(health_weight=health, environment_weight=100.0 - health))
+    profiles = rotating(variants)
+    return lambda: catalogue.rescore(cached, profiles())
+
+
+def best_portions(ctx):
+    # Best portion of every result row, one vectorised pass over rows and candidate portions
+    catalogue = ctx.catalogue()
+    profiles, rows = rotating(ctx.profiles()), rotating(ctx.result_rows())
+    return lambda: catalogue.portions(profiles(), rows())
+
+
+def browse_catalogue(ctx):
+    catalogue = ctx.catalogue()
+    profiles = rotating(ctx.profiles())
+    return lambda: browse(catalogue, profiles(), k=NUMBER_OF_RESULTS)
+
+
+def meal_plan(ctx):
+    # Time budget well above the expected run time, so the full beam search is measured
+    catalogue = ctx.catalogue()
+    profiles = rotating(ctx.profiles())
+    return lambda: plan_meals(catalogue, profiles(), time_budget=10.0)
+
+
+def week_plan(ctx):
+    catalogue, attributes = ctx.catalogue(), ctx.recipe_attributes()
+    profiles = rotating(ctx.profiles())
+    return lambda: WeekPlanner(catalogue, profiles(), attributes, time_budget=10.0).plan()
+
+
+def week_swap(ctx):
+    # Swapping meals of one plan in turn, the incremental path of the weekly plan page
+    planner = WeekPlanner(ctx.catalogue(), ctx.profiles()[0], ctx.recipe_attributes(), time_budget=10.0)
+    plan = planner.plan()
+    slots = rotating([(day, meal) for day in range(planner.days) for meal in range(planner.meals)])
+
+    def run():
+        planner.excluded[:] = False  # every call starts from the same candidates
+        planner.swap(plan, *slots())
+    return run
+
+
+def ingredient_totals(ctx):
+    # Every recipe's totals from its ingredient rows: one sparse product per code system
+    engine = ctx.ingredient_engine()
+    return engine.totals
+
+
+def search_local_index(ctx):
+    index = load_index()
+    prompts = rotating([search_prompt(query, "nuts") for query in QUERIES])
+    return lambda: index.search(prompts(), NUMBER_OF_RESULTS)
+
+
+def build_local_index(ctx):
+    if not os.path.exists(DESCRIPTIONS_PATH):
+        raise Skip(f"{DESCRIPTIONS_PATH} is missing")
+    return lambda: RecipeIndex(parse_descriptions(DESCRIPTIONS_PATH))
+
+
+def query_cache_hit(ctx):
+    cache = QueryCache()
+    keys = [query_cache_key(search_prompt(query, ""), "stub", NUMBER_OF_RESULTS) for query in QUERIES]
+    for key in keys:
+        cache.set(key, [str(i) for i in range(NUMBER_OF_RESULTS)])
+    next_key = rotating(keys)
+    return lambda: cache.get(next_key())
+
+
+def fan_out_stub(ctx):
+    # Scheduling and fusion overhead of the fan-out, with three instant stub backends
+    retrieve = async_stub_retriever(ctx.catalogue().recipe_ids)
+    backends = {name: (lambda prompt: retrieve(prompt, NUMBER_OF_RESULTS)) for name in ("a", "b", "c")}
+    loop = EventLoopThread()
+    prompts = rotating(QUERIES)
+    return lambda: loop.run(fan_out(prompts(), backends, 5.0, NUMBER_OF_RESULTS))
+
+
+def fan_out_first_snapshot(ctx):
+    # Time to the first fused ranking with an instant and a slow stub backend: what the page waits
+    # for before its first table, which must not depend on the slow one
+    fast = async_stub_retriever(ctx.catalogue().recipe_ids)
+    slow = async_stub_retriever(ctx.catalogue().recipe_ids, latency=1.0)
+    backends = {"fast": lambda prompt: fast(prompt, NUMBER_OF_RESULTS), "slow": lambda prompt: slow(prompt, NUMBER_OF_RESULTS)}
+    loop = EventLoopThread()
+    prompts = rotating(QUERIES)
+
+    def run():
+        snapshots = loop.iterate(fan_out_stream(prompts(), backends, 5.0, NUMBER_OF_RESULTS))
+        next(snapshots)
+        snapshots.close()  # cancels the slow search
+    return run
+
+
+def grid_table(ctx):
+    from find_recipe import results_table
+
+    store, catalogue = ctx.recipe_store(), ctx.catalogue()
+    profile, rows = ctx.profiles()[0], ctx.result_rows()[0]
+    scores = catalogue.score(profile, rows)
+    return lambda: results_table(store, rows, scores)
+
+
+def detail_view_data(ctx):
+    # Everything the detail view reads for one selected recipe: the record and its ingredient rows
+    store, ingredients, catalogue = ctx.recipe_store(), ctx.ingredient_store(), ctx.catalogue()
+    recipe_ids = rotating(catalogue.recipe_ids[ctx.result_rows()[0]])
+
+    def run():
+        recipe_id = int(recipe_ids())
+        store.record(catalogue.row(recipe_id))
+        ingredients.frame(ingredients.key_index("recipe_id").rows(recipe_id))
+    return run
+
+
+def substitute_ingredient(ctx):
+    # One ingredient swap in the detail view: a delta update of the recipe totals and a one-row score
+    catalogue, ingredients = ctx.catalogue(), ctx.ingredient_store()
+    row = int(ctx.result_rows()[0][0])
+    recipe_ingredients = ingredients.frame(ingredients.key_index("recipe_id").rows(int(catalogue.recipe_ids[row])))
+    edit = RecipeEdit(ctx.ingredient_engine(), catalogue, row, recipe_ingredients, ctx.profiles()[0])
+    swaps = rotating([(position, edit.foods[-1 - position]) for position in range(len(edit.foods))])
+    return lambda: edit.replace(*swaps())
+
+
+def greener_search(ctx):
+    # The greener alternative search of the detail view over the recipes of one result set
+    catalogue, ingredients, engine = ctx.catalogue(), ctx.ingredient_store(), ctx.ingredient_engine()
+    columns = ["ingredient", "NEVO Code", "Agribalyse Code"]
+    food_factors = FoodFactors(engine, food_choices(ingredients.frame(np.arange(len(ingredients)), columns=columns)))
+    edits = rotating([
+        RecipeEdit(engine, catalogue, int(row), ingredients.frame(ingredients.key_index("recipe_id").rows(int(catalogue.recipe_ids[row]))), ctx.profiles()[0])
+        for row in ctx.result_rows()[0]
+    ])
+    return lambda: greener_alternatives(edits(), food_factors)
+
+
+def find_recipe_page(ctx, search):
+    """
+    A full script run of the Find Recipe page in Streamlit's AppTest, with the stub retriever behind
+    the "stub" backend. `search` submits a new prompt, otherwise the page reruns with its results.
+    """
+    from streamlit.testing.v1 import AppTest
+    import find_recipe
+
+    catalogue = ctx.catalogue()
+    ctx.ingredient_store()
+    find_recipe.BACKENDS["stub"] = stub_retriever(catalogue.recipe_ids)
+    profile = synthetic_profiles(1, ctx.micronutrient_table(), ctx.seed)[0]
+    counter = itertools.count()
+
+    def start():
+        at = AppTest.from_file(os.path.abspath(FIND_RECIPE_PAGE), default_timeout=60)
+        at.secrets["auth"] = {"username": "benchmark", "password": "benchmark"}
+        at.secrets["retrieval_backend"] = "stub"
+        at.session_state["authenticated"] = True
+        at.session_state["profile"] = profile
+        at.run()
+        return at
+
+    def submit(at):
+        # A new prompt every time, so the query cache never answers
+        at.text_input[0].input(f"{QUERIES[0]} {next(counter)}")
+        at.button[0].click().run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+    if search:
+        at = start()
+        return lambda: submit(at)
+
+    at = start()
+    submit(at)
+    return lambda: at.run()
+
+
+def build_benchmarks(ctx):
+    # name -> (setup, repeat, number of calls per repeat)
+    return {
+        "load.recipes_data.cold": (cold_build(RECIPES_SOURCE, read_recipes_source), 3, 1),
+        "load.recipes_data.parquet": (load_data(load_recipes_data, RECIPES_SOURCE, warm=False), 5, 1),
+        "load.recipes_data.warm": (load_data(load_recipes_data, RECIPES_SOURCE, warm=True), REPEAT, 100),
+        "load.ingredients_data.cold": (cold_build(INGREDIENTS_SOURCE, read_ingredients_source), 3, 1),
+        "load.ingredients_data.parquet": (load_data(load_ingredients_data, INGREDIENTS_SOURCE, warm=False), 5, 1),
+        "load.ingredients_data.warm": (load_data(load_ingredients_data, INGREDIENTS_SOURCE, warm=True), REPEAT, 100),
+        "load.recipe_store.open": (lambda: open_store(ctx), REPEAT, 10),
+        "load.catalogue.build": (lambda: build_catalogue(ctx), REPEAT, 1),
+        "score.results_20": (lambda: score_results(ctx), REPEAT, 100),
+        "score.catalogue_all": (lambda: score_catalogue(ctx), REPEAT, 5),
+        "score.rescore_weights_20": (lambda: rescore_weights(ctx), REPEAT, 100),
+        "score.portions_20": (lambda: best_portions(ctx), REPEAT, 100),
+        "score.browse_top20": (lambda: browse_catalogue(ctx), REPEAT, 5),
+        "score.meal_plan": (lambda: meal_plan(ctx), REPEAT, 1),
+        "score.week_plan": (lambda: week_plan(ctx), REPEAT, 1),
+        "score.week_swap": (lambda: week_swap(ctx), REPEAT, 10),
+        "score.ingredient_totals": (lambda: ingredient_totals(ctx), REPEAT, 10),
+        "retrieval.local_index.search": (lambda: search_local_index(ctx), REPEAT, 10),
+        "retrieval.local_index.build": (lambda: build_local_index(ctx), 3, 1),
+        "retrieval.query_cache.hit": (lambda: query_cache_hit(ctx), REPEAT, 1000),
+        "retrieval.fan_out.stub": (lambda: fan_out_stub(ctx), REPEAT, 10),
+        "retrieval.fan_out.first_snapshot": (lambda: fan_out_first_snapshot(ctx), REPEAT, 10),
+        "grid.results_table_20": (lambda: grid_table(ctx), REPEAT, 10),
+        "detail.record_and_ingredients": (lambda: detail_view_data(ctx), REPEAT, 10),
+        "detail.substitute_ingredient": (lambda: substitute_ingredient(ctx), REPEAT, 1000),
+        "detail.greener_alternatives": (lambda: greener_search(ctx), REPEAT, 10),
+        "page.find_recipe.search": (lambda: find_recipe_page(ctx, search=True), 5, 1),
+        "page.find_recipe.rerun": (lambda: find_recipe_page(ctx, search=False), 5, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the loading, scoring and retrieval hot paths.")
+    parser.add_argument("--output", help="write the results as JSON, e.g. to record a new baseline")
+    parser.add_argument("--baseline", help="compare against a results JSON of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--only", nargs="*", help="run only the benchmarks whose name starts with these prefixes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    np.random.seed(args.seed)
+    results = run_benchmarks(build_benchmarks(Context(args.seed)), args.only)
+    if args.output:
+        write_results(args.output, results)
+
+    if args.baseline:
+        rows = compare(results, read_results(args.baseline), args.tolerance)
+        print(f"\n{'benchmark':<40} {'baseline':>10} {'current':>10} {'ratio':>7}")
+        for name, before, current, ratio, status in rows:
+            flag = "" if status == "ok" else f"  {status}"
+            print(f"{name:<40} {before:>10.3f} {current:>10.3f} {ratio:>7.2f}{flag}")
+        if any(status == "regression" for *_, status in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
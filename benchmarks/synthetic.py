@@ -0,0 +1,97 @@
+import asyncio
+import random
+import time
+import zlib
+
+import numpy as np
+
+from functions import default_profile
+from scoring import FactorTable, profile_targets
+from scoring.targets import ACTIVITY_FACTORS
+
+ALLERGIES = ("", "", "", "nuts", "milk", "gluten", "shellfish", "egg, soy")
+QUERIES = (
+    "chicken curry",
+    "Show me a recipe containing chicken, with at least 15g of protein and from the Asian cuisine.",
+    "quick vegetarian pasta",
+    "low sugar chocolate dessert",
+    "easy fish dinner under 30 minutes",
+    "spicy lentil soup",
+)
+
+
+# ----------------------------------------------------------------------------------------------------
+# Profiles
+# ----------------------------------------------------------------------------------------------------
+def synthetic_profile(rng, table):
+    """
+    A complete session profile for random personal data, with the targets computed like the
+    Personal Information page does and a random health/environment split.
+    """
+    profile = default_profile()
+    general = profile["General"]
+    general.update({
+        "Age": rng.randint(19, 90),
+        "Gender": rng.choice(["Male", "Female"]),
+        "Weight": round(rng.uniform(45, 120), 1),
+        "Height": float(rng.randint(150, 200)),
+        "Activity_level": rng.choice(list(ACTIVITY_FACTORS)),
+        "Allergies_Intolerances": rng.choice(ALLERGIES),
+        "Number_of_meals": rng.randint(2, 5),
+    })
+    targets = profile_targets(
+        general["Age"], general["Gender"], general["Weight"], general["Height"], general["Activity_level"], table
+    )
+    profile["Macros"].update(targets["Macros"])
+    profile["Micros"].update(targets["Micros"])
+
+    health = rng.choice([25.0, 50.0, 75.0])
+    profile["Weights"]["Overall"] = {"Health": health, "Environment": 100.0 - health}
+    return profile
+
+
+def synthetic_profiles(n, table, seed=0):
+    rng = random.Random(seed)
+    return [synthetic_profile(rng, table) for _ in range(n)]
+
+
+# ----------------------------------------------------------------------------------------------------
+# Factor tables
+# ----------------------------------------------------------------------------------------------------
+def synthetic_factor_table(codes, columns, seed=0):
+    """
+    A stand-in for a published factor table: random non-negative per-gram values for every code,
+    so the ingredient benchmarks run without the optional NEVO and Agribalyse files.
+    """
+    rng = np.random.default_rng(seed)
+    return FactorTable(tuple(codes), tuple(columns), rng.exponential(0.01, size=(len(codes), len(columns))))
+
+
+# ----------------------------------------------------------------------------------------------------
+# Retrieval stubs
+# ----------------------------------------------------------------------------------------------------
+def stub_retriever(recipe_ids, latency=0.0):
+    """
+    Deterministic stand-in for a retrieval backend: the prompt picks the IDs, so the same prompt
+    always returns the same recipes. `latency` adds a fixed delay per call.
+    """
+    recipe_ids = [str(int(recipe_id)) for recipe_id in recipe_ids]
+
+    def retrieve(prompt, number_of_results=20):
+        if latency:
+            time.sleep(latency)
+        rng = random.Random(zlib.crc32(prompt.encode("utf-8")))
+        return rng.sample(recipe_ids, min(number_of_results, len(recipe_ids)))
+
+    return retrieve
+
+
+def async_stub_retriever(recipe_ids, latency=0.0):
+    retrieve = stub_retriever(recipe_ids)
+
+    async def run(prompt, number_of_results=20):
+        if latency:
+            await asyncio.sleep(latency)
+        return retrieve(prompt, number_of_results)
+
+    return run
@@ -1,20 +1,173 @@
 import pandas as pd
 import streamlit as st
 import ast
+import json
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+from data.recipe_store import ColumnStore, read_store_signature, store_exists, write_store
+
+RECIPES_SOURCE = "data/datasets/final_recipes.xlsx"
+INGREDIENTS_SOURCE = "data/datasets/final_ingredients.xlsx"
+MICRO_NUTRIENT_REFERENCE = "data/datasets/micro-nutrients-reference.csv"
+NEVO_FACTORS = "data/datasets/nevo_factors.csv"              # optional, nutrients per 100 g by NEVO code
+AGRIBALYSE_FACTORS = "data/datasets/agribalyse_factors.csv"  # optional, impacts per kg by Agribalyse code
+CACHE_DIR = "data/cache"
+
+# ----------------------------------------------------------------------------------------------------
+# Spreadsheet readers
+# ----------------------------------------------------------------------------------------------------
+def read_recipes_source():
+    recipes_df = pd.read_excel(RECIPES_SOURCE)
+    recipes_df['Ingredients'] = recipes_df['Ingredients'].apply(lambda x: ast.literal_eval(x) if isinstance(x, str) else x)
+    recipes_df['Instructions'] = recipes_df['Instructions'].apply(lambda x: ast.literal_eval(x) if isinstance(x, str) else x)
+    return recipes_df
+
+def read_ingredients_source():
+    ingredients_df = pd.read_excel(INGREDIENTS_SOURCE)
+    return ingredients_df
+
+# ----------------------------------------------------------------------------------------------------
+# Columnar cache
+# ----------------------------------------------------------------------------------------------------
+# The spreadsheets are converted once into Parquet files under CACHE_DIR. Columns holding nested
+# structures (lists of dicts) or mixed types are stored as JSON text, which decodes much faster than
+# ast.literal_eval. The source file's mtime and size are kept in the Parquet metadata, so the cache is
+# rebuilt as soon as a spreadsheet changes.
+def cache_path(source):
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(CACHE_DIR, f"{name}.parquet")
+
+def source_signature(source):
+    stat = os.stat(source)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+def cache_is_fresh(source):
+    path = cache_path(source)
+    if not os.path.exists(path):
+        return False
+    # Deployments may ship only the cache; without a source there is nothing to compare against
+    if not os.path.exists(source):
+        return True
+    metadata = pq.read_schema(path).metadata or {}
+    signature = json.loads(metadata.get(b"source_signature", b"null"))
+    return signature == source_signature(source)
+
+def build_cache(source, reader):
+    df = reader()
+    json_columns = []
+    for column in df.columns:
+        if df[column].dtype != object:
+            continue
+        try:
+            pa.array(df[column], from_pandas=True)
+            nested = df[column].map(lambda x: isinstance(x, (list, dict))).any()
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            nested = True
+        if nested:
+            json_columns.append(column)
+
+    encoded = df.copy()
+    for column in json_columns:
+        encoded[column] = encoded[column].map(lambda x: json.dumps(x, ensure_ascii=False))
+
+    table = pa.Table.from_pandas(encoded, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"source_signature": json.dumps(source_signature(source)).encode(),
+        b"json_columns": json.dumps(json_columns).encode(),
+    })
+
+    # Write to a temporary file first, so concurrent workers never read a half-written cache
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = cache_path(source)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+    return df
+
+def read_cache(source):
+    table = pq.read_table(cache_path(source))
+    json_columns = json.loads((table.schema.metadata or {}).get(b"json_columns", b"[]"))
+    df = table.to_pandas()
+    for column in json_columns:
+        df[column] = df[column].map(json.loads)
+    return df
+
+def load_cached(source, reader):
+    if cache_is_fresh(source):
+        return read_cache(source)
+    return build_cache(source, reader)
+
+# ----------------------------------------------------------------------------------------------------
+# Shared memory-mapped stores
+# ----------------------------------------------------------------------------------------------------
+def store_path(source):
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(CACHE_DIR, f"{name}_store")
+
+def store_is_fresh(source):
+    path = store_path(source)
+    if not store_exists(path):
+        return False
+    if not os.path.exists(source):
+        return True
+    return read_store_signature(path) == source_signature(source)
+
+def build_store(source, reader):
+    signature = source_signature(source) if os.path.exists(source) else None
+    write_store(load_cached(source, reader), store_path(source), signature)
+
+def load_store(source, reader):
+    if not store_is_fresh(source):
+        build_store(source, reader)
+    return ColumnStore(store_path(source))
+
+# ----------------------------------------------------------------------------------------------------
+# Loaders
+# ----------------------------------------------------------------------------------------------------
+def read_micro_nutrient_reference():
+    return pd.read_csv(MICRO_NUTRIENT_REFERENCE)
 
 @st.cache_data
 def load_micro_nutrient_reference_data():
-    nutrient_df = pd.read_csv("data/datasets/micro-nutrients-reference.csv")
+    nutrient_df = read_micro_nutrient_reference()
     return nutrient_df
 
 @st.cache_data
 def load_recipes_data():
-    recipes_df = pd.read_excel("data/datasets/final_recipes.xlsx")
-    recipes_df['Ingredients'] = recipes_df['Ingredients'].apply(lambda x: ast.literal_eval(x) if isinstance(x, str) else x)
-    recipes_df['Instructions'] = recipes_df['Instructions'].apply(lambda x: ast.literal_eval(x) if isinstance(x, str) else x)
-    return recipes_df
+    return load_cached(RECIPES_SOURCE, read_recipes_source)
 
 @st.cache_data
 def load_ingredients_data():
-    ingredients_df = pd.read_excel("data/datasets/final_ingredients.xlsx")
-    return ingredients_df
\ No newline at end of file
+    return load_cached(INGREDIENTS_SOURCE, read_ingredients_source)
+
+# cache_resource hands out the same mapped store on every hit instead of pickling a copy
+@st.cache_resource
+def load_recipe_store():
+    return load_store(RECIPES_SOURCE, read_recipes_source)
+
+@st.cache_resource
+def load_ingredient_store():
+    store = load_store(INGREDIENTS_SOURCE, read_ingredients_source)
+    store.key_index('recipe_id')  # group the ingredient rows by recipe once per process
+    return store
+
+
+# ----------------------------------------------------------------------------------------------------
+# Build step: python -m data.data_loader
+if __name__ == "__main__":
+    for source, reader in ((RECIPES_SOURCE, read_recipes_source), (INGREDIENTS_SOURCE, read_ingredients_source)):
+        if not os.path.exists(source):
+            print(f"Skipping {source}: file not found")
+            continue
+        if cache_is_fresh(source):
+            print(f"{cache_path(source)} is up to date")
+        else:
+            build_cache(source, reader)
+            print(f"Built {cache_path(source)}")
+        if store_is_fresh(source):
+            print(f"{store_path(source)} is up to date")
+        else:
+            build_store(source, reader)
+            print(f"Built {store_path(source)}")
@@ -0,0 +1,104 @@
+import json
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+DEFAULT_MAXSIZE = 1024
+TOKEN_BYTES = 16
+
+# Sections of the session profile that are persisted; "other" only holds per-session results
+SECTIONS = ("General", "Macros", "Micros", "Environment", "Weights", "Importance")
+
+
+def new_token():
+    # Anonymous, unguessable key of a stored profile (URL-safe, 22 characters)
+    return secrets.token_urlsafe(TOKEN_BYTES)
+
+
+def pack_sections(profile):
+    return zlib.compress(json.dumps({section: profile[section] for section in SECTIONS if section in profile}).encode("utf-8"))
+
+
+def unpack_sections(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class ProfileStore:
+    """
+    Session profiles persisted in a SQLite table (WAL mode) keyed by an anonymous token, with an
+    in-memory LRU of the serialized rows in front, so a returning user is one lookup away from their
+    targets and weights. A row holds the zlib-compressed JSON of the profile sections and, once the
+    targets are known, the packed scoring Profile (see scoring.profile.Profile.to_bytes).
+    """
+
+    def __init__(self, path, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS profiles (token TEXT PRIMARY KEY, sections BLOB NOT NULL, packed BLOB, updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def load(self, token):
+        """
+        (profile sections dict, packed Profile bytes or None) of the token, None if it is unknown.
+        Every call returns fresh objects, so sessions never share a mutable profile.
+        """
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                self._entries.move_to_end(token)
+                self.hits += 1
+            else:
+                # Not warm: one query for the whole profile
+                self.misses += 1
+                entry = self._db.execute("SELECT sections, packed FROM profiles WHERE token = ?", (token,)).fetchone()
+                if entry is None:
+                    return None
+                self._remember(token, entry)
+        sections, packed = entry
+        return unpack_sections(sections), packed
+
+    def save(self, token, profile, packed=None):
+        entry = (pack_sections(profile), packed)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO profiles (token, sections, packed, updated_at) VALUES (?, ?, ?, ?)",
+                (token, entry[0], entry[1], time.time()),
+            )
+            self._db.commit()
+            self._remember(token, entry)
+
+    def delete(self, token):
+        with self._lock:
+            self._entries.pop(token, None)
+            self._db.execute("DELETE FROM profiles WHERE token = ?", (token,))
+            self._db.commit()
+
+    def _remember(self, token, entry):
+        self._entries[token] = entry
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
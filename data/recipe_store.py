@@ -0,0 +1,240 @@
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------
+# Memory-mapped column store
+# ----------------------------------------------------------------------------------------------------
+# A DataFrame is written into a version directory with
+#   - numeric.npy       float64 matrix of shape (n_numeric_columns, n_rows), one contiguous row per column
+#   - text.bin          UTF-8 blob with every other cell JSON-encoded (keeps lists, dicts, ints and NaN intact)
+#   - text_offsets.npy  int64 matrix of shape (n_text_columns, n_rows + 1) pointing into text.bin
+#   - meta.json         column names and the signature of the source the store was built from
+# and the store directory holds the version directories plus a CURRENT file naming the live one.
+# All files are opened read-only with mmap, so every Streamlit worker on the host shares the same
+# physical pages instead of holding its own DataFrame copy.
+
+CURRENT = "CURRENT"
+STORE_FILES = ("numeric.npy", "text.bin", "text_offsets.npy", "meta.json")
+
+
+def resolve_store(path):
+    """
+    The directory with the live files of the store at `path`: the version named by CURRENT, or
+    `path` itself for a store written before versioning. None when there is no store.
+    """
+    try:
+        with open(os.path.join(path, CURRENT), encoding="utf-8") as f:
+            return os.path.join(path, f.read().strip())
+    except FileNotFoundError:
+        pass
+    if os.path.exists(os.path.join(path, "meta.json")):
+        return path
+    return None
+
+
+def store_exists(path):
+    return resolve_store(path) is not None
+
+
+def write_store(df, path, signature=None):
+    numeric_columns = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])]
+    integer_columns = [c for c in numeric_columns if pd.api.types.is_integer_dtype(df[c])]
+    text_columns = [c for c in df.columns if c not in numeric_columns]
+
+    numeric = np.empty((len(numeric_columns), len(df)), dtype=np.float64)
+    for i, column in enumerate(numeric_columns):
+        numeric[i] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    offsets = np.zeros((len(text_columns), len(df) + 1), dtype=np.int64)
+    chunks = []
+    position = 0
+    for i, column in enumerate(text_columns):
+        offsets[i, 0] = position
+        for j, value in enumerate(df[column].tolist()):
+            encoded = json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+            chunks.append(encoded)
+            position += len(encoded)
+            offsets[i, j + 1] = position
+
+    meta = {
+        "n_rows": len(df),
+        "numeric_columns": numeric_columns,
+        "integer_columns": integer_columns,
+        "text_columns": text_columns,
+        "columns": list(df.columns),
+        "source_signature": signature,
+    }
+
+    # Build a new version next to the live one and flip CURRENT with an atomic os.replace, so there is
+    # always a complete store to open. The version it replaces stays for workers that resolved
+    # CURRENT just before the flip, older ones are deleted. Workers that still map deleted files
+    # keep reading them until they reload.
+    os.makedirs(path, exist_ok=True)
+    version = f"v{time.time_ns()}-{os.getpid()}"
+    tmp_path = os.path.join(path, f"{version}.tmp")
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "numeric.npy"), numeric)
+    np.save(os.path.join(tmp_path, "text_offsets.npy"), offsets)
+    with open(os.path.join(tmp_path, "text.bin"), "wb") as f:
+        f.write(b"".join(chunks))
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.rename(tmp_path, os.path.join(path, version))
+
+    previous = resolve_store(path)
+    pointer = os.path.join(path, f"{CURRENT}.{os.getpid()}.tmp")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(path, CURRENT))
+
+    keep = {CURRENT, version}
+    keep.update(STORE_FILES if previous == path else [os.path.basename(previous or "")])
+    for name in os.listdir(path):
+        if name in keep or name.endswith(".tmp"):  # .tmp: versions other writers are still building
+            continue
+        if os.path.isdir(os.path.join(path, name)):
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+        elif name in STORE_FILES:
+            os.remove(os.path.join(path, name))
+
+
+def read_store_signature(path):
+    while True:
+        live = resolve_store(path)
+        if live is None:
+            return None
+        try:
+            with open(os.path.join(live, "meta.json"), encoding="utf-8") as f:
+                return json.load(f).get("source_signature")
+        except FileNotFoundError:
+            if resolve_store(path) == live:
+                return None
+
+
+class KeyIndex:
+    """
+    O(1) lookup from an integer key column (e.g. recipe_id) to its rows, in CSR layout:
+    the rows holding key k are order[indptr[k]:indptr[k + 1]].
+    """
+
+    def __init__(self, keys):
+        keys = np.asarray(keys, dtype=np.int64)
+        self.order = np.argsort(keys, kind="stable")
+        self.max_key = int(keys.max()) if len(keys) else 0
+        self.indptr = np.searchsorted(keys[self.order], np.arange(self.max_key + 2))
+
+    def rows(self, key):
+        if not 0 <= key <= self.max_key:
+            return self.order[:0]
+        return self.order[self.indptr[key]:self.indptr[key + 1]]
+
+    def positions(self, keys):
+        """
+        First row of every key, -1 for keys that do not exist.
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        if not len(self.order):
+            return np.full(len(keys), -1, dtype=np.int64)
+        valid = (keys >= 0) & (keys <= self.max_key)
+        clipped = np.where(valid, keys, 0)
+        start = self.indptr[clipped]
+        found = valid & (self.indptr[clipped + 1] > start)
+        return np.where(found, self.order[np.minimum(start, len(self.order) - 1)], -1)
+
+
+class ColumnStore:
+    """
+    Read-only, memory-mapped view of a DataFrame written by write_store.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        while True:
+            live = resolve_store(path)
+            if live is None:
+                raise FileNotFoundError(f"No column store at {path}")
+            try:
+                meta = self._map(live)
+                break
+            except FileNotFoundError:
+                # Rebuilds deleted this version between reading CURRENT and opening it, retry the new one
+                if resolve_store(path) == live:
+                    raise
+        self.n_rows = meta["n_rows"]
+        self.columns = meta["columns"]
+        self.numeric_columns = meta["numeric_columns"]
+        self.integer_columns = set(meta["integer_columns"])
+        self.text_columns = meta["text_columns"]
+        self._numeric_index = {c: i for i, c in enumerate(self.numeric_columns)}
+        self._text_index = {c: i for i, c in enumerate(self.text_columns)}
+        self._key_indexes = {}
+
+    def _map(self, live):
+        with open(os.path.join(live, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.numeric = np.load(os.path.join(live, "numeric.npy"), mmap_mode="r")
+        self.text_offsets = np.load(os.path.join(live, "text_offsets.npy"), mmap_mode="r")
+        blob_path = os.path.join(live, "text.bin")
+        if os.path.getsize(blob_path) > 0:
+            self.text_blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+        else:
+            self.text_blob = np.empty(0, dtype=np.uint8)
+        return meta
+
+    def __len__(self):
+        return self.n_rows
+
+    def column(self, name):
+        """
+        Zero-copy view of a numeric column, or the decoded values of a text column.
+        """
+        if name in self._numeric_index:
+            return self.numeric[self._numeric_index[name]]
+        return [self.text(name, row) for row in range(self.n_rows)]
+
+    def numeric_matrix(self, columns, rows=None):
+        """
+        (n_rows, len(columns)) float64 matrix for the requested rows.
+        """
+        indices = [self._numeric_index[c] for c in columns]
+        block = self.numeric[indices] if rows is None else self.numeric[np.ix_(indices, np.asarray(rows))]
+        return np.ascontiguousarray(block.T)
+
+    def text(self, name, row):
+        offsets = self.text_offsets[self._text_index[name]]
+        return json.loads(self.text_blob[offsets[row]:offsets[row + 1]].tobytes())
+
+    def key_index(self, name):
+        """
+        KeyIndex over a numeric column, built once per store.
+        """
+        if name not in self._key_indexes:
+            self._key_indexes[name] = KeyIndex(self.numeric[self._numeric_index[name]])
+        return self._key_indexes[name]
+
+    def rows_where(self, name, values):
+        """
+        Positions of the rows whose numeric column `name` holds one of `values`.
+        """
+        return np.flatnonzero(np.isin(self.numeric[self._numeric_index[name]], values))
+
+    def frame(self, rows, columns=None):
+        """
+        Materialise the requested rows as a DataFrame; only these rows are copied out of the map.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        data = {}
+        for name in (columns or self.columns):
+            if name in self._numeric_index:
+                values = self.numeric[self._numeric_index[name], rows]
+                data[name] = values.astype(np.int64) if name in self.integer_columns else np.array(values)
+            else:
+                data[name] = [self.text(name, row) for row in rows]
+        return pd.DataFrame(data, index=rows)
+
+    def record(self, row):
+        return self.frame([row]).iloc[0]
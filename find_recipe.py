@@ -1,45 +1,195 @@
-
-import requests
-import json
+import pandas as pd
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from retrieval import (
+    FANOUT_DEADLINE,
+    LANGFLOW_URL,
+    AsyncLangflowClient,
+    EventLoopThread,
+    LangflowClient,
+    QueryCache,
+    RetrievalTimeout,
+    fan_out,
+    fan_out_stream,
+    get_recipe_local,
+    query_cache_key,
+    search_local,
+)
+from tracing import Tracer
 
 # The complete API endpoint URL for this flow
-url = f"https://api.langflow.astra.datastax.com/lf/9e953ffc-8d4e-419e-bec2-1b07048aa540/api/v1/run/13f59e80-cd3e-4166-b7a8-a8514b8d2592"  
+url = LANGFLOW_URL
+
+NUMBER_OF_RESULTS = 20
+
+
+@st.cache_resource
+def get_tracer():
+    # Off unless enabled in a [tracing] section of secrets.toml (enabled, export_path, export_interval)
+    settings = dict(st.secrets.get("tracing", {}))
+    return Tracer(**settings)
+
+
+@st.cache_resource
+def get_langflow_client():
+    # One pooled session per process; timeouts and retries can be tuned in a [langflow] section of secrets.toml
+    settings = dict(st.secrets.get("langflow", {}))
+    return LangflowClient(
+        url,
+        st.secrets.get('Datastax_BEARER', ''),  # Authentication key from secrets.toml
+        **settings
+    )
+
+
+@st.cache_resource
+def get_query_cache():
+    # maxsize, ttl and an optional SQLite path can be set in a [query_cache] section of secrets.toml
+    settings = dict(st.secrets.get("query_cache", {}))
+    return QueryCache(**settings)
+
+
+@st.cache_resource
+def get_fanout_runner():
+    # The async client is bound to one long-lived loop, so its connection pool survives between searches
+    settings = dict(st.secrets.get("langflow", {}))
+    client = AsyncLangflowClient(url, st.secrets.get('Datastax_BEARER', ''), **settings)
+    return EventLoopThread(), client
+
+
+@st.cache_resource
+def get_search_executor():
+    # Runs blocking remote searches while the script thread shows the local results; one worker per
+    # pooled connection, so the searches of different sessions only queue once the pool is busy too
+    return ThreadPoolExecutor(max_workers=get_langflow_client().pool_maxsize, thread_name_prefix="recipe-search")
+
+
+def get_recipe_langflow(input_value):
+    # Raises a RetrievalError subclass when the flow is unreachable, slow or answers garbage
+    return get_langflow_client().run(input_value, number_of_results=NUMBER_OF_RESULTS)
+
+
+def get_recipe_fanout(input_value):
+    # Query the flow and the local index at the same time, and merge whatever answered before the
+    # deadline with reciprocal-rank fusion
+    loop, client = get_fanout_runner()
+    deadline = st.secrets.get("fanout_deadline", FANOUT_DEADLINE)
+    return loop.run(fan_out(input_value, fanout_backends(client), deadline, NUMBER_OF_RESULTS)).recipe_ids
 
-# Request headers
-headers = {
-    "Content-Type": "application/json",
-    "Authorization": st.secrets['Datastax_BEARER']  # Authentication key from environment variable'}
+
+def fanout_backends(client):
+    return {
+        # A wider result set than shown, so fusion can rank up recipes the local index also found
+        "langflow": lambda prompt: client.run(prompt, number_of_results=2 * NUMBER_OF_RESULTS),
+        "local": lambda prompt: search_local(prompt, number_of_results=NUMBER_OF_RESULTS),
+    }
+
+
+# Retrieval backends, selected with `retrieval_backend` in secrets.toml ("langflow" by default).
+# All of them take the prompt and return a list of recipe IDs as strings.
+BACKENDS = {
+    "langflow": get_recipe_langflow,
+    "local": get_recipe_local,
+    "fanout": get_recipe_fanout,
 }
 
 
 def get_recipe(input_value):
-    # Request payload configuration
-    payload = {
-        "input_value": input_value,  # The input value to be processed by the flow
-        "output_type": "text",  # Specifies the expected output format
-        "input_type": "text",  # Specifies the input format
-        "tweaks": {
-            "AstraDB-0kWRk": {
-                "number_of_results": 20
-            } 
-        }
-    }
+    backend = st.secrets.get("retrieval_backend", "langflow")
+    cache = get_query_cache()
+    key = query_cache_key(input_value, backend, NUMBER_OF_RESULTS)
+
+    tracer = get_tracer()
+    with tracer.span("retrieval.cache_lookup"):
+        recipe_ids = cache.get(key)
+    if recipe_ids is None:
+        with tracer.span(f"retrieval.{backend}"):
+            recipe_ids = BACKENDS[backend](input_value)
+        cache.set(key, recipe_ids)
+    return recipe_ids
+
+
+# ----------------------------------------------------------------------------------------------------
+# Streaming retrieval
+# ----------------------------------------------------------------------------------------------------
+# stream_recipe yields (recipe_ids, final) as results come in, so the page can draw a first table
+# from the local index while the remote search is in flight. Every stream ends with final=True.
+def stream_recipe_fanout(input_value):
+    # The fused ranking after every backend that answers; complete once all answered or failed
+    loop, client = get_fanout_runner()
+    backends = fanout_backends(client)
+    deadline = st.secrets.get("fanout_deadline", FANOUT_DEADLINE)
+    for result in loop.iterate(fan_out_stream(input_value, backends, deadline, NUMBER_OF_RESULTS)):
+        yield result.recipe_ids, len(result.completed) + len(result.failed) == len(backends)
 
+
+def stream_recipe_remote(backend, input_value):
+    # The remote search runs in a worker thread while the local index answers in this one
+    client = get_langflow_client()  # resolved here, the worker has no Streamlit context
+    if backend == "langflow":
+        search = lambda prompt: client.run(prompt, number_of_results=NUMBER_OF_RESULTS)
+    else:
+        search = BACKENDS[backend]
+    future = get_search_executor().submit(search, input_value)
+    try:
+        local_ids = get_recipe_local(input_value, NUMBER_OF_RESULTS)
+    except OSError:
+        local_ids = []  # no local index in this deployment, the table waits for the remote search
+    if local_ids and not future.done():
+        yield local_ids, False
     try:
-    # Send API request
-        response = requests.request("POST", url, json=payload, headers=headers)
-        response.raise_for_status()  # Raise exception for bad status codes
-
-        response_text = response.json()['outputs'][0]['outputs'][0]['results']['text']['data']['text']
-        
-        # Print response
-        recipe_ids = response_text.split(",")
-        recipe_ids = [x.strip() for x in recipe_ids]
-        return recipe_ids
-
-    except requests.exceptions.RequestException as e:
-        return f"Error making API request: {e}"
-    except ValueError as e:
-        return f"Error parsing response: {e}"
-        
\ No newline at end of file
+        recipe_ids = future.result(timeout=client.max_duration)
+    except FutureTimeoutError:
+        raise RetrievalTimeout("Recipe search timed out, please try again in a moment") from None
+    yield recipe_ids, True
+
+
+def stream_recipe(input_value):
+    """
+    Like get_recipe, but yields (recipe_ids, final) snapshots: cached or local results first, then
+    the remote results as they arrive. Only the final IDs are cached; a RetrievalError of the remote
+    search is raised after the snapshots shown so far.
+    """
+    backend = st.secrets.get("retrieval_backend", "langflow")
+    cache = get_query_cache()
+    key = query_cache_key(input_value, backend, NUMBER_OF_RESULTS)
+
+    tracer = get_tracer()
+    with tracer.span("retrieval.cache_lookup"):
+        recipe_ids = cache.get(key)
+    if recipe_ids is not None:
+        yield recipe_ids, True
+        return
+
+    if backend == "local":
+        snapshots = iter([(BACKENDS[backend](input_value), True)])
+    elif backend == "fanout":
+        snapshots = stream_recipe_fanout(input_value)
+    else:
+        snapshots = stream_recipe_remote(backend, input_value)
+    while True:
+        # One span per wait, so the time the page spends drawing previews is not counted
+        with tracer.span(f"retrieval.{backend}"):
+            snapshot = next(snapshots, None)
+        if snapshot is None:
+            return
+        recipe_ids, final = snapshot
+        if final:
+            cache.set(key, recipe_ids)
+        yield recipe_ids, final
+
+
+def results_table(recipe_store, rows, scores, portions=None):
+    # The grid of the Find Recipe page: one line per scored catalogue row, with the best portion if given
+    recipes = recipe_store.frame(rows, columns=['Title', 'Rating'])
+    table = pd.DataFrame({
+        'recipe_id': scores.recipe_ids,
+        'title': recipes['Title'].to_numpy(),
+        'rating': recipes['Rating'].astype(float).to_numpy(),
+        'health_score': scores.health_score,
+        'environment_score': scores.environment_score,
+        'final_score': scores.final_score
+    })
+    if portions is not None:
+        table['portion'] = portions.multipliers
+        table['portion_score'] = portions.scores.final_score
+    return table
@@ -1,9 +1,27 @@
+import json
+import pandas as pd
 import streamlit as st
+from auth import is_admin
+from data.profile_store import ProfileStore, new_token
+from scoring import Profile
+
+PROFILE_TOKEN_PARAM = "profile"  # query parameter carrying the anonymous token of a stored profile
+
+@st.cache_resource
+def get_profile_store():
+    # Off unless a [profile_store] section with a path is set in secrets.toml (path, maxsize)
+    settings = dict(st.secrets.get("profile_store", {}))
+    return ProfileStore(**settings) if settings.get("path") else None
 
 # Initializing and styling functions
 def initialize_session_state():
     if "profile" not in st.session_state:
-            st.session_state.profile = {
+            st.session_state.profile = restore_profile() or default_profile()
+    keep_profile_token()
+
+def default_profile():
+    # The profile of a new session; Macros and Micros are filled in on the Personal Information page
+    return {
                 "General": {
                     "Age": 25,
                     "Gender": "Male",
@@ -165,10 +183,65 @@ def initialize_session_state():
                 },
                 "other": {
                     "session_sidebar_checkbox": False,
-                    "recipe_df": None
+                    "recipe_df": None,
+                    "recipe_penalties": None,
+                    "portions_profile": None,
+                    "scoring_profile": None
                  }
         } 
 
+def scoring_profile():
+    # The compact Profile the scoring reads; built from the session profile once after every save,
+    # raises ValueError while the targets are missing
+    other = st.session_state.profile["other"]
+    if other.get("scoring_profile") is None:
+        other["scoring_profile"] = Profile.from_dict(st.session_state.profile)
+    return other["scoring_profile"]
+
+def save_profile():
+    # Call after writing targets or weights to the session profile: drops the compact Profile and,
+    # with the profile store enabled, persists the profile under the token of the session
+    st.session_state.profile["other"]["scoring_profile"] = None
+    store = get_profile_store()
+    if store is None:
+        return
+    try:
+        packed = scoring_profile().to_bytes()
+    except (KeyError, TypeError, ValueError):
+        packed = None  # no targets yet
+    if not st.session_state.get("profile_token"):
+        st.session_state.profile_token = new_token()
+    store.save(st.session_state.profile_token, st.session_state.profile, packed)
+    keep_profile_token()
+
+def restore_profile():
+    # The stored profile of the token in the URL, None without a store or for unknown tokens
+    token = st.query_params.get(PROFILE_TOKEN_PARAM)
+    store = get_profile_store() if token else None
+    if store is None:
+        return None
+    stored = store.load(token)
+    if stored is None:
+        return None
+
+    sections, packed = stored
+    profile = default_profile()
+    for section, values in sections.items():
+        profile[section].update(values)  # entries added to the defaults since the save are kept
+    if packed is not None:
+        try:
+            profile["other"]["scoring_profile"] = Profile.from_bytes(packed)
+        except ValueError:
+            pass  # stored with another metric layout, rebuilt from the sections on first use
+    st.session_state.profile_token = token
+    return profile
+
+def keep_profile_token():
+    # Switching pages drops the query string; put the token back so a reload still restores the profile
+    token = st.session_state.get("profile_token")
+    if token and st.query_params.get(PROFILE_TOKEN_PARAM) != token:
+        st.query_params[PROFILE_TOKEN_PARAM] = token
+
 def show_session_state_sidebar():
     # Use checkbox with stored value
     show_session_state = st.sidebar.checkbox(
@@ -186,3 +259,33 @@ def show_session_state_sidebar():
             st.sidebar.json(dict(st.session_state))
 
 
+
+
+def show_tracing_sidebar(tracer):
+    # Latency of the traced stages, only for admins and only when tracing is enabled
+    if not tracer.enabled or not is_admin():
+        return
+
+    snapshot = tracer.snapshot()
+    with st.sidebar.expander("⏱️ Performance", expanded=False):
+        if snapshot["recent_traces"]:
+            last = snapshot["recent_traces"][-1]
+            st.markdown(f"**Last run:** {last['duration_ms']:.0f} ms")
+            st.dataframe(pd.DataFrame({
+                "stage": ["\u2003" * span["depth"] + span["name"] for span in last["spans"]],
+                "ms": [span["ms"] for span in last["spans"]],
+            }), hide_index=True)
+
+        if snapshot["spans"]:
+            st.markdown("**All runs**")
+            columns = ["count", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+            st.dataframe(pd.DataFrame.from_dict(snapshot["spans"], orient="index")[columns])
+
+        st.download_button(
+            "Download metrics",
+            json.dumps(snapshot, indent=2),
+            file_name="find_recipe_metrics.json",
+            mime="application/json",
+        )
+        if st.button("Reset metrics"):
+            tracer.reset()
@@ -4,7 +4,7 @@ import numpy as np
 import plotly.graph_objects as go
 import matplotlib.pyplot as plt
 from functions import show_session_state_sidebar
-from functions import initialize_session_state
+from functions import initialize_session_state, save_profile
 from auth import check_auth
 
 check_auth()  # 🔐 Protect this page
@@ -143,6 +143,7 @@ with st.expander("Overall Weights", expanded=False, icon="⚖️"):
         if st.form_submit_button("Save"):
             st.session_state.profile['Weights']['Overall']['Environment'] = importance
             st.session_state.profile['Weights']['Overall']['Health'] = 100 - st.session_state.profile['Weights']['Overall']['Environment']
+            save_profile()
 
             with st.spinner():
                     st.success("Changes saved!")
@@ -163,6 +164,7 @@ with st.expander("Macro-Nutrients", expanded=False, icon="📊"):
                 st.session_state.profile['Importance']['Macros'][f'{key}'] = overall_preferences[key]
 
             adjust_weights_nutritional()
+            save_profile()
 
             with st.spinner():
                     st.success("Changes saved!")
@@ -184,6 +186,7 @@ with st.expander("Micro-Nutrients", expanded=False, icon="🥕"):
                 st.session_state.profile['Importance']['Micros'][f'{key}'] = overall_preferences[key]
 
             adjust_weights_nutritional()
+            save_profile()
 
             with st.spinner():
                     st.success("Changes saved!")
@@ -205,6 +208,7 @@ with st.expander("Environmental Aspects", expanded=False, icon="🌎"):
                 st.session_state.profile['Importance']['Environment'][f'{key}'] = overall_preferences[key]
 
             adjust_weights('Environment', 1)
+            save_profile()
 
             with st.spinner():
                     st.success("Changes saved!")
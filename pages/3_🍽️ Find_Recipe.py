@@ -1,15 +1,17 @@
 import streamlit as st
-from find_recipe import get_recipe
-from data.data_loader import load_recipes_data, load_ingredients_data
-import pandas as pd
-from functions import show_session_state_sidebar
-from functions import initialize_session_state
+from find_recipe import get_tracer, results_table, stream_recipe
+from resources import load_catalogue, load_recipe_attributes, load_food_choices, load_food_factors, load_ingredient_engine
+from retrieval import RetrievalError, search_prompt
+from data.data_loader import load_recipe_store, load_ingredient_store
+from functions import show_session_state_sidebar, show_tracing_sidebar
+from functions import initialize_session_state, scoring_profile
 from st_aggrid import AgGrid, GridOptionsBuilder, JsCode
 import ast
 import math
 import matplotlib.pyplot as plt
 import streamlit.components.v1 as components
 from auth import check_auth
+from scoring import FoodFactors, RecipeEdit, browse, difficulty_levels, greener_alternatives
 
 check_auth()  # 🔐 Protect this page
 
@@ -17,161 +19,25 @@ check_auth()  # 🔐 Protect this page
 st.markdown("# Find your Recipe")
 initialize_session_state()
 #show_session_state_sidebar()
+tracer = get_tracer()
+# A run cut short by st.stop(), st.rerun() or an error left its trace open: record it up to its last span
+unfinished = st.session_state.pop('page_trace', None)
+if unfinished is not None:
+    tracer.finish_trace(unfinished, end=unfinished.last)
+st.session_state.page_trace = tracer.start_trace("find_recipe.page")
 # ----------------------------------------------------------------------------------------------------
 # Load data
 # ----------------------------------------------------------------------------------------------------
-recipes_df = load_recipes_data()
-ingredients_df = load_ingredients_data()
+recipe_store = load_recipe_store()
+ingredient_store = load_ingredient_store()
+catalogue = load_catalogue()  # rows line up with recipe_store
+recipe_attributes = load_recipe_attributes()
 meals = st.session_state.profile['General']['Number_of_meals']
 macros = st.session_state.profile['Macros']
 micros = st.session_state.profile['Micros']
 environment = st.session_state.profile['Environment']
 weights = st.session_state.profile['Weights']
 
-# ----------------------------------------------------------------------------------------------------
-# Helper Functions - Calculations
-# ----------------------------------------------------------------------------------------------------
-# Macros
-def calculate_macros_interval_score(name, value):
-    weight = st.session_state.profile['Weights']['Macros'][name]
-    lower_bound = (st.session_state.profile['Macros'][name][0]) / meals
-    upper_bound = (st.session_state.profile['Macros'][name][1]) / meals
-    interval = upper_bound - lower_bound
-
-    # Check if the value is withing the interval, then it returns 1
-    if lower_bound <= value <= upper_bound:
-        return weight
-    
-    # Check if the value is below the lower bound of the interval
-    elif lower_bound > value:
-        return weight - min(weight, weight * ((lower_bound - value) / interval))
-        
-    else: 
-        return weight - min(weight, weight * ((value - upper_bound) / interval))
-
-# ----------------------------------------------------------------------------------------------------
-def calculate_macros_UL_score(name, value):
-    weight = st.session_state.profile['Weights']['Macros'][name]
-    upper_limit = (st.session_state.profile['Macros'][name])/ meals
-
-    if value <= upper_limit:
-        return weight
-    
-    else:
-        return weight - min(weight, weight * ((value - upper_limit) / upper_limit))
-
-# ----------------------------------------------------------------------------------------------------
-def calculate_macros_RDI_score(name, value):
-    weight = st.session_state.profile['Weights']['Macros'][name]
-    RDI = (st.session_state.profile['Macros'][name]) / meals
-
-    if value == RDI:
-        return weight
-
-    else:
-        deviation = abs((value - RDI) / RDI)
-        return weight - min(weight, weight * deviation)
-
-# ----------------------------------------------------------------------------------------------------
-# Micros
-def calculate_micros_UL_score(name, value):
-    weight = st.session_state.profile['Weights']['Micros'][name]
-    lower_bound = (st.session_state.profile['Micros'][name]) / meals # RDI
-    upper_bound = (st.session_state.profile['Micros'][f'{name} UL']) / meals # Tolerable Upper Limit
-    interval = upper_bound - lower_bound
-
-    # Case 1: Value is within the optimal range → full score
-    if lower_bound <= value <= upper_bound:
-        return weight
-
-    # Case 2: Value is below RDI → penalize based on how far below RDI (relative to RDI)
-    elif value < lower_bound:
-        deviation = (lower_bound - value) / lower_bound
-        return weight - min(weight, weight * deviation)
-
-    # Case 3: Value is above UL → penalize based on how far above UL (relative to interval)
-    else:
-        deviation = (value - upper_bound) / interval
-        return weight - min(weight, weight * deviation)
-
-# ----------------------------------------------------------------------------------------------------
-def calculate_micros_RDI_score(name, value):
-    weight = st.session_state.profile['Weights']['Micros'][name]
-    RDI = (st.session_state.profile['Micros'][name]) / meals
-
-    # Perfect match → full score
-    if value == RDI:
-        return weight
-
-    # Calculate proportional deviation (absolute)
-    deviation = abs(value - RDI) / RDI
-
-    # Apply penalty
-    return weight - min(weight, weight * deviation)
-
-# ----------------------------------------------------------------------------------------------------
-# Environment
-def calculate_environment_score(name, value):
-    weight = st.session_state.profile['Weights']['Environment'][name]
-    threshold = (st.session_state.profile['Environment'][name]) / meals
-
-    if value <= threshold:
-        return weight
-    
-    else:
-        return weight - min(weight, weight * ((value - threshold) / threshold))
-
-# ----------------------------------------------------------------------------------------------------
-# Total score
-def calculate_score(recipe_id):
-    health_contributions = {}
-    environmental_contributions = {}
-    recipe = recipes_df[recipes_df['recipe_id'] == recipe_id].iloc[0]
-
-    # Macros - Interval
-    health_contributions['Protein'] = calculate_macros_interval_score('Protein', recipe['protein'])
-    health_contributions['Fat'] = calculate_macros_interval_score('Fat', recipe['fat'])
-    health_contributions['Carbohydrates'] = calculate_macros_interval_score('Carbohydrates', recipe['carbs'])
-    # Macros - UL
-    health_contributions['Saturated Fat'] = calculate_macros_UL_score('Saturated Fat', recipe['saturates'])
-    health_contributions['Trans Fat'] = calculate_macros_UL_score('Trans Fat', recipe['Trans Fat (g)'])
-    health_contributions['Sugar'] = calculate_macros_UL_score('Sugar', recipe['sugars'])
-    # Macros - RDI
-    health_contributions['Fiber'] = calculate_macros_RDI_score('Fiber', recipe['fibre'])
-    # Micros - UL
-    health_contributions['Calcium'] = calculate_micros_UL_score('Calcium', recipe['Calcium (mg)'])
-    health_contributions['Iodine'] = calculate_micros_UL_score('Iodine', recipe['Iodine (µg)'])
-    health_contributions['Iron'] = calculate_micros_UL_score('Iron', recipe['Iron (mg)'])
-    health_contributions['Selenium'] = calculate_micros_UL_score('Selenium', recipe['Selenium (µg)'])
-    health_contributions['Zinc'] = calculate_micros_UL_score('Zinc', recipe['Zinc (mg)'])
-    health_contributions['Vitamin A'] = calculate_micros_UL_score('Vitamin A', recipe['Vitamin A RE (µg)'])
-    health_contributions['Vitamin D'] = calculate_micros_UL_score('Vitamin D', recipe['Vitamin D (µg)'])
-    health_contributions['Vitamin E'] = calculate_micros_UL_score('Vitamin E', recipe['Vitamin E (mg)'])
-    # Micros - RDI
-    health_contributions['Magnesium'] = calculate_micros_RDI_score('Magnesium', recipe['Magnesium (mg)'])
-    health_contributions['Salt'] = calculate_micros_RDI_score('Salt', recipe['salt'])
-    health_contributions['Vitamin B1'] = calculate_micros_RDI_score('Vitamin B1', recipe['Vitamin B1 (mg)'])
-    health_contributions['Vitamin B2'] = calculate_micros_RDI_score('Vitamin B2', recipe['Vitamin B2 (mg)'])
-    health_contributions['Vitamin B3'] = calculate_micros_RDI_score('Vitamin B3', recipe['Vitamin B3 (mg)'])
-    health_contributions['Vitamin B6'] = calculate_micros_RDI_score('Vitamin B6', recipe['Vitamin B6 (mg)'])
-    health_contributions['Vitamin B9'] = calculate_micros_RDI_score('Vitamin B9', recipe['Vitamin B9 (µg)'])
-    health_contributions['Vitamin B12'] = calculate_micros_RDI_score('Vitamin B12', recipe['Vitamin B12 (µg)'])
-    health_contributions['Vitamin C'] = calculate_micros_RDI_score('Vitamin C', recipe['Vitamin C (mg)'])
-    health_contributions['Vitamin K'] = calculate_micros_RDI_score('Vitamin K', recipe['Vitamin K (µg)'])
-    # Environment
-    environmental_contributions['Climate Change'] = calculate_environment_score('Climate Change', recipe['Total - Co2 eq'])
-    environmental_contributions['Ozone Layer Depletion'] = calculate_environment_score('Ozone Layer Depletion', recipe['Total - CFC11 eq'])
-    environmental_contributions['Particulate Matter'] = calculate_environment_score('Particulate Matter', recipe['Total - disease inc.'])
-    environmental_contributions['Toxicological Effects'] = calculate_environment_score('Toxicological Effects', recipe['Total - NC CTUh'])
-    environmental_contributions['Toxicological Effects (carcinogenic)'] = calculate_environment_score('Toxicological Effects (carcinogenic)', recipe['Total - C CTUh'])
-    environmental_contributions['Acidification'] = calculate_environment_score('Acidification', recipe['Total - mol H+ eq'])
-    environmental_contributions['Freshwater Eutrophication'] = calculate_environment_score('Freshwater Eutrophication', recipe['Total - P eq'])
-    environmental_contributions['Marine Eutrophication'] = calculate_environment_score('Marine Eutrophication', recipe['Total - N eq'])
-    environmental_contributions['Land Use'] = calculate_environment_score('Land Use', recipe['Total - pt dimensionless'])
-    environmental_contributions['Water Use'] = calculate_environment_score('Water Use', recipe['Total - m3'])
-    environmental_contributions['Energy Use'] = calculate_environment_score('Energy Use', recipe['Total - MJ'])
-    return health_contributions, environmental_contributions
-
 # ----------------------------------------------------------------------------------------------------
 # Helper Functions - HTML/Warning
 # ----------------------------------------------------------------------------------------------------
@@ -676,7 +542,8 @@ def render_warning_environmental(value, description, recipe_id):
     if value == 0:
         st.success(f"✅ All ingredients were able to be backed up by {description} data!")
     else:
-        missing_codes = ingredients_df[(ingredients_df['recipe_id'] == recipe_id) & (ingredients_df['Agribalyse Code'].isna())]
+        recipe_ingredients = ingredient_store.frame(ingredient_store.key_index('recipe_id').rows(recipe_id))
+        missing_codes = recipe_ingredients[recipe_ingredients['Agribalyse Code'].isna()]
         missing_codes['quantity'] = missing_codes['quantity'].fillna('')
         missing_ingredients_list = (missing_codes['quantity'].str.strip() + ' ' + missing_codes['ingredient'].str.strip()).str.strip().tolist()
         formatted_list = '\n- ' + '\n -'.join(missing_ingredients_list)
@@ -687,7 +554,8 @@ def render_warning_nutritional(value, description, recipe_id):
     if value == 0:
         st.success(f"✅ All ingredients were able to be backed up by {description} data!")
     else:
-        missing_codes = ingredients_df[(ingredients_df['recipe_id'] == recipe_id) & (ingredients_df['NEVO Code'].isna())]
+        recipe_ingredients = ingredient_store.frame(ingredient_store.key_index('recipe_id').rows(recipe_id))
+        missing_codes = recipe_ingredients[recipe_ingredients['NEVO Code'].isna()]
         missing_codes['quantity'] = missing_codes['quantity'].fillna('')
         missing_ingredients_list = (missing_codes['quantity'].str.strip() + ' ' + missing_codes['ingredient'].str.strip()).str.strip().tolist()
         formatted_list = '\n' + '\n'.join(f"- {item}" for item in missing_ingredients_list)
@@ -697,57 +565,138 @@ def render_warning_nutritional(value, description, recipe_id):
 # Beginning of the UI
 # ----------------------------------------------------------------------------------------------------
 
-def recipe_tab(input_value):
-    allergies_intolerances = f"""Please exclude any recipes containing ingredients I'm allergic or intolerant to.
-    Allergies & Intolerances: {st.session_state.profile['General']['Allergies_Intolerances']}, 
-    Make sure the recipes are completely free from these, including hidden or derivative ingredients."""
-
-    prompt = f"{input_value}. {allergies_intolerances}"
-
-    recipe_ids = get_recipe(prompt)
+def recipe_rows(recipe_ids):
     recipe_ids_int = []
     for rid in recipe_ids:
         try:
             recipe_ids_int.append(int(rid))
         except ValueError:
             pass  # or log/collect invalid ones if needed
-    results = []
     if not recipe_ids_int:
-        filtered_recipes = recipes_df[recipes_df['recipe_id'].isin(recipe_ids_int)]
-        # Iterate over all recipes
-        for _, recipe_row in filtered_recipes.iterrows():
-            recipe_id = recipe_row['recipe_id']
-            rating = float(recipe_row['Rating'])
-            title = recipe_row['Title']  # Make sure 'title' matches your actual column name
-    
-            try:
-                # Calculate scores
-                health_contributions, environmental_contributions = calculate_score(recipe_id)
-    
-                health_weight = st.session_state.profile['Weights']['Overall']['Health']
-                environment_weight = st.session_state.profile['Weights']['Overall']['Environment']
-    
-                health_score = (sum(health_contributions.values()) * 100)
-                environment_score = (sum(environmental_contributions.values()) * 100)
-                final_score = (health_weight / 100) * health_score + (environment_weight / 100) * environment_score
-    
-                # Append result
-                results.append({
-                    'recipe_id': recipe_id,
-                    'title': title,
-                    'rating': rating,
-                    'health_score': health_score,
-                    'environment_score': environment_score,
-                    'final_score': final_score
-                })
-    
-            except Exception as e:
-                st.warning(f"Skipping recipe {recipe_id} due to error: {e}")
-    
-        # Convert to DataFrame
-        df = pd.DataFrame(results)
-    
-        st.session_state.profile['other']['recipe_df'] = df
+        return None
+    return catalogue.rows(list(dict.fromkeys(recipe_ids_int)))
+
+def show_preview(placeholder, recipe_ids):
+    # The first matches, best first, while the remote search is still running; the grid replaces them
+    rows = recipe_rows(recipe_ids)
+    if rows is None:
+        return
+    try:
+        scores = catalogue.score(scoring_profile(), rows)
+    except ValueError:
+        return
+    table = results_table(recipe_store, rows, scores).sort_values('final_score', ascending=False)
+    with placeholder.container():
+        st.caption("⏳ First matches, more recipes are on their way...")
+        st.dataframe(
+            table[['title', 'rating', 'health_score', 'environment_score', 'final_score']],
+            hide_index=True,
+            column_config={
+                'title': "Title",
+                'rating': "User Rating",
+                'health_score': st.column_config.NumberColumn("Health Rating", format="%.0f"),
+                'environment_score': st.column_config.NumberColumn("Environment Rating", format="%.0f"),
+                'final_score': st.column_config.NumberColumn("Overall Rating", format="%.0f"),
+            },
+        )
+
+def recipe_tab(input_value):
+    prompt = search_prompt(input_value, st.session_state.profile['General']['Allergies_Intolerances'])
+
+    preview = st.empty()
+    recipe_ids = None
+    try:
+        for recipe_ids, final in stream_recipe(prompt):
+            if not final:
+                with tracer.span("recipe_tab.preview"):
+                    show_preview(preview, recipe_ids)
+    except RetrievalError as e:
+        if recipe_ids is None:
+            preview.empty()
+            st.error(f"{e}")
+            return
+        st.warning(f"{e} Showing the first matches only.")
+    preview.empty()
+
+    rows = recipe_rows(recipe_ids)
+    if rows is not None:
+        try:
+            # Calculate the scores of all recipes in one pass
+            with tracer.span("recipe_tab.score"):
+                profile = scoring_profile()
+                penalties, scores = catalogue.rescore(catalogue.penalties(profile, rows), profile)
+                portions = catalogue.portions(profile, rows)
+        except Exception as e:
+            st.warning(f"Could not score the recipes due to error: {e}")
+            return
+
+        st.session_state.profile['other']['recipe_penalties'] = penalties
+        st.session_state.profile['other']['portions_profile'] = profile
+        with tracer.span("recipe_tab.table"):
+            st.session_state.profile['other']['recipe_df'] = results_table(recipe_store, rows, scores, portions)
+
+def browse_tab(rank_by, cuisines, difficulties, max_prep_minutes, number_of_results):
+    try:
+        # Rank the whole catalogue, no search query needed
+        with tracer.span("browse_tab.score"):
+            profile = scoring_profile()
+            rows, scores = browse(
+                catalogue,
+                profile,
+                recipe_attributes,
+                k=number_of_results,
+                by=rank_by,
+                cuisines=cuisines,
+                difficulties=difficulties,
+                max_prep_minutes=max_prep_minutes,
+            )
+            portions = catalogue.portions(profile, rows)
+    except Exception as e:
+        st.warning(f"Could not score the recipes due to error: {e}")
+        return
+
+    st.session_state.profile['other']['recipe_penalties'] = catalogue.penalties(profile, rows)
+    st.session_state.profile['other']['portions_profile'] = profile
+    with tracer.span("browse_tab.table"):
+        st.session_state.profile['other']['recipe_df'] = results_table(recipe_store, rows, scores, portions)
+
+def refresh_scores(recipe_df):
+    # Weights edited on the Preferences page are applied to the current results without a new search:
+    # the cached penalties are re-weighted, which is a single matrix-vector product per score
+    penalties = st.session_state.profile['other'].get('recipe_penalties')
+    if recipe_df is None or penalties is None or len(penalties.rows) != len(recipe_df):
+        return recipe_df
+    try:
+        profile = scoring_profile()
+        penalties, scores = catalogue.rescore(penalties, profile)
+    except ValueError:
+        return recipe_df
+    st.session_state.profile['other']['recipe_penalties'] = penalties
+    recipe_df = recipe_df.assign(
+        health_score=scores.health_score,
+        environment_score=scores.environment_score,
+        final_score=scores.final_score
+    )
+    # The best portions only move when the profile does
+    if 'portion' in recipe_df and st.session_state.profile['other'].get('portions_profile') is not profile:
+        portions = catalogue.portions(profile, penalties.rows)
+        recipe_df = recipe_df.assign(portion=portions.multipliers, portion_score=portions.scores.final_score)
+        st.session_state.profile['other']['portions_profile'] = profile
+    st.session_state.profile['other']['recipe_df'] = recipe_df
+    return recipe_df
+
+def recipe_edit(recipe_id):
+    # Ingredient swaps of the selected recipe, kept until another recipe is selected
+    profile = scoring_profile()
+    edit = st.session_state.get('recipe_edit')
+    if edit is None or edit.row != catalogue.row(recipe_id):
+        row = catalogue.row(recipe_id)
+        recipe_ingredients = ingredient_store.frame(ingredient_store.key_index('recipe_id').rows(recipe_id))
+        edit = RecipeEdit(load_ingredient_engine(), catalogue, row, recipe_ingredients, profile)
+        st.session_state.recipe_edit = edit
+    elif edit.profile is not profile:
+        edit.rescore(profile)
+    return edit
 
 # ----------------------------------------------------------------------------------------------------
 # Find Recipe Form
@@ -765,10 +714,32 @@ with st.form("find_recipe_form"):
         else:
             recipe_tab(recipe_description)
 
+# ----------------------------------------------------------------------------------------------------
+# Browse Form
+# ----------------------------------------------------------------------------------------------------
+with st.expander("Browse the best recipes for me", icon="🏆"):
+    with st.form("browse_recipes_form"):
+        rank_options = {"Overall Rating": "final_score", "Health Rating": "health_score", "Environment Rating": "environment_score"}
+        rank_label = st.radio("Rank by", list(rank_options), horizontal=True)
+        browse_cuisines = st.multiselect("Cuisine", sorted(set(recipe_attributes.cuisine) - {""}))
+        browse_difficulties = st.multiselect("Difficulty", difficulty_levels(recipe_attributes))
+        browse_max_prep = st.slider("Maximum preparation time (min)", min_value=5, max_value=120, value=120, step=5)
+        browse_number = st.number_input("Number of recipes", min_value=5, max_value=100, value=20, step=5)
+
+        if st.form_submit_button("Show Recipes"):
+            browse_tab(
+                rank_options[rank_label],
+                browse_cuisines,
+                browse_difficulties,
+                None if browse_max_prep == 120 else browse_max_prep,  # 120 means no limit
+                browse_number,
+            )
+
 # ----------------------------------------------------------------------------------------------------
 # # Grid options
 # ----------------------------------------------------------------------------------------------------
-recipe_df = st.session_state.profile['other']['recipe_df']
+with tracer.span("grid.refresh_scores"):
+    recipe_df = refresh_scores(st.session_state.profile['other']['recipe_df'])
 if recipe_df is not None:
     st.info("""
             The table below shows you a collection of different recipes that matched with your prompt. 
@@ -780,43 +751,51 @@ if recipe_df is not None:
             All of the ratings are calculated based on your preferences, and range from 0 (worst) to 100 (best).
             """,  icon="ℹ️")
     
-    gb = GridOptionsBuilder.from_dataframe(recipe_df)
-    gb.configure_selection('single', use_checkbox=False)  # Single cell selection
-    gb.configure_grid_options(domLayout="normal")
-    gb.configure_pagination(enabled=True, paginationPageSize=5)
-    gb.configure_column("final_score", sort='desc')
-    # Set widths for specific columns
-    gb.configure_column("recipe_id", header_name="ID", width=70)
-    gb.configure_column("title", header_name="Title", width=250)
-    gb.configure_column("rating", header_name="User\nRating", width=80, headerTooltip="Actual user ratings, from 1 (worst) to 5 (best)")
-    gb.configure_column("health_score", valueFormatter="value.toFixed(0)", header_name="Health\nRating", width=120, headerTooltip="Nutritional rating, from 0 (worst) to 100 (best)")
-    gb.configure_column("environment_score", valueFormatter="value.toFixed(0)", header_name="Environment\nRating", width=140, headerTooltip="Environmental rating, from 0 (worst) to 100 (best)")
-    gb.configure_column("final_score", valueFormatter="value.toFixed(0)", header_name="Overall\nRating", width=120, headerTooltip="Combined rating (nutritional & environmental), from 0 (worst) to 100 (best)")
-    grid_options = gb.build()
-
-    grid_response = AgGrid(
-        recipe_df,
-        gridOptions=grid_options,
-        theme= 'streamlit',
-        update_mode='SELECTION_CHANGED',
-        enable_enterprise_modules=False,
-        fit_columns_on_grid_load=True,
-        reload_data=True,
-        allow_unsafe_jscode=True
-        )
+    with tracer.span("grid.render"):
+        gb = GridOptionsBuilder.from_dataframe(recipe_df)
+        gb.configure_selection('single', use_checkbox=False)  # Single cell selection
+        gb.configure_grid_options(domLayout="normal")
+        gb.configure_pagination(enabled=True, paginationPageSize=5)
+        gb.configure_column("final_score", sort='desc')
+        # Set widths for specific columns
+        gb.configure_column("recipe_id", header_name="ID", width=70)
+        gb.configure_column("title", header_name="Title", width=250)
+        gb.configure_column("rating", header_name="User\nRating", width=80, headerTooltip="Actual user ratings, from 1 (worst) to 5 (best)")
+        gb.configure_column("health_score", valueFormatter="value.toFixed(0)", header_name="Health\nRating", width=120, headerTooltip="Nutritional rating, from 0 (worst) to 100 (best)")
+        gb.configure_column("environment_score", valueFormatter="value.toFixed(0)", header_name="Environment\nRating", width=140, headerTooltip="Environmental rating, from 0 (worst) to 100 (best)")
+        gb.configure_column("final_score", valueFormatter="value.toFixed(0)", header_name="Overall\nRating", width=120, headerTooltip="Combined rating (nutritional & environmental), from 0 (worst) to 100 (best)")
+        if "portion" in recipe_df:
+            gb.configure_column("portion", valueFormatter="value.toFixed(2) + ' ×'", header_name="Best\nPortion", width=100, headerTooltip="The portion, in servings of the recipe, that fits your targets best")
+            gb.configure_column("portion_score", valueFormatter="value.toFixed(0)", header_name="Rating at\nBest Portion", width=120, headerTooltip="Overall rating when eating the best portion")
+        grid_options = gb.build()
+
+        grid_response = AgGrid(
+            recipe_df,
+            gridOptions=grid_options,
+            theme= 'streamlit',
+            update_mode='SELECTION_CHANGED',
+            enable_enterprise_modules=False,
+            fit_columns_on_grid_load=True,
+            reload_data=True,
+            allow_unsafe_jscode=True
+            )
 
     # Check if a row is selected
     selected_rows = grid_response['selected_rows']
 
     if selected_rows is not None and not selected_rows.empty:
         recipe_id = selected_rows['recipe_id'].values[0]
-        selected_recipe = recipes_df[recipes_df['recipe_id'] == recipe_id].iloc[0]
-        recipe_tab, nutrition_tab, environment_tab = st.tabs(['**🥘 Recipe**', '**🥗 Nutrition**', '**🌳 Environment**'])
+        with tracer.span("detail.record"):
+            selected_recipe = recipe_store.record(catalogue.row(recipe_id))
+        # Ingredient swaps are only offered with the published factor tables, see data/datasets/README.md
+        swaps_offered = load_ingredient_engine().is_published
+        tabs = st.tabs(['**🥘 Recipe**', '**🥗 Nutrition**', '**🌳 Environment**'] + (['**🔄 Swap Ingredients**'] if swaps_offered else []))
+        recipe_tab, nutrition_tab, environment_tab = tabs[:3]
 
 # ----------------------------------------------------------------------------------------------------
 # Recipe Tab
 # ----------------------------------------------------------------------------------------------------
-        with recipe_tab:
+        with recipe_tab, tracer.span("detail.recipe_tab"):
             image_url = selected_recipe['Image_url']
             recipe_name = selected_recipe['Title']
             serves = selected_recipe['Servings']
@@ -893,7 +872,7 @@ if recipe_df is not None:
 # ----------------------------------------------------------------------------------------------------
 # Nutrition Tab
 # ----------------------------------------------------------------------------------------------------
-        with nutrition_tab:
+        with nutrition_tab, tracer.span("detail.nutrition_tab"):
 
             with st.expander("📊 **How to read the bar charts?**"):
                 st.markdown("""
@@ -992,6 +971,9 @@ if recipe_df is not None:
                 This recipe contains <b>{kcal_recipe} kcal</b> per serving.
                 </div>
                 """, unsafe_allow_html=True)
+                if 'portion' in selected_rows:
+                    portion = float(selected_rows['portion'].values[0])
+                    st.caption(f"The portion that fits your targets best is {portion:.2f} servings, about {portion * kcal_recipe:.0f} kcal.")
 
             with st.expander("🥦 **Macro-Nutrients**"):
                 render_bar_macros_interval("Protein", "g", selected_recipe['protein'], macros['Protein'][0], macros['Protein'][1])
@@ -1028,7 +1010,7 @@ if recipe_df is not None:
 # ----------------------------------------------------------------------------------------------------
 # Environment Tab
 # ----------------------------------------------------------------------------------------------------
-        with environment_tab:
+        with environment_tab, tracer.span("detail.environment_tab"):
 
             with st.expander("📊 **How to read the bar charts?**"):
                 st.markdown("""
@@ -1136,7 +1118,71 @@ if recipe_df is not None:
             st.markdown("---")
             render_warning_environmental(selected_recipe['number_of_ingredients'] - selected_recipe['number_of_agribalyse_codes'], "environmental", recipe_id)
 
+# ----------------------------------------------------------------------------------------------------
+# Swap Ingredients Tab
+# ----------------------------------------------------------------------------------------------------
+        if swaps_offered:
+            with tabs[3], tracer.span("detail.substitute_tab"):
+                edit = recipe_edit(recipe_id)
+                foods = load_food_choices()
+
+                st.markdown("Swap or remove an ingredient, e.g. lentils instead of beef, and see right away how the ratings of this recipe change.")
+                with st.form("substitute_form"):
+                    position = st.selectbox(
+                        "Ingredient",
+                        range(len(edit.names)),
+                        format_func=lambda i: f"{edit.grams[i]:.0f} g {edit.names[i]}",
+                    )
+                    replacement = st.selectbox(
+                        "Replace with",
+                        [None] + foods,
+                        format_func=lambda food: "Nothing, remove it" if food is None else food.name,
+                    )
+                    grams = st.number_input("Amount (g)", min_value=0.0, value=0.0, step=10.0, help="Leave at 0 to keep the amount of the replaced ingredient")
+                    if st.form_submit_button("Apply"):
+                        edit.replace(position, replacement, grams or None)
+
+                if edit.edits and st.button("Undo all changes"):
+                    edit.reset()
+
+                # Greener alternatives, valid as long as the recipe is not edited otherwise; only with the Agribalyse table
+                greener_offered = FoodFactors.available(edit.engine)
+                if greener_offered and st.button("🌱 Find greener alternatives", help="Swaps of one or two ingredients by foods of the same kind that improve the environment rating without hurting the health rating much"):
+                    with tracer.span("detail.greener_alternatives"):
+                        st.session_state.greener_alternatives = (edit, tuple(edit.edits.items()), greener_alternatives(edit, load_food_factors()))
+                found = st.session_state.get('greener_alternatives') if greener_offered else None
+                if found is not None and found[0] is edit and found[1] == tuple(edit.edits.items()):
+                    listing = st.empty()
+                    with listing.container():
+                        if not found[2]:
+                            st.info("No greener variant of this recipe was found.", icon="ℹ️")
+                        for i, alternative in enumerate(found[2]):
+                            swaps = ", ".join(f"{edit.names[position]} → {food.name}" for position, food in alternative.swaps)
+                            col1, col2 = st.columns([4, 1])
+                            col1.markdown(f"**{swaps}**  \nEnvironment {alternative.scores.environment_score[0]:.0f} · Health {alternative.scores.health_score[0]:.0f} · Overall {alternative.scores.final_score[0]:.0f}")
+                            if col2.button("Use", key=f"greener_{i}"):
+                                for position, food in alternative.swaps:
+                                    edit.replace(position, food)
+                                st.session_state.greener_alternatives = None
+                                listing.empty()
+                                break
+
+                col1, col2, col3 = st.columns(3)
+                for column, label, field in ((col1, "Health Rating", "health_score"), (col2, "Environment Rating", "environment_score"), (col3, "Overall Rating", "final_score")):
+                    value, original = getattr(edit.scores, field)[0], getattr(edit.original_scores, field)[0]
+                    column.metric(label, f"{value:.0f}", delta=f"{value - original:+.1f}" if edit.edits else None)
+
+                for i, (food, amount) in sorted(edit.edits.items()):
+                    change = "removed" if food is None else f"→ {amount:.0f} g {food.name}"
+                    st.markdown(f"- ~~{edit.grams[i]:.0f} g {edit.names[i]}~~ {change}")
+
 elif st.session_state.profile['other']['recipe_df'] is None:
     st.write("")
 else:
     st.warning("Unfortunately, no recipes were found that fitted the recipe description. Please try again by altering the prompt. You could extend the description with more information, or try to search for another recipe.")
+
+# ----------------------------------------------------------------------------------------------------
+# Tracing
+# ----------------------------------------------------------------------------------------------------
+tracer.finish_trace(st.session_state.pop('page_trace', None))
+show_tracing_sidebar(tracer)
@@ -0,0 +1,95 @@
+import streamlit as st
+from auth import check_auth
+from data.data_loader import load_recipe_store
+from resources import load_catalogue, load_recipe_attributes
+from functions import initialize_session_state, scoring_profile
+from scoring.weekly import CLIMATE, DAYS, MAX_CUISINE_SHARE, REPEAT_GAP, WeekPlanner
+
+check_auth()  # 🔐 Protect this page
+
+initialize_session_state()
+
+# ----------------------------------------------------------------------------------------------------
+# Load data
+# ----------------------------------------------------------------------------------------------------
+recipe_store = load_recipe_store()
+catalogue = load_catalogue()  # rows line up with recipe_store
+recipe_attributes = load_recipe_attributes()
+
+st.title("Plan your week")
+
+st.markdown("Get a plan of one recipe per meal for the next seven days, chosen so that every day as a whole fits your nutritional targets as well as possible." \
+" Recipes do not come back within a few days, no single cuisine takes over the week, and the week stays within a budget of greenhouse gas emissions." \
+" Not happy with a meal? Swap it and only that meal is planned again.")
+
+try:
+    profile = scoring_profile()
+except ValueError as e:
+    st.warning(f"{e}")
+    st.stop()
+
+# ----------------------------------------------------------------------------------------------------
+# Plan Form
+# ----------------------------------------------------------------------------------------------------
+with st.form("weekly_plan_form"):
+    repeat_gap = st.slider("Days before a recipe may come back", min_value=1, max_value=DAYS, value=REPEAT_GAP)
+    cuisine_share = st.slider("Maximum share of one cuisine (%)", min_value=10, max_value=100, value=int(MAX_CUISINE_SHARE * 100), step=10)
+    climate_budget = st.number_input(
+        "Weekly climate budget (kg CO₂-eq)",
+        min_value=0.0,
+        value=float(round(DAYS * profile.bounds.upper[CLIMATE], 1)),
+        help="By default your daily Climate Change threshold times seven days",
+    )
+
+    if st.form_submit_button("Plan my week"):
+        with st.spinner("Planning your week..."):
+            planner = WeekPlanner(
+                catalogue,
+                profile,
+                recipe_attributes,
+                repeat_gap=repeat_gap,
+                max_cuisine_share=cuisine_share / 100,
+                climate_budget=climate_budget,
+            )
+            try:
+                st.session_state.week_plan = planner.plan()
+                st.session_state.week_planner = planner
+            except ValueError as e:
+                st.warning(f"Could not plan the week: {e}")
+
+# ----------------------------------------------------------------------------------------------------
+# Plan
+# ----------------------------------------------------------------------------------------------------
+planner = st.session_state.get("week_planner")
+plan = st.session_state.get("week_plan")
+if planner is not None and planner.profile is not profile:
+    st.info("Your profile changed since this plan was made, plan your week again to use it.", icon="ℹ️")
+
+if plan is not None:
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Average daily rating", f"{plan.average_score:.0f}")
+    col2.metric("Climate Change (kg CO₂-eq)", f"{plan.climate_total:.1f}", delta=f"{plan.climate_total - planner.climate_budget:.1f} vs. budget", delta_color="inverse")
+    col3.metric("Different recipes", len(set(plan.recipe_ids.ravel().tolist())))
+    if not plan.complete:
+        st.caption("Parts of the plan were filled in quickly to stay responsive.")
+    if not planner.budget_feasible:
+        st.warning(f"No week of recipes fits a climate budget of {planner.climate_budget:.1f} kg CO₂-eq, the lowest possible is about {planner.climate_floor:.1f} kg CO₂-eq." \
+        " The plan follows your nutritional targets instead, raise the budget to keep the emissions in check.")
+
+    titles = recipe_store.frame(plan.rows.ravel(), columns=["Title"])["Title"].to_numpy().reshape(plan.rows.shape)
+    cuisines = recipe_attributes.cuisine[plan.rows]
+    for day in range(len(plan.rows)):
+        st.subheader(f"Day {day + 1}")
+        st.caption(f"Rating {plan.scores.final_score[day]:.0f} · Health {plan.scores.health_score[day]:.0f} · Environment {plan.scores.environment_score[day]:.0f} · {plan.totals[day, CLIMATE]:.2f} kg CO₂-eq")
+        columns = st.columns(len(plan.rows[day]))
+        for meal, column in enumerate(columns):
+            with column:
+                st.markdown(f"**{titles[day, meal]}**")
+                st.caption(f"ID {plan.recipe_ids[day, meal]} · {cuisines[day, meal] or 'Unknown cuisine'}")
+                if st.button("Swap", key=f"swap_{day}_{meal}"):
+                    try:
+                        st.session_state.week_plan = planner.swap(plan, day, meal)
+                    except ValueError as e:
+                        st.warning(f"{e}")
+                    else:
+                        st.rerun()
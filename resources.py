@@ -0,0 +1,63 @@
+import os
+import numpy as np
+import streamlit as st
+from data.data_loader import (
+    AGRIBALYSE_FACTORS,
+    NEVO_FACTORS,
+    load_ingredient_store,
+    load_recipe_store,
+    read_micro_nutrient_reference,
+)
+from retrieval.local_index import DESCRIPTIONS_PATH, parse_descriptions
+from scoring import Catalogue, FoodFactors, IngredientEngine, MicronutrientTable, attributes_from_descriptions, food_choices
+from scoring.ingredients import AGRIBALYSE_CODE, AGRIBALYSE_PER_GRAMS, NEVO_CODE, NEVO_PER_GRAMS, read_factor_table
+
+# ----------------------------------------------------------------------------------------------------
+# Catalogue
+# ----------------------------------------------------------------------------------------------------
+# The scoring structures the pages share, assembled once per process from the files data.data_loader reads
+@st.cache_resource
+def load_micronutrient_table():
+    # Compiled once per process, target lookups on save are then a bisect and a row copy
+    return MicronutrientTable.from_frame(read_micro_nutrient_reference())
+
+
+def read_factor_tables():
+    # (NEVO table, Agribalyse table), None for a table that is not part of the checkout
+    return (
+        read_factor_table(NEVO_FACTORS, NEVO_CODE, NEVO_PER_GRAMS),
+        read_factor_table(AGRIBALYSE_FACTORS, AGRIBALYSE_CODE, AGRIBALYSE_PER_GRAMS),
+    )
+
+
+@st.cache_resource
+def load_ingredient_engine():
+    # Published factor tables only: without them ingredient swaps are not offered (see RecipeEdit)
+    return IngredientEngine.from_stores(load_recipe_store(), load_ingredient_store(), *read_factor_tables())
+
+
+@st.cache_resource
+def load_food_choices():
+    store = load_ingredient_store()
+    return food_choices(store.frame(np.arange(len(store)), columns=["ingredient", NEVO_CODE, AGRIBALYSE_CODE]))
+
+
+@st.cache_resource
+def load_food_factors():
+    # Per-category factor vectors of the replacement foods, for the greener alternative search
+    return FoodFactors(load_ingredient_engine(), load_food_choices())
+
+
+@st.cache_resource
+def load_catalogue():
+    catalogue = Catalogue.from_store(load_recipe_store())
+    # With factor tables in place the totals follow the ingredient rows instead of the spreadsheet
+    if os.path.exists(NEVO_FACTORS) or os.path.exists(AGRIBALYSE_FACTORS):
+        catalogue = load_ingredient_engine().recompute(catalogue)
+    return catalogue
+
+
+@st.cache_resource
+def load_recipe_attributes():
+    # Cuisine, difficulty and prep time per catalogue row, for the browse filters
+    return attributes_from_descriptions(load_catalogue().recipe_ids, parse_descriptions(DESCRIPTIONS_PATH))
@@ -0,0 +1,24 @@
+from retrieval.cache import QueryCache, normalize_text, query_cache_key
+from retrieval.client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LANGFLOW_URL,
+    LangflowClient,
+    RetrievalError,
+    RetrievalHTTPError,
+    RetrievalResponseError,
+    RetrievalTimeout,
+    extract_flow_text,
+    langflow_payload,
+)
+from retrieval.fanout import (
+    FANOUT_DEADLINE,
+    AsyncLangflowClient,
+    EventLoopThread,
+    FanOutResult,
+    fan_out,
+    fan_out_stream,
+    reciprocal_rank_fusion,
+    search_local,
+)
+from retrieval.local_index import RecipeIndex, get_recipe_local, load_index, search_prompt, split_prompt
@@ -0,0 +1,113 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from retrieval.local_index import split_prompt
+
+DEFAULT_MAXSIZE = 512
+DEFAULT_TTL = 24 * 60 * 60  # seconds
+
+
+# ----------------------------------------------------------------------------------------------------
+# Keys
+# ----------------------------------------------------------------------------------------------------
+def normalize_text(text):
+    # Case, punctuation and whitespace differences should not produce different searches
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def query_cache_key(prompt, backend, number_of_results):
+    """
+    Key for a prompt built by recipe_tab: the normalized search text, the allergies in sorted order,
+    the backend and the number of requested results.
+    """
+    query, excluded = split_prompt(prompt)
+    return json.dumps([backend, number_of_results, normalize_text(query), sorted(excluded)])
+
+
+# ----------------------------------------------------------------------------------------------------
+# Cache
+# ----------------------------------------------------------------------------------------------------
+class QueryCache:
+    """
+    In-memory LRU cache with a time-to-live for retrieval results.
+    When `path` is given, entries are also written to a SQLite table, so they survive restarts
+    and are shared between the processes on one host.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM query_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self.hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires_at),
+                )
+                self._db.execute("DELETE FROM query_cache WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+
+    def _remember(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM query_cache")
+                self._db.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
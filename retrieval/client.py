@@ -0,0 +1,188 @@
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import TimeoutError as Urllib3TimeoutError
+from urllib3.util.retry import Retry
+
+# The complete API endpoint URL of the recipe search flow
+LANGFLOW_URL = "https://api.langflow.astra.datastax.com/lf/9e953ffc-8d4e-419e-bec2-1b07048aa540/api/v1/run/13f59e80-cd3e-4166-b7a8-a8514b8d2592"
+
+CONNECT_TIMEOUT = 3.05  # seconds to establish the TCP/TLS connection
+READ_TIMEOUT = 20.0     # seconds to wait for the flow to answer
+MAX_RETRIES = 2
+BACKOFF_FACTOR = 0.5    # 0.5s, 1s, 2s, ... between retries
+BACKOFF_MAX = 4.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+# ----------------------------------------------------------------------------------------------------
+# Errors
+# ----------------------------------------------------------------------------------------------------
+class RetrievalError(Exception):
+    """Base class for every failure of a retrieval backend."""
+
+class RetrievalTimeout(RetrievalError):
+    pass
+
+class RetrievalHTTPError(RetrievalError):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class RetrievalResponseError(RetrievalError):
+    """The backend answered, but the response could not be parsed."""
+
+class CircuitOpenError(RetrievalError):
+    """Calls are short-circuited because the backend failed repeatedly."""
+
+
+# ----------------------------------------------------------------------------------------------------
+# Circuit breaker
+# ----------------------------------------------------------------------------------------------------
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for `reset_timeout` seconds.
+    After that a single trial call is let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+# ----------------------------------------------------------------------------------------------------
+# Langflow client
+# ----------------------------------------------------------------------------------------------------
+class LangflowClient:
+    """
+    Calls the Langflow flow over a pooled keep-alive session with bounded timeouts and retries.
+    """
+
+    def __init__(self, url, token, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR, pool_maxsize=10, breaker=None):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker or CircuitBreaker()
+        self.pool_maxsize = pool_maxsize
+        # Upper bound of one run: every attempt times out and every retry backs off the longest
+        self.max_duration = (max_retries + 1) * (connect_timeout + read_timeout) + max_retries * BACKOFF_MAX
+
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_max=BACKOFF_MAX,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"POST"}),  # the flow only reads, so retrying is safe
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": token,
+        })
+
+    def run(self, input_value, number_of_results=20):
+        """
+        Send the prompt to the flow and return the recipe IDs it found, as strings.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError("Recipe search is temporarily unavailable, please try again in a moment")
+        try:
+            return self._run(input_value, number_of_results)
+        except RetrievalError:
+            raise  # already counted by the breaker
+        except BaseException:
+            # Anything unexpected still settles the call, or a half-open trial would stay running and
+            # keep the circuit open for good
+            self.breaker.record_failure()
+            raise
+
+    def _run(self, input_value, number_of_results):
+        # Records the outcome with the breaker before raising a RetrievalError or returning
+        try:
+            response = self.session.post(self.url, json=langflow_payload(input_value, number_of_results), timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            self.breaker.record_failure()
+            if is_timeout(e):
+                raise RetrievalTimeout(f"Recipe search timed out: {e}") from e
+            raise RetrievalError(f"Error making API request: {e}") from e
+
+        if not response.ok:
+            # Only server-side trouble counts towards opening the circuit; a 4xx means the flow is up
+            if response.status_code >= 500 or response.status_code == 429:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise RetrievalHTTPError(f"Recipe search failed with status {response.status_code}", response.status_code)
+
+        try:
+            recipe_ids = parse_recipe_ids(extract_flow_text(response.json()))
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            self.breaker.record_failure()
+            raise RetrievalResponseError(f"Error parsing response: {e}") from e
+
+        self.breaker.record_success()
+        return recipe_ids
+
+
+def langflow_payload(input_value, number_of_results):
+    return {
+        "input_value": input_value,  # The input value to be processed by the flow
+        "output_type": "text",  # Specifies the expected output format
+        "input_type": "text",  # Specifies the input format
+        "tweaks": {
+            "AstraDB-0kWRk": {
+                "number_of_results": number_of_results
+            }
+        }
+    }
+
+
+def extract_flow_text(data):
+    return data['outputs'][0]['outputs'][0]['results']['text']['data']['text']
+
+
+def is_timeout(error):
+    # Once retries are exhausted, requests wraps read timeouts in a ConnectionError(MaxRetryError)
+    if isinstance(error, requests.exceptions.Timeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, Urllib3TimeoutError)
+
+
+def parse_recipe_ids(text):
+    recipe_ids = text.split(",")
+    return [x.strip() for x in recipe_ids if x.strip()]
@@ -0,0 +1,237 @@
+import asyncio
+import queue
+import threading
+from typing import NamedTuple
+
+import httpx
+
+from retrieval.client import (
+    BACKOFF_FACTOR,
+    BACKOFF_MAX,
+    CONNECT_TIMEOUT,
+    MAX_RETRIES,
+    READ_TIMEOUT,
+    RETRY_STATUSES,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetrievalError,
+    RetrievalHTTPError,
+    RetrievalResponseError,
+    RetrievalTimeout,
+    extract_flow_text,
+    langflow_payload,
+    parse_recipe_ids,
+)
+from retrieval.local_index import get_recipe_local
+
+FANOUT_DEADLINE = 8.0  # seconds for the whole fan-out, slower backends are dropped
+RRF_K = 60
+
+
+# ----------------------------------------------------------------------------------------------------
+# Async Langflow client
+# ----------------------------------------------------------------------------------------------------
+class AsyncLangflowClient:
+    """
+    asyncio counterpart of LangflowClient, built on a pooled httpx.AsyncClient.
+    All calls must run on the same event loop (see EventLoopThread).
+    """
+
+    def __init__(self, url, token, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR, pool_maxsize=10, breaker=None, transport=None):
+        self.url = url
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.breaker = breaker or CircuitBreaker()
+        self.client = httpx.AsyncClient(
+            headers={"Content-Type": "application/json", "Authorization": token},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize),
+            transport=transport,  # e.g. httpx.ASGITransport(stub) in tests
+        )
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def post(self, payload):
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await self.client.post(self.url, json=payload)
+            except httpx.TimeoutException as e:
+                if last_attempt:
+                    raise RetrievalTimeout(f"Recipe search timed out: {e!r}") from e
+            except httpx.HTTPError as e:
+                if last_attempt:
+                    raise RetrievalError(f"Error making API request: {e!r}") from e
+            else:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    return response
+            await asyncio.sleep(min(self.backoff_factor * 2 ** attempt, BACKOFF_MAX))
+
+    async def run(self, input_value, number_of_results=20):
+        """
+        Send the prompt to the flow and return the recipe IDs it found, as strings.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError("Recipe search is temporarily unavailable, please try again in a moment")
+        try:
+            return await self._run(input_value, number_of_results)
+        except RetrievalError:
+            raise  # already counted by the breaker
+        except BaseException:
+            # Cancelled at the fan-out deadline, which counts as a failure of a slow backend, or anything
+            # unexpected: either way the call is settled, so a half-open trial never stays running
+            self.breaker.record_failure()
+            raise
+
+    async def _run(self, input_value, number_of_results):
+        # Records the outcome with the breaker before raising a RetrievalError or returning
+        try:
+            response = await self.post(langflow_payload(input_value, number_of_results))
+        except RetrievalError:
+            self.breaker.record_failure()
+            raise
+
+        if response.is_error:
+            if response.status_code >= 500 or response.status_code == 429:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise RetrievalHTTPError(f"Recipe search failed with status {response.status_code}", response.status_code)
+
+        try:
+            recipe_ids = parse_recipe_ids(extract_flow_text(response.json()))
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            self.breaker.record_failure()
+            raise RetrievalResponseError(f"Error parsing response: {e}") from e
+
+        self.breaker.record_success()
+        return recipe_ids
+
+
+async def search_local(input_value, number_of_results=20):
+    # The BM25 search is CPU-bound, so it runs in a worker thread to keep the loop free
+    return await asyncio.to_thread(get_recipe_local, input_value, number_of_results)
+
+
+# ----------------------------------------------------------------------------------------------------
+# Fan-out
+# ----------------------------------------------------------------------------------------------------
+class FanOutResult(NamedTuple):
+    recipe_ids: list
+    completed: dict  # backend name -> recipe IDs it returned
+    failed: dict     # backend name -> error, or "deadline" when it was dropped
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """
+    Merge ranked ID lists; every list adds 1 / (k + rank) to the IDs it contains.
+    Ties keep the order in which the IDs were first seen.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, recipe_id in enumerate(ranking, start=1):
+            scores[recipe_id] = scores.get(recipe_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+async def fan_out_stream(input_value, backends, deadline=FANOUT_DEADLINE, number_of_results=20):
+    """
+    Query all backends concurrently and yield the fused ranking of the backends that answered so far
+    every time one of them answers, so a caller can show the fast results while the slow backends
+    are in flight. The last FanOutResult is the complete one, every backend is then either in
+    `completed` or in `failed`; a RetrievalError is raised instead when none of them answered.
+    """
+    loop = asyncio.get_running_loop()
+    end = loop.time() + deadline
+    tasks = {asyncio.create_task(search(input_value)): name for name, search in backends.items()}
+    pending = set(tasks)
+    completed, failed = {}, {}
+
+    def fused():
+        # In backend order, so the fusion does not depend on which backend happened to answer first
+        return reciprocal_rank_fusion([completed[name] for name in backends if name in completed])[:number_of_results]
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0.0, end - loop.time()), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            answered = False
+            for task in done:
+                if task.exception() is not None:
+                    failed[tasks[task]] = task.exception()
+                else:
+                    completed[tasks[task]] = task.result()
+                    answered = True
+            if pending and answered:
+                yield FanOutResult(fused(), dict(completed), dict(failed))
+    finally:
+        for task in pending:
+            task.cancel()
+
+    for task in pending:
+        failed[tasks[task]] = "deadline"
+    if not completed:
+        if all(error == "deadline" or isinstance(error, RetrievalTimeout) for error in failed.values()):
+            raise RetrievalTimeout(f"No recipe search backend answered within {deadline:.1f}s")
+        raise RetrievalError(f"All recipe search backends failed: {failed}")
+    yield FanOutResult(fused(), {name: completed[name] for name in backends if name in completed}, failed)
+
+
+async def fan_out(input_value, backends, deadline=FANOUT_DEADLINE, number_of_results=20):
+    """
+    Query all backends concurrently and fuse their rankings.
+    `backends` maps a name to an async function taking the prompt. Backends that fail or miss the
+    deadline are left out; a RetrievalError is raised only when none of them answered.
+    """
+    async for result in fan_out_stream(input_value, backends, deadline, number_of_results):
+        pass
+    return result
+
+
+# ----------------------------------------------------------------------------------------------------
+# Event loop for synchronous callers
+# ----------------------------------------------------------------------------------------------------
+class EventLoopThread:
+    """
+    A long-lived event loop in a daemon thread, so Streamlit's synchronous script threads can run
+    coroutines on it and the async clients keep their connection pools between searches.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="retrieval-loop", daemon=True)
+        self.thread.start()
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def iterate(self, stream):
+        """
+        Run an async generator on the loop and yield its items as they arrive. Stopping early
+        cancels the generator, and with it the searches it still waits for.
+        """
+        items = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in stream:
+                    items.put((item, None))
+            except Exception as e:
+                items.put((None, e))
+                return
+            items.put((None, StopIteration()))
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while True:
+                item, error = items.get()
+                if isinstance(error, StopIteration):
+                    return
+                if error is not None:
+                    raise error
+                yield item
+        finally:
+            future.cancel()
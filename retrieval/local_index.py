@@ -0,0 +1,166 @@
+import re
+import numpy as np
+from functools import lru_cache
+
+DESCRIPTIONS_PATH = "data/datasets/final_recipes_descriptions.txt"
+
+# Fields of a description block that are indexed, with how often they are repeated (a simple field boost)
+INDEXED_FIELDS = {
+    "Title": 3,
+    "Description": 1,
+    "Ingredients": 2,
+    "Cuisine": 2,
+    "Difficulty": 1,
+    "Tags": 1,
+}
+
+STOPWORDS = {
+    "a", "an", "and", "any", "are", "as", "at", "be", "but", "by", "can", "containing", "cuisine", "dish", "for",
+    "from", "give", "have", "i", "in", "including", "into", "is", "it", "least", "less", "like", "make", "me",
+    "meal", "more", "most", "my", "of", "on", "or", "please", "recipe", "recipes", "show", "some", "something",
+    "sure", "than", "that", "the", "these", "this", "to", "want", "which", "with", "would", "you",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+ALLERGY_PATTERN = re.compile(r"Allergies & Intolerances:([^\n]*)")
+BOILERPLATE_MARKER = "Please exclude any recipes"
+
+
+# ----------------------------------------------------------------------------------------------------
+# Parsing
+# ----------------------------------------------------------------------------------------------------
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        # Light plural folding, so "tomatoes" matches "tomato" and "eggs" matches "egg"
+        if len(token) > 4 and token.endswith("es") and token[-3] in "osx":
+            token = token[:-2]
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def parse_descriptions(path):
+    """
+    Split the descriptions file into one dict of fields per recipe block.
+    """
+    with open(path, encoding="utf-8-sig") as f:
+        blocks = f.read().split("\n---\n")
+
+    recipes = []
+    for block in blocks:
+        fields = {}
+        for line in block.strip().splitlines():
+            # Lines like "Rating: 4.6/5, Difficulty: Easy" hold several fields
+            for part in re.split(r", (?=[A-Z][a-z ]+: )", line):
+                key, _, value = part.partition(":")
+                fields[key.strip()] = value.strip()
+        if "Recipe ID" in fields:
+            recipes.append(fields)
+    return recipes
+
+
+def search_prompt(description, allergies_intolerances=""):
+    """
+    The prompt sent to the retrieval backends: the recipe description plus the allergy instructions.
+    """
+    return f"""{description}. {BOILERPLATE_MARKER} containing ingredients I'm allergic or intolerant to.
+    Allergies & Intolerances: {allergies_intolerances}, 
+    Make sure the recipes are completely free from these, including hidden or derivative ingredients."""
+
+
+def split_prompt(prompt):
+    """
+    Separate the search text from the allergy boilerplate that recipe_tab appends.
+    Returns the query and the set of tokens a recipe must not contain.
+    """
+    excluded = set()
+    match = ALLERGY_PATTERN.search(prompt)
+    if match:
+        excluded = set(tokenize(match.group(1)))
+    query = prompt.split(BOILERPLATE_MARKER, 1)[0]
+    return query, excluded
+
+
+# ----------------------------------------------------------------------------------------------------
+# BM25 index
+# ----------------------------------------------------------------------------------------------------
+class RecipeIndex:
+    """
+    In-process BM25 index over the recipe description blocks.
+    Postings are kept in CSR layout: the documents of term t are doc_ids[indptr[t]:indptr[t + 1]].
+    """
+
+    def __init__(self, recipes, k1=1.5, b=0.75):
+        self.recipe_ids = np.array([r["Recipe ID"] for r in recipes])
+        self.k1 = k1
+        self.b = b
+
+        vocabulary = {}
+        term_docs = []
+        ingredient_terms = []
+        doc_lengths = np.zeros(len(recipes), dtype=np.float64)
+        for doc, recipe in enumerate(recipes):
+            counts = {}
+            for field, boost in INDEXED_FIELDS.items():
+                for token in tokenize(recipe.get(field, "")):
+                    counts[token] = counts.get(token, 0) + boost
+            doc_lengths[doc] = sum(counts.values())
+            for token, count in counts.items():
+                term = vocabulary.setdefault(token, len(vocabulary))
+                term_docs.append((term, doc, count))
+            ingredient_terms.append(set(tokenize(recipe.get("Ingredients", ""))))
+
+        term_docs.sort()
+        terms = np.array([t for t, _, _ in term_docs], dtype=np.int64)
+        self.vocabulary = vocabulary
+        self.doc_ids = np.array([d for _, d, _ in term_docs], dtype=np.int64)
+        self.term_freqs = np.array([c for _, _, c in term_docs], dtype=np.float64)
+        self.indptr = np.searchsorted(terms, np.arange(len(vocabulary) + 1))
+        self.ingredient_terms = ingredient_terms
+
+        n_docs = len(recipes)
+        doc_freqs = np.diff(self.indptr)
+        self.idf = np.log(1 + (n_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        self.length_norm = k1 * (1 - b + b * doc_lengths / max(doc_lengths.mean(), 1.0))
+
+    def scores(self, tokens):
+        scores = np.zeros(len(self.recipe_ids), dtype=np.float64)
+        for token in set(tokens):
+            term = self.vocabulary.get(token)
+            if term is None:
+                continue
+            start, end = self.indptr[term], self.indptr[term + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.term_freqs[start:end]
+            scores[docs] += self.idf[term] * tf * (self.k1 + 1) / (tf + self.length_norm[docs])
+        return scores
+
+    def search(self, prompt, number_of_results=20):
+        """
+        Top-N recipe IDs (as strings, like the remote flow returns them) for a prompt.
+        """
+        query, excluded = split_prompt(prompt)
+        scores = self.scores(tokenize(query))
+        if excluded:
+            blocked = [doc for doc, terms in enumerate(self.ingredient_terms) if terms & excluded]
+            scores[blocked] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > number_of_results:
+            top = np.argpartition(-scores[candidates], number_of_results - 1)[:number_of_results]
+            candidates = candidates[top]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return self.recipe_ids[ranked].tolist()
+
+
+@lru_cache(maxsize=None)
+def load_index(path=DESCRIPTIONS_PATH):
+    return RecipeIndex(parse_descriptions(path))
+
+
+def get_recipe_local(input_value, number_of_results=20):
+    return load_index().search(input_value, number_of_results)
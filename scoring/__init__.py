@@ -0,0 +1,40 @@
+from scoring.catalogue import Catalogue, RowPenalties, score, targets_fingerprint
+from scoring.engine import (
+    ENVIRONMENT_METRICS,
+    HEALTH_METRICS,
+    METRIC_INDEX,
+    METRICS,
+    SCORING_COLUMNS,
+    ScoreResult,
+    TargetBounds,
+    build_targets,
+    build_weights,
+    daily_bounds,
+    penalty_matrix,
+    per_meal_targets,
+    score_matrix,
+    score_penalties,
+    score_recipes,
+)
+from scoring.ingredients import FactorTable, FoodMatrix, IngredientEngine, read_factor_table
+from scoring.planner import MealPlan, candidate_pool, plan_meals
+from scoring.portions import Portions, best_portions
+from scoring.profile import Profile, as_profile
+from scoring.targets import (
+    MicronutrientTable,
+    calculate_Macros,
+    daily_targets,
+    get_micronutrient_targets,
+    profile_targets,
+)
+from scoring.ranking import (
+    RANK_KEYS,
+    RecipeAttributes,
+    attributes_from_descriptions,
+    browse,
+    difficulty_levels,
+    filter_mask,
+    top_k,
+)
+from scoring.substitution import Alternative, Food, FoodFactors, RecipeEdit, food_choices, greener_alternatives
+from scoring.weekly import WeekPlan, WeekPlanner
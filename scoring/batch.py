@@ -0,0 +1,265 @@
+import argparse
+import base64
+import binascii
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data.recipe_store import ColumnStore, store_exists
+from scoring.catalogue import Catalogue
+from scoring.profile import Profile
+from scoring.ranking import RANK_KEYS, top_k
+
+# Offline scoring of many user profiles against the whole catalogue, e.g. for digests or cache warming:
+#
+#   python -m scoring.batch profiles.jsonl --output top_recipes.parquet --top-k 20 --workers 8
+#
+# Every input line is {"profile_id": ..., "profile": {...}} with the profile in the session layout
+# (General, Macros, Micros, Environment, Weights), or {"profile_id": ..., "packed": "<base64>"} with the
+# base64 of Profile.to_bytes(), which skips the dict conversion. Re-running the same command after a crash skips the
+# profiles that are already in the output.
+
+STORE_PATH = os.path.join("data", "cache", "final_recipes_store")  # built by `python -m data.data_loader`
+CHUNK_SIZE = 64            # profiles per task sent to a worker
+PARQUET_PART_ROWS = 1024   # profiles per Parquet part file
+PROGRESS_INTERVAL = 5.0    # seconds between progress lines
+
+catalogue = None  # one per worker process, see init_worker
+
+
+# ----------------------------------------------------------------------------------------------------
+# Input
+# ----------------------------------------------------------------------------------------------------
+def read_profiles(path, skip=frozenset()):
+    """
+    Yield (profile_id, profile dict or packed bytes) from a JSONL file, "-" reads stdin.
+    Unreadable lines are yielded with a None profile so they are reported as failures.
+    """
+    handle = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                packed = base64.b64decode(entry["packed"], validate=True) if "packed" in entry else None
+            except (json.JSONDecodeError, binascii.Error, TypeError):
+                yield f"line {number}", None
+                continue
+            profile_id = str(entry.get("profile_id", number))
+            if profile_id not in skip:
+                yield profile_id, packed if packed is not None else entry.get("profile", entry)
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# ----------------------------------------------------------------------------------------------------
+# Scoring (runs in the workers)
+# ----------------------------------------------------------------------------------------------------
+def init_worker(store_path):
+    # The store is memory-mapped, so every worker shares the page cache instead of a pickled copy
+    global catalogue
+    catalogue = Catalogue.from_store(ColumnStore(store_path))
+
+
+def score_chunk(chunk, k, by):
+    """
+    Top-k recipes of every profile in the chunk. Returns (results, failures).
+    """
+    results, failures = [], []
+    for profile_id, profile in chunk:
+        try:
+            profile = Profile.from_bytes(profile) if isinstance(profile, bytes) else Profile.from_dict(profile)
+            scores = catalogue.score(profile)
+        except (KeyError, TypeError, ValueError, ZeroDivisionError) as e:
+            failures.append((profile_id, repr(e)))
+            continue
+        best = top_k(getattr(scores, by), k)
+        results.append({
+            "profile_id": profile_id,
+            "recipe_ids": scores.recipe_ids[best].tolist(),
+            "final_score": scores.final_score[best].tolist(),
+            "health_score": scores.health_score[best].tolist(),
+            "environment_score": scores.environment_score[best].tolist(),
+        })
+    return results, failures
+
+
+# ----------------------------------------------------------------------------------------------------
+# Output
+# ----------------------------------------------------------------------------------------------------
+class JsonlWriter:
+    """
+    One line per profile, appended and flushed after every chunk.
+    """
+
+    def __init__(self, path, overwrite=False):
+        self.path = path
+        if overwrite and os.path.exists(path):
+            os.remove(path)
+        self.drop_partial_line()
+        self.handle = open(path, "a", encoding="utf-8")
+
+    def drop_partial_line(self):
+        # A crash in the middle of a write leaves a line without newline, which is scored again
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as handle:
+            data = handle.read()
+            if data and not data.endswith(b"\n"):
+                handle.truncate(data.rfind(b"\n") + 1)
+
+    def done_ids(self):
+        with open(self.path, encoding="utf-8") as handle:
+            return {json.loads(line)["profile_id"] for line in handle if line.strip()}
+
+    def write(self, results):
+        self.handle.write("".join(json.dumps(result) + "\n" for result in results))
+        self.handle.flush()
+
+    def close(self):
+        self.handle.close()
+
+
+class ParquetWriter:
+    """
+    A directory of Parquet part files; each part is written to a temporary file and renamed, so a
+    crash never leaves a truncated part behind. The directory reads as one table with pandas/pyarrow.
+    """
+
+    def __init__(self, path, overwrite=False):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        if overwrite:
+            for name in self.parts():
+                os.remove(os.path.join(path, name))
+        self.buffer = []
+        self.next_part = len(self.parts())
+
+    def parts(self):
+        return sorted(name for name in os.listdir(self.path) if name.endswith(".parquet"))
+
+    def done_ids(self):
+        done = set()
+        for name in self.parts():
+            done.update(pq.read_table(os.path.join(self.path, name), columns=["profile_id"]).column(0).to_pylist())
+        return done
+
+    def write(self, results):
+        self.buffer.extend(results)
+        if len(self.buffer) >= PARQUET_PART_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        path = os.path.join(self.path, f"part-{self.next_part:05d}.parquet")
+        pq.write_table(pa.Table.from_pylist(self.buffer), path + ".tmp")
+        os.replace(path + ".tmp", path)
+        self.next_part += 1
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+
+
+def open_writer(path, overwrite=False):
+    # .jsonl/.json writes JSON lines, anything else a Parquet directory
+    if path.endswith((".jsonl", ".json")):
+        return JsonlWriter(path, overwrite)
+    return ParquetWriter(path, overwrite)
+
+
+# ----------------------------------------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------------------------------------
+def run(profiles_path, output, store_path=STORE_PATH, k=20, by="final_score", workers=None,
+        chunk_size=CHUNK_SIZE, overwrite=False, log=sys.stderr):
+    """
+    Score every profile of the JSONL file and write its top-k recipes. Returns a summary dict.
+    """
+    if by not in RANK_KEYS:
+        raise ValueError(f"Unknown ranking '{by}', expected one of {RANK_KEYS}")
+    if not store_exists(store_path):
+        raise FileNotFoundError(f"No recipe store at {store_path}, run `python -m data.data_loader` first")
+
+    writer = open_writer(output, overwrite)
+    done = writer.done_ids()
+    chunks = chunked(read_profiles(profiles_path, frozenset(done)), chunk_size)
+    workers = workers or os.cpu_count() or 1
+
+    stats = {"skipped": len(done), "scored": 0, "failed": 0}
+    start = last_report = time.perf_counter()
+
+    def collect(outcome):
+        nonlocal last_report
+        results, failures = outcome
+        writer.write(results)
+        stats["scored"] += len(results)
+        stats["failed"] += len(failures)
+        for profile_id, error in failures:
+            print(f"Profile {profile_id} failed: {error}", file=log)
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            print(f"{stats['scored']} profiles scored, {stats['failed']} failed, "
+                  f"{stats['scored'] / (now - start):.1f} profiles/s", file=log)
+
+    try:
+        if workers == 1:
+            init_worker(store_path)
+            for chunk in chunks:
+                collect(score_chunk(chunk, k, by))
+        else:
+            with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(store_path,)) as pool:
+                # Keep a bounded number of chunks in flight so the input is streamed, not read up front
+                pending = set()
+                for chunk in chunks:
+                    pending.add(pool.submit(score_chunk, chunk, k, by))
+                    if len(pending) >= 2 * workers:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            collect(future.result())
+                for future in pending:
+                    collect(future.result())
+    finally:
+        writer.close()
+
+    seconds = time.perf_counter() - start
+    stats["seconds"] = round(seconds, 3)
+    stats["profiles_per_second"] = round(stats["scored"] / seconds, 1) if seconds > 0 else 0.0
+    print(f"Done: {stats['scored']} profiles scored, {stats['failed']} failed, {stats['skipped']} already done, "
+          f"{stats['profiles_per_second']} profiles/s", file=log)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score the recipe catalogue against user profiles and keep the top K per profile.")
+    parser.add_argument("profiles", help="JSONL file with one profile per line, '-' for stdin")
+    parser.add_argument("--output", required=True, help="*.jsonl for JSON lines, otherwise a Parquet directory")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--rank-by", choices=RANK_KEYS, default="final_score")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--store", default=STORE_PATH, help="recipe store directory")
+    parser.add_argument("--overwrite", action="store_true", help="start over instead of resuming")
+    args = parser.parse_args(argv)
+
+    run(args.profiles, args.output, args.store, args.top_k, args.rank_by, args.workers, args.chunk_size, args.overwrite)
+
+
+if __name__ == "__main__":
+    main()
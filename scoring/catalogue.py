@@ -0,0 +1,106 @@
+import numpy as np
+from typing import NamedTuple
+
+from scoring.engine import SCORING_COLUMNS, build_targets, penalty_matrix, score_matrix, score_penalties, score_recipes
+from scoring.portions import best_portions
+from scoring.profile import as_profile
+
+
+class RowPenalties(NamedTuple):
+    # Weight-independent scoring state of a result set, kept between reruns
+    rows: np.ndarray
+    targets: bytes          # fingerprint of the profile targets the penalties were computed for
+    penalties: np.ndarray   # (len(rows), len(SCORING_COLUMNS))
+
+
+def targets_fingerprint(profile):
+    return np.stack(build_targets(profile)).tobytes()
+
+
+class Catalogue:
+    """
+    Precomputed scoring inputs for the whole recipe catalogue.
+      - values:    dense float32 matrix (n_recipes, len(SCORING_COLUMNS))
+      - positions: recipe_id -> row of values, -1 for unknown IDs
+    """
+
+    def __init__(self, recipe_ids, values):
+        self.recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        self.values = np.ascontiguousarray(values, dtype=np.float32)
+        self.positions = np.full(int(self.recipe_ids.max()) + 1 if len(self.recipe_ids) else 1, -1, dtype=np.int64)
+        self.positions[self.recipe_ids] = np.arange(len(self.recipe_ids))
+
+    @classmethod
+    def from_store(cls, recipe_store):
+        recipe_ids = recipe_store.column("recipe_id")
+        return cls(recipe_ids, recipe_store.numeric_matrix(SCORING_COLUMNS))
+
+    @classmethod
+    def from_frame(cls, recipes_df):
+        return cls(recipes_df["recipe_id"].to_numpy(), recipes_df[SCORING_COLUMNS].to_numpy(dtype=np.float32, na_value=np.nan))
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    def rows(self, recipe_ids):
+        """
+        Rows of the given recipe IDs, in the same order; unknown IDs are skipped.
+        """
+        recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        inside = (recipe_ids >= 0) & (recipe_ids < len(self.positions))
+        rows = self.positions[recipe_ids[inside]]
+        return rows[rows >= 0]
+
+    def row(self, recipe_id):
+        rows = self.rows([recipe_id])
+        return int(rows[0]) if len(rows) else None
+
+    def score(self, profile, rows=None):
+        """
+        Score the given rows (default: the whole catalogue) against the profile.
+        """
+        profile = as_profile(profile)
+        if rows is None:
+            return score_matrix(self.values, profile, self.recipe_ids)
+        return score_matrix(self.values[rows], profile, self.recipe_ids[rows])
+
+    def portions(self, profile, rows=None):
+        """
+        Best portion (in servings) of the given rows (default: the whole catalogue) and the scores at it.
+        """
+        if rows is None:
+            return best_portions(self.values, profile, self.recipe_ids)
+        return best_portions(self.values[rows], profile, self.recipe_ids[rows])
+
+    def penalties(self, profile, rows):
+        """
+        Penalty fractions of the given rows, to be re-weighted later with rescore().
+        """
+        profile = as_profile(profile)
+        rows = np.asarray(rows, dtype=np.int64)
+        return RowPenalties(rows, targets_fingerprint(profile), penalty_matrix(self.values[rows], profile))
+
+    def rescore(self, cached, profile):
+        """
+        Score cached rows against the current profile. When only the weights changed this is a
+        matrix-vector product over the cached penalties; changed targets recompute them first.
+        Returns the (possibly refreshed) RowPenalties and the ScoreResult.
+        """
+        profile = as_profile(profile)
+        if cached.targets != targets_fingerprint(profile):
+            cached = self.penalties(profile, cached.rows)
+        return cached, score_penalties(cached.penalties, profile, self.recipe_ids[cached.rows])
+
+
+def score(recipes, profile):
+    """
+    Score recipes against a profile (a Profile or the session profile dict), without Streamlit.
+    `recipes` is a Catalogue, a recipes DataFrame with recipe_id and the SCORING_COLUMNS,
+    or a (n_recipes, len(SCORING_COLUMNS)) value matrix.
+    """
+    profile = as_profile(profile)
+    if isinstance(recipes, Catalogue):
+        return recipes.score(profile)
+    if hasattr(recipes, "columns"):
+        return score_recipes(recipes, profile)
+    return score_matrix(np.asarray(recipes, dtype=np.float64), profile)
@@ -0,0 +1,150 @@
+import numpy as np
+from typing import NamedTuple
+
+# The metric definitions live in scoring.metrics and are re-exported here
+from scoring.metrics import (
+    ENVIRONMENT,
+    ENVIRONMENT_COLUMNS,
+    ENVIRONMENT_METRICS,
+    HEALTH_COLUMNS,
+    HEALTH_METRICS,
+    MACROS_INTERVAL,
+    MACROS_RDI,
+    MACROS_UL,
+    METRIC_INDEX,
+    METRIC_RULES,
+    METRICS,
+    MICROS_RDI,
+    MICROS_UL,
+    RULE_INTERVAL,
+    RULE_RDI,
+    RULE_RDI_UL,
+    RULE_UPPER,
+    SCORING_COLUMNS,
+    TargetBounds,
+)
+from scoring.profile import as_profile
+
+
+class ScoreResult(NamedTuple):
+    recipe_ids: np.ndarray
+    health_contributions: np.ndarray         # (n_recipes, len(HEALTH_METRICS))
+    environmental_contributions: np.ndarray  # (n_recipes, len(ENVIRONMENT_METRICS))
+    health_score: np.ndarray
+    environment_score: np.ndarray
+    final_score: np.ndarray
+
+    def take(self, indices):
+        """
+        The same result restricted to the given positions.
+        """
+        return ScoreResult(*(None if field is None else field[indices] for field in self))
+
+
+# ----------------------------------------------------------------------------------------------------
+# Targets
+# ----------------------------------------------------------------------------------------------------
+def daily_bounds(profile):
+    """
+    Daily TargetBounds of the profile.
+    """
+    return as_profile(profile).bounds
+
+
+def per_meal_targets(bounds, meals):
+    """
+    Turn daily TargetBounds into per-meal arrays (lower, upper, scale_below, scale_above).
+    A value inside [lower, upper] scores the full weight, outside it loses weight * distance / scale.
+    """
+    lower = bounds.lower / meals
+    upper = bounds.upper / meals
+    width = upper - lower
+    scale_below = np.where(METRIC_RULES == RULE_UPPER, 1.0, np.where(METRIC_RULES == RULE_INTERVAL, width, lower))
+    scale_above = np.where((METRIC_RULES == RULE_INTERVAL) | (METRIC_RULES == RULE_RDI_UL), width, upper)
+    return lower, upper, scale_below, scale_above
+
+
+def build_targets(profile):
+    """
+    Per-meal (lower, upper, scale_below, scale_above) arrays of the profile.
+    """
+    profile = as_profile(profile)
+    return per_meal_targets(daily_bounds(profile), profile.meals)
+
+
+def build_weights(profile):
+    """
+    Weight of every metric, in the column order of SCORING_COLUMNS.
+    """
+    return as_profile(profile).weights
+
+
+# ----------------------------------------------------------------------------------------------------
+# Scoring
+# ----------------------------------------------------------------------------------------------------
+def penalty_fractions(values, lower, upper, scale_below, scale_above):
+    """
+    Relative distance of every value to its target range, clipped to [0, 1].
+    Missing values and zero-width scales count as a full penalty, like the scalar rules did.
+    """
+    # Worked in place on two temporaries, this runs once per profile over the whole catalogue in batch jobs
+    below = lower - values
+    np.maximum(below, 0.0, out=below)
+    above = values - upper
+    np.maximum(above, 0.0, out=above)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(below, scale_below, out=below, where=below > 0)
+        np.divide(above, scale_above, out=above, where=above > 0)
+    below += above
+    below[np.isnan(values)] = 1.0
+    return np.fmin(below, 1.0, out=below)
+
+
+def penalty_matrix(values, profile):
+    """
+    Penalty fractions of a (n_recipes, len(SCORING_COLUMNS)) value matrix. They only depend on the
+    profile targets, so they can be reused when nothing but the weights changes.
+    """
+    return penalty_fractions(values, *build_targets(profile))
+
+
+def score_penalties(penalties, profile, recipe_ids=None):
+    """
+    Weight precomputed penalty fractions into contributions and scores.
+    """
+    profile = as_profile(profile)
+    weight = profile.weights
+    fulfilment = 1.0 - penalties
+    n_health = len(HEALTH_METRICS)
+
+    health_weight = profile.health_weight
+    environment_weight = profile.environment_weight
+    health_score = (fulfilment[:, :n_health] @ weight[:n_health]) * 100
+    environment_score = (fulfilment[:, n_health:] @ weight[n_health:]) * 100
+    final_score = (health_weight / 100) * health_score + (environment_weight / 100) * environment_score
+
+    contributions = fulfilment * weight
+    return ScoreResult(
+        recipe_ids=recipe_ids,
+        health_contributions=contributions[:, :n_health],
+        environmental_contributions=contributions[:, n_health:],
+        health_score=health_score,
+        environment_score=environment_score,
+        final_score=final_score,
+    )
+
+
+def score_matrix(values, profile, recipe_ids=None):
+    """
+    Score a (n_recipes, len(SCORING_COLUMNS)) value matrix against the profile.
+    """
+    profile = as_profile(profile)
+    return score_penalties(penalty_matrix(values, profile), profile, recipe_ids)
+
+
+def score_recipes(recipes, profile):
+    """
+    Score every row of the recipes DataFrame against the profile in one batched pass.
+    """
+    values = recipes[SCORING_COLUMNS].to_numpy(dtype=np.float64, na_value=np.nan)
+    return score_matrix(values, profile, recipes["recipe_id"].to_numpy())
@@ -0,0 +1,254 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import NamedTuple
+
+from scoring.catalogue import Catalogue
+from scoring.metrics import SCORING_COLUMNS
+
+# Recipe totals recomputed from their ingredient rows instead of read from the recipe spreadsheet:
+#
+#   totals per serving = (recipe x food grams) @ (food x metric factors per gram) / servings
+#
+# Nutrients come from the NEVO codes of the ingredients, environmental impacts from their Agribalyse
+# codes. The factor tables are CSV files with the code column and any of the SCORING_COLUMNS, e.g.
+#   NEVO Code,protein,fat,...            (per 100 g, as NEVO publishes them)
+#   Agribalyse Code,Total - Co2 eq,...   (per kg, as Agribalyse publishes them)
+# Only the columns a table provides are recomputed; the others keep their spreadsheet values.
+
+NEVO_CODE = "NEVO Code"
+AGRIBALYSE_CODE = "Agribalyse Code"
+NEVO_PER_GRAMS = 100
+AGRIBALYSE_PER_GRAMS = 1000
+
+
+def normalize_code(code):
+    # 5041.0, "5041" and " 5041 " are the same food; missing codes are None
+    if code is None or (isinstance(code, float) and np.isnan(code)):
+        return None
+    if isinstance(code, (float, np.floating)) and float(code).is_integer():
+        return str(int(code))
+    code = str(code).strip()
+    return code or None
+
+
+# ----------------------------------------------------------------------------------------------------
+# Recipe x food matrix
+# ----------------------------------------------------------------------------------------------------
+class FoodMatrix:
+    """
+    Sparse (n_recipes, n_foods) matrix of ingredient grams in CSR layout: the entries of recipe row r
+    are foods[indptr[r]:indptr[r + 1]] with grams[...] in ingredient order. `codes` maps a food
+    index back to its NEVO or Agribalyse code.
+    """
+
+    def __init__(self, indptr, foods, grams, codes):
+        self.indptr = indptr
+        self.foods = foods
+        self.grams = grams
+        self.codes = tuple(codes)
+        self.food_index = {code: i for i, code in enumerate(self.codes)}
+
+    @classmethod
+    def from_rows(cls, recipe_ids, ingredient_recipe_ids, codes, grams):
+        """
+        Build from ingredient rows; rows are aligned with `recipe_ids` (e.g. the catalogue), ingredients
+        of unknown recipes and ingredients without a code or gram equivalent are left out.
+        """
+        recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        ingredient_recipe_ids = np.asarray(ingredient_recipe_ids, dtype=np.int64)
+        grams = np.asarray(grams, dtype=np.float64)
+        codes = [normalize_code(code) for code in codes]
+
+        order = np.argsort(recipe_ids, kind="stable")
+        found = np.searchsorted(recipe_ids[order], ingredient_recipe_ids)
+        found = np.minimum(found, len(recipe_ids) - 1)
+        known = recipe_ids[order][found] == ingredient_recipe_ids
+        rows = order[found]
+
+        keep = known & np.isfinite(grams) & np.array([code is not None for code in codes], dtype=bool)
+        keep_index = np.flatnonzero(keep)
+        food_codes, foods = np.unique(np.array([codes[i] for i in keep_index], dtype=object), return_inverse=True)
+
+        # Stable sort by recipe row keeps the ingredient order within a recipe
+        by_row = np.argsort(rows[keep_index], kind="stable")
+        indptr = np.zeros(len(recipe_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows[keep_index], minlength=len(recipe_ids)), out=indptr[1:])
+        return cls(indptr, foods[by_row].astype(np.int64), grams[keep_index][by_row], food_codes.tolist())
+
+    @property
+    def n_recipes(self):
+        return len(self.indptr) - 1
+
+    @property
+    def n_foods(self):
+        return len(self.codes)
+
+    def entries(self, row):
+        # (food indices, grams) of one recipe row
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return self.foods[start:end], self.grams[start:end]
+
+    def dot(self, factors, rows=None):
+        """
+        (n_recipes, n_columns) product with a dense (n_foods, n_columns) factor matrix, for every row
+        or the given rows.
+        """
+        if rows is not None:
+            out = np.zeros((len(rows), factors.shape[1]))
+            for i, row in enumerate(rows):
+                foods, grams = self.entries(row)
+                out[i] = grams @ factors[foods]
+            return out
+        weighted = self.grams[:, None] * factors[self.foods]
+        out = np.zeros((self.n_recipes, factors.shape[1]))
+        starts = self.indptr[:-1]
+        filled = starts < self.indptr[1:]
+        if filled.any():
+            out[filled] = np.add.reduceat(weighted, starts[filled], axis=0)
+        return out
+
+
+# ----------------------------------------------------------------------------------------------------
+# Factor tables
+# ----------------------------------------------------------------------------------------------------
+class FactorTable(NamedTuple):
+    codes: tuple           # food codes
+    columns: tuple         # SCORING_COLUMNS the table provides
+    values: np.ndarray     # (len(codes), len(columns)) per gram
+
+    @classmethod
+    def from_frame(cls, df, code_column, per_grams):
+        columns = tuple(column for column in SCORING_COLUMNS if column in df.columns)
+        codes = [normalize_code(code) for code in df[code_column]]
+        keep = [i for i, code in enumerate(codes) if code is not None]
+        values = df[list(columns)].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)[keep]
+        # Blank cells of the published tables mean "not measured", counted as zero like recipe calculators do
+        return cls(tuple(codes[i] for i in keep), columns, np.nan_to_num(values) / per_grams)
+
+    def aligned(self, codes):
+        """
+        Factors for the given food codes, (len(codes), len(columns)); unknown codes contribute zero.
+        """
+        index = {code: i for i, code in enumerate(self.codes)}
+        out = np.zeros((len(codes), len(self.columns)))
+        for i, code in enumerate(codes):
+            j = index.get(code)
+            if j is not None:
+                out[i] = self.values[j]
+        return out
+
+
+def read_factor_table(path, code_column, per_grams):
+    # None when the table is not part of the checkout
+    if not path or not os.path.exists(path):
+        return None
+    return FactorTable.from_frame(pd.read_csv(path), code_column, per_grams)
+
+
+# ----------------------------------------------------------------------------------------------------
+# Engine
+# ----------------------------------------------------------------------------------------------------
+class IngredientEngine:
+    """
+    Per-serving recipe totals of the whole catalogue from the ingredient rows: one sparse product
+    per code system. Rows are aligned with the recipe store (and so with the Catalogue built from it).
+    """
+
+    def __init__(self, recipe_ids, servings, nevo_matrix, agribalyse_matrix, nevo=None, agribalyse=None):
+        self.recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        servings = np.asarray(servings, dtype=np.float64)
+        self.servings = np.where(np.isfinite(servings) & (servings > 0), servings, 1.0)
+        self.matrices = {NEVO_CODE: nevo_matrix, AGRIBALYSE_CODE: agribalyse_matrix}
+        self.tables = {NEVO_CODE: nevo, AGRIBALYSE_CODE: agribalyse}
+        self.factors = {
+            system: (table, table.aligned(self.matrices[system].codes))
+            for system, table in self.tables.items() if table is not None
+        }
+        self.code_index = {
+            system: {code: i for i, code in enumerate(table.codes)}
+            for system, (table, _) in self.factors.items()
+        }
+
+    @classmethod
+    def from_stores(cls, recipe_store, ingredient_store, nevo=None, agribalyse=None):
+        recipe_ids = recipe_store.column("recipe_id")
+        columns = ["recipe_id", "gram_equivalent", NEVO_CODE, AGRIBALYSE_CODE]
+        ingredients = ingredient_store.frame(np.arange(len(ingredient_store)), columns=columns)
+        matrices = [
+            FoodMatrix.from_rows(recipe_ids, ingredients["recipe_id"], ingredients[code], ingredients["gram_equivalent"])
+            for code in (NEVO_CODE, AGRIBALYSE_CODE)
+        ]
+        return cls(recipe_ids, recipe_store.column("Servings"), *matrices, nevo, agribalyse)
+
+    def with_tables(self, nevo=None, agribalyse=None):
+        # The same matrices with other factor tables, e.g. an updated Agribalyse release
+        return IngredientEngine(
+            self.recipe_ids, self.servings, self.matrices[NEVO_CODE], self.matrices[AGRIBALYSE_CODE],
+            nevo or self.tables[NEVO_CODE], agribalyse or self.tables[AGRIBALYSE_CODE],
+        )
+
+    @property
+    def covered(self):
+        # SCORING_COLUMNS that a factor table provides
+        return [column for table, _ in self.factors.values() for column in table.columns]
+
+    @property
+    def is_published(self):
+        # At least one published factor table was loaded: the only case ingredient edits are offered
+        return bool(self.factors)
+
+    def totals(self, rows=None):
+        """
+        Per-serving totals (n, len(SCORING_COLUMNS)) of all recipes or the given rows; NaN in the
+        columns no factor table provides.
+        """
+        servings = self.servings if rows is None else self.servings[rows]
+        out = np.full((len(servings), len(SCORING_COLUMNS)), np.nan)
+        for system, (table, factors) in self.factors.items():
+            positions = [SCORING_COLUMNS.index(column) for column in table.columns]
+            out[:, positions] = self.matrices[system].dot(factors, rows) / servings[:, None]
+        return out
+
+    def contributions(self, row):
+        """
+        Per-serving contribution of every ingredient of one recipe, {system: (foods, grams, values)}
+        with values (n_ingredients, len(SCORING_COLUMNS)), NaN in the columns the system does not cover.
+        """
+        out = {}
+        for system, (table, factors) in self.factors.items():
+            foods, grams = self.matrices[system].entries(row)
+            values = np.full((len(foods), len(SCORING_COLUMNS)), np.nan)
+            positions = [SCORING_COLUMNS.index(column) for column in table.columns]
+            values[:, positions] = grams[:, None] * factors[foods] / self.servings[row]
+            out[system] = (foods, grams, values)
+        return out
+
+    def food_factors(self, nevo_code=None, agribalyse_code=None):
+        """
+        Per-gram values of one food (len(SCORING_COLUMNS)) from its codes: zero in the columns of a
+        table that does not list the code, NaN in the columns no table provides.
+        """
+        out = np.full(len(SCORING_COLUMNS), np.nan)
+        for system, code in ((NEVO_CODE, nevo_code), (AGRIBALYSE_CODE, agribalyse_code)):
+            if system not in self.factors:
+                continue
+            table = self.factors[system][0]
+            positions = [SCORING_COLUMNS.index(column) for column in table.columns]
+            i = self.code_index[system].get(normalize_code(code))
+            out[positions] = 0.0 if i is None else table.values[i]
+        return out
+
+    def recompute(self, catalogue):
+        """
+        A Catalogue whose columns covered by the factor tables are recomputed from the ingredients.
+        """
+        if not self.factors:
+            return catalogue
+        totals = self.totals()
+        values = catalogue.values.copy()
+        for table, _ in self.factors.values():
+            for column in table.columns:
+                position = SCORING_COLUMNS.index(column)
+                values[:, position] = totals[:, position]
+        return Catalogue(catalogue.recipe_ids, values)
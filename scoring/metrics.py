@@ -0,0 +1,88 @@
+import numpy as np
+from typing import NamedTuple
+
+# ----------------------------------------------------------------------------------------------------
+# Metric definitions
+# ----------------------------------------------------------------------------------------------------
+# Every metric maps its profile name to the recipes_df column holding the value per recipe.
+# The groups follow the scoring rule that is applied to them.
+MACROS_INTERVAL = {
+    "Protein": "protein",
+    "Fat": "fat",
+    "Carbohydrates": "carbs",
+}
+MACROS_UL = {
+    "Saturated Fat": "saturates",
+    "Trans Fat": "Trans Fat (g)",
+    "Sugar": "sugars",
+}
+MACROS_RDI = {
+    "Fiber": "fibre",
+}
+MICROS_UL = {
+    "Calcium": "Calcium (mg)",
+    "Iodine": "Iodine (µg)",
+    "Iron": "Iron (mg)",
+    "Selenium": "Selenium (µg)",
+    "Zinc": "Zinc (mg)",
+    "Vitamin A": "Vitamin A RE (µg)",
+    "Vitamin D": "Vitamin D (µg)",
+    "Vitamin E": "Vitamin E (mg)",
+}
+MICROS_RDI = {
+    "Magnesium": "Magnesium (mg)",
+    "Salt": "salt",
+    "Vitamin B1": "Vitamin B1 (mg)",
+    "Vitamin B2": "Vitamin B2 (mg)",
+    "Vitamin B3": "Vitamin B3 (mg)",
+    "Vitamin B6": "Vitamin B6 (mg)",
+    "Vitamin B9": "Vitamin B9 (µg)",
+    "Vitamin B12": "Vitamin B12 (µg)",
+    "Vitamin C": "Vitamin C (mg)",
+    "Vitamin K": "Vitamin K (µg)",
+}
+ENVIRONMENT = {
+    "Climate Change": "Total - Co2 eq",
+    "Ozone Layer Depletion": "Total - CFC11 eq",
+    "Particulate Matter": "Total - disease inc.",
+    "Toxicological Effects": "Total - NC CTUh",
+    "Toxicological Effects (carcinogenic)": "Total - C CTUh",
+    "Acidification": "Total - mol H+ eq",
+    "Freshwater Eutrophication": "Total - P eq",
+    "Marine Eutrophication": "Total - N eq",
+    "Land Use": "Total - pt dimensionless",
+    "Water Use": "Total - m3",
+    "Energy Use": "Total - MJ",
+}
+
+HEALTH_METRICS = tuple(MACROS_INTERVAL) + tuple(MACROS_UL) + tuple(MACROS_RDI) + tuple(MICROS_UL) + tuple(MICROS_RDI)
+ENVIRONMENT_METRICS = tuple(ENVIRONMENT)
+HEALTH_COLUMNS = [
+    column
+    for group in (MACROS_INTERVAL, MACROS_UL, MACROS_RDI, MICROS_UL, MICROS_RDI)
+    for column in group.values()
+]
+ENVIRONMENT_COLUMNS = list(ENVIRONMENT.values())
+SCORING_COLUMNS = HEALTH_COLUMNS + ENVIRONMENT_COLUMNS
+
+# Stable metric index: position of every metric in the target, weight and value vectors
+METRICS = HEALTH_METRICS + ENVIRONMENT_METRICS
+METRIC_INDEX = {name: i for i, name in enumerate(METRICS)}
+
+
+# Scoring rule of every metric, aligned with SCORING_COLUMNS:
+#   RULE_INTERVAL  inside [lower, upper]        penalty scaled by the width of the interval
+#   RULE_UPPER     at most upper (lower = -inf) penalty scaled by upper
+#   RULE_RDI       exactly the RDI (lower = upper)
+#   RULE_RDI_UL    between the RDI and the upper limit
+RULE_INTERVAL, RULE_UPPER, RULE_RDI, RULE_RDI_UL = 0, 1, 2, 3
+METRIC_RULES = np.array(
+    [RULE_INTERVAL] * len(MACROS_INTERVAL) + [RULE_UPPER] * len(MACROS_UL) + [RULE_RDI] * len(MACROS_RDI)
+    + [RULE_RDI_UL] * len(MICROS_UL) + [RULE_RDI] * len(MICROS_RDI) + [RULE_UPPER] * len(ENVIRONMENT)
+)
+
+
+class TargetBounds(NamedTuple):
+    # Daily target range of every metric, aligned with SCORING_COLUMNS (lower is -inf for upper limits)
+    lower: np.ndarray
+    upper: np.ndarray
@@ -0,0 +1,173 @@
+import time
+import numpy as np
+from typing import NamedTuple
+
+from scoring.engine import HEALTH_METRICS, METRIC_INDEX, ScoreResult, penalty_fractions, per_meal_targets, score_penalties
+from scoring.profile import as_profile
+from scoring.ranking import top_k
+
+POOL_SIZE = 200        # candidate recipes the beam search combines
+BEAM_WIDTH = 64        # partial plans kept after every meal
+TIME_BUDGET = 0.5      # seconds; when it runs out the remaining meals are filled greedily
+EXPANSION_ROWS = 1 << 14  # partial plans evaluated per vectorised batch, bounds memory and budget overrun
+CLIMATE_PENALTY = 100.0   # final score points a plan loses at twice the climate limit or more
+
+
+class MealPlan(NamedTuple):
+    rows: np.ndarray      # catalogue row of every meal
+    recipe_ids: np.ndarray
+    totals: np.ndarray    # summed values of the day, aligned with SCORING_COLUMNS
+    scores: ScoreResult   # the day scored against the daily targets (a single row)
+    complete: bool        # False when the time budget cut the beam search short
+
+
+# ----------------------------------------------------------------------------------------------------
+# Candidates
+# ----------------------------------------------------------------------------------------------------
+def candidate_pool(catalogue, profile, rows=None, size=POOL_SIZE, groups=None):
+    """
+    Prune the catalogue (or the given rows) to the candidates worth combining: the best recipes by
+    their per-meal final score, plus the best by health and by environment alone, which can balance
+    a plan even when they rank low overall. With `groups` (a label per catalogue row, e.g. the
+    cuisine) the best of every group are added too. Ordered by final score.
+    """
+    rows = np.arange(len(catalogue)) if rows is None else np.asarray(rows, dtype=np.int64)
+    scores = catalogue.score(profile, rows)
+    picked = [
+        top_k(scores.final_score, size),
+        top_k(scores.health_score, size // 4),
+        top_k(scores.environment_score, size // 4),
+    ]
+    if groups is not None:
+        labels = np.asarray(groups)[rows]
+        for label in np.unique(labels):
+            members = np.flatnonzero(labels == label)
+            picked.append(members[top_k(scores.final_score[members], size // 8)])
+    picked = np.unique(np.concatenate(picked))
+    return rows[picked[np.argsort(-scores.final_score[picked], kind="stable")]]
+
+
+# ----------------------------------------------------------------------------------------------------
+# Beam search
+# ----------------------------------------------------------------------------------------------------
+def climate_penalty(climate, limit, weight=CLIMATE_PENALTY):
+    """
+    Soft climate limit: `weight` times the share by which the Climate Change totals exceed the
+    limit, clipped to 1 like the metric penalties. A missing total or a limit already used up
+    (limit <= 0) costs the full weight as soon as it is exceeded.
+    """
+    overshoot = np.maximum(np.nan_to_num(climate - limit, nan=np.inf), 0.0)
+    share = overshoot / limit if limit > 0 else np.where(overshoot > 0, 1.0, 0.0)
+    return weight * np.minimum(share, 1.0)
+
+
+def plan_scores(totals, count, targets, profile):
+    """
+    Final score of partial plans with `count` meals: their average meal against the per-meal
+    targets, which for a full day equals the totals against the daily targets.
+    """
+    fulfilment = 1.0 - penalty_fractions(totals / count, *targets)
+    n_health = len(HEALTH_METRICS)
+    health = (fulfilment[:, :n_health] @ profile.weights[:n_health]) * 100
+    environment = (fulfilment[:, n_health:] @ profile.weights[n_health:]) * 100
+    return (profile.health_weight / 100) * health + (profile.environment_weight / 100) * environment
+
+
+def expand(plans, totals, values, allowed=None, cuisine_codes=None, cuisine_room=None):
+    """
+    Every plan extended by every allowed candidate that is not in it yet: (new plans, their totals).
+    `cuisine_codes` (one per candidate) with `cuisine_room` (one per code) caps how many recipes
+    of a cuisine a plan may hold.
+    """
+    n_plans, n_candidates = len(plans), len(values)
+    keep = np.ones((n_plans, n_candidates), dtype=bool) if allowed is None else np.tile(allowed, (n_plans, 1))
+    if plans.shape[1]:
+        keep &= ~(plans[:, :, None] == np.arange(n_candidates)[None, None, :]).any(axis=1)
+    if cuisine_codes is not None:
+        same = (cuisine_codes[plans][:, :, None] == cuisine_codes[None, None, :]).sum(axis=1)
+        keep &= same < cuisine_room[cuisine_codes][None, :]
+
+    plan_index, candidates = np.nonzero(keep)
+    extended = np.concatenate([plans[plan_index], candidates[:, None]], axis=1)
+    return extended, totals[plan_index] + values[candidates]
+
+
+def search_day(values, targets, profile, meals, beam_width, deadline, allowed=None, cuisine_codes=None,
+               cuisine_room=None, climate_limit=None, pinned=()):
+    """
+    Beam search for the `meals` candidates (rows of `values`) whose totals score best against the
+    per-meal `targets`, starting from the `pinned` candidates. Optional constraints: a mask of
+    `allowed` candidates, cuisine caps (see expand) and a soft `climate_limit` on the Climate Change
+    total (see climate_penalty), so nutrition still ranks the plans when none fits the limit.
+    Raises ValueError when the constraints leave no candidate for a meal.
+    Returns (candidate indices, totals, complete).
+    """
+    plans = np.array([list(pinned)], dtype=np.int64)
+    totals = values[plans[0]].sum(axis=0)[None]
+    complete = True
+    climate = METRIC_INDEX["Climate Change"]
+
+    for meal in range(len(pinned), meals):
+        width = beam_width
+        if time.perf_counter() > deadline:
+            width, complete = 1, False
+
+        # Expand the beam in batches, so one step never holds more than EXPANSION_ROWS plans
+        batch = max(1, EXPANSION_ROWS // len(values))
+        found_plans, found_totals, found_scores = [], [], []
+        for i in range(0, len(plans), batch):
+            if i and time.perf_counter() > deadline:
+                complete = False
+                break
+            extended, extended_totals = expand(
+                plans[i:i + batch], totals[i:i + batch], values, allowed, cuisine_codes, cuisine_room
+            )
+            scores = plan_scores(extended_totals, meal + 1, targets, profile)
+            if climate_limit is not None:
+                scores = scores - climate_penalty(extended_totals[:, climate], climate_limit)
+            found_plans.append(extended)
+            found_totals.append(extended_totals)
+            found_scores.append(scores)
+        extended = np.concatenate(found_plans)
+        extended_totals = np.concatenate(found_totals)
+        scores = np.concatenate(found_scores)
+        if not len(extended):
+            raise ValueError(f"No recipes left for meal {meal + 1} under the plan constraints")
+
+        # The same recipes in another order are the same plan; a set of n recipes is reached from at
+        # most n plans of the beam, so the best width * n plans hold the best `width` distinct ones
+        best, seen = [], set()
+        for i in top_k(scores, width * (meal + 1)):
+            key = tuple(sorted(extended[i].tolist()))
+            if key not in seen:
+                seen.add(key)
+                best.append(i)
+                if len(best) == width:
+                    break
+        plans, totals = extended[best], extended_totals[best]
+
+    return plans[0], totals[0], complete
+
+
+def plan_meals(catalogue, profile, meals=None, rows=None, pool_size=POOL_SIZE, beam_width=BEAM_WIDTH,
+               time_budget=TIME_BUDGET):
+    """
+    Pick one recipe per meal so that the summed nutrients and environmental impacts of the day best
+    fit the daily targets of the profile. Beam search over a pruned candidate pool: after every meal
+    only the `beam_width` best partial plans (distinct recipe sets) are extended. The search always
+    returns a full plan; once `time_budget` seconds are spent the remaining meals are added greedily.
+    """
+    deadline = time.perf_counter() + time_budget
+    profile = as_profile(profile)
+    meals = meals or profile.meals
+    pool = candidate_pool(catalogue, profile, rows, pool_size)
+    if len(pool) < meals:
+        raise ValueError(f"Need at least {meals} candidate recipes for a plan, got {len(pool)}")
+
+    values = catalogue.values[pool].astype(np.float64)
+    targets = per_meal_targets(profile.bounds, meals)
+    plan, totals, complete = search_day(values, targets, profile, meals, beam_width, deadline)
+
+    plan_rows = pool[plan]
+    day = score_penalties(penalty_fractions(totals[None] / meals, *targets), profile)
+    return MealPlan(plan_rows, catalogue.recipe_ids[plan_rows], totals, day, complete)
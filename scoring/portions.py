@@ -0,0 +1,57 @@
+import numpy as np
+from typing import NamedTuple
+
+from scoring.engine import ScoreResult, build_targets, penalty_fractions, score_penalties
+from scoring.profile import as_profile
+
+# Portion model: the catalogue values are per serving, a portion of `m` servings scales every
+# nutrient and environmental impact by m. The penalty of a metric is piecewise linear in m with
+# breakpoints where m * value crosses lower - scale_below, lower, upper or upper + scale_above, so
+# the score is piecewise linear too and its maximum over [MIN_PORTION, MAX_PORTION] lies at one of
+# these breakpoints or at the ends. Scoring all of them at once finds the exact best portion.
+
+MIN_PORTION = 0.5
+MAX_PORTION = 2.0
+PORTION_CHUNK = 256  # recipes per batch, bounds the (recipes, candidates, metrics) temporary
+
+
+class Portions(NamedTuple):
+    multipliers: np.ndarray  # best portion of every recipe, in servings
+    values: np.ndarray       # the values at that portion
+    scores: ScoreResult      # the scores at that portion
+
+
+def portion_candidates(values, targets, low=MIN_PORTION, high=MAX_PORTION):
+    """
+    (n_recipes, n_candidates) portions worth scoring: 1 (one serving), the ends of the range and
+    every breakpoint of a metric inside it. Out-of-range breakpoints are replaced by 1, so 1 wins ties.
+    """
+    lower, upper, scale_below, scale_above = targets
+    points = np.stack([lower - scale_below, lower, upper, upper + scale_above])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        breakpoints = points[None, :, :] / values[:, None, :]
+    breakpoints = breakpoints.reshape(len(values), -1)
+    breakpoints[~((breakpoints > low) & (breakpoints < high))] = 1.0
+    fixed = np.broadcast_to(np.array([1.0, low, high]), (len(values), 3))
+    return np.concatenate([fixed, breakpoints], axis=1)
+
+
+def best_portions(values, profile, recipe_ids=None, low=MIN_PORTION, high=MAX_PORTION):
+    """
+    The portion in [low, high] servings that maximises the final score of every recipe, vectorised
+    over recipes and candidate portions. Ties keep one serving.
+    """
+    profile = as_profile(profile)
+    values = np.asarray(values, dtype=np.float64)
+    targets = build_targets(profile)
+    multipliers = np.ones(len(values))
+    for start in range(0, len(values), PORTION_CHUNK):
+        chunk = values[start:start + PORTION_CHUNK]
+        candidates = portion_candidates(chunk, targets, low, high)
+        scaled = candidates[:, :, None] * chunk[:, None, :]
+        penalties = penalty_fractions(scaled.reshape(-1, chunk.shape[1]), *targets)
+        final = score_penalties(penalties, profile).final_score.reshape(candidates.shape)
+        multipliers[start:start + len(chunk)] = candidates[np.arange(len(chunk)), np.argmax(final, axis=1)]
+
+    scaled = values * multipliers[:, None]
+    return Portions(multipliers, scaled, score_penalties(penalty_fractions(scaled, *targets), profile, recipe_ids))
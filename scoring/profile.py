@@ -0,0 +1,126 @@
+import numpy as np
+from typing import NamedTuple
+
+from scoring.metrics import (
+    ENVIRONMENT,
+    MACROS_INTERVAL,
+    MACROS_RDI,
+    MACROS_UL,
+    METRIC_INDEX,
+    METRICS,
+    MICROS_RDI,
+    MICROS_UL,
+    TargetBounds,
+)
+
+# Layout of Profile.to_bytes(): meals, health weight, environment weight, then lower, upper and weights
+HEADER = 3
+PACKED_LENGTH = HEADER + 3 * len(METRICS)
+
+
+class Profile(NamedTuple):
+    """
+    Everything the scoring needs from a user, without Streamlit, as fixed-order vectors indexed by
+    METRIC_INDEX (see scoring.metrics):
+      - meals:   number of meals the daily targets are split over
+      - bounds:  daily TargetBounds of every metric (lower is -inf for upper limits)
+      - weights: weight of every metric
+      - health_weight, environment_weight: the "Overall" split, in percent
+    """
+    meals: int
+    bounds: TargetBounds
+    weights: np.ndarray
+    health_weight: float
+    environment_weight: float
+
+    @classmethod
+    def from_dict(cls, profile):
+        """
+        Build a Profile from the nested session profile dict (see functions.initialize_session_state).
+        """
+        macros = profile["Macros"]
+        micros = profile["Micros"]
+        weights = profile["Weights"]
+        for name in MACROS_INTERVAL:
+            if not isinstance(macros[name], (tuple, list)) or len(macros[name]) != 2:
+                raise ValueError(f"No target range for {name} yet, please fill in your personal information first")
+
+        bounds = [(macros[name][0], macros[name][1]) for name in MACROS_INTERVAL]
+        bounds += [(-np.inf, macros[name]) for name in MACROS_UL]
+        bounds += [(macros[name], macros[name]) for name in MACROS_RDI]
+        bounds += [(micros[name], micros[f"{name} UL"]) for name in MICROS_UL]
+        bounds += [(micros[name], micros[name]) for name in MICROS_RDI]
+        bounds += [(-np.inf, profile["Environment"][name]) for name in ENVIRONMENT]
+        bounds = np.array(bounds, dtype=np.float64)
+
+        weight = [weights["Macros"][name] for name in tuple(MACROS_INTERVAL) + tuple(MACROS_UL) + tuple(MACROS_RDI)]
+        weight += [weights["Micros"][name] for name in tuple(MICROS_UL) + tuple(MICROS_RDI)]
+        weight += [weights["Environment"][name] for name in ENVIRONMENT]
+
+        return cls(
+            meals=int(profile["General"]["Number_of_meals"]),
+            bounds=TargetBounds(bounds[:, 0].copy(), bounds[:, 1].copy()),
+            weights=np.array(weight, dtype=np.float64),
+            health_weight=float(weights["Overall"]["Health"]),
+            environment_weight=float(weights["Overall"]["Environment"]),
+        )
+
+    def to_dict(self):
+        """
+        The scoring sections in the session layout, e.g. for JSON export.
+        """
+        lower = dict(zip(METRICS, self.bounds.lower.tolist()))
+        upper = dict(zip(METRICS, self.bounds.upper.tolist()))
+        weight = dict(zip(METRICS, self.weights.tolist()))
+
+        macros = {name: (lower[name], upper[name]) for name in MACROS_INTERVAL}
+        macros.update({name: upper[name] for name in MACROS_UL})
+        macros.update({name: lower[name] for name in MACROS_RDI})
+        micros = {}
+        for name in MICROS_UL:
+            micros[name] = lower[name]
+            micros[f"{name} UL"] = upper[name]
+        micros.update({name: lower[name] for name in MICROS_RDI})
+
+        return {
+            "General": {"Number_of_meals": self.meals},
+            "Macros": macros,
+            "Micros": micros,
+            "Environment": {name: upper[name] for name in ENVIRONMENT},
+            "Weights": {
+                "Overall": {"Health": self.health_weight, "Environment": self.environment_weight},
+                "Macros": {name: weight[name] for name in tuple(MACROS_INTERVAL) + tuple(MACROS_UL) + tuple(MACROS_RDI)},
+                "Micros": {name: weight[name] for name in tuple(MICROS_UL) + tuple(MICROS_RDI)},
+                "Environment": {name: weight[name] for name in ENVIRONMENT},
+            },
+        }
+
+    def to_bytes(self):
+        """
+        One packed float64 vector, for caches and stores; read back with Profile.from_bytes().
+        """
+        header = [self.meals, self.health_weight, self.environment_weight]
+        return np.concatenate([header, self.bounds.lower, self.bounds.upper, self.weights]).astype(np.float64).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        packed = np.frombuffer(data, dtype=np.float64)
+        if len(packed) != PACKED_LENGTH:
+            raise ValueError(f"Expected a packed profile of {PACKED_LENGTH} values, got {len(packed)}")
+        lower, upper, weights = packed[HEADER:].reshape(3, len(METRICS)).copy()
+        return cls(int(packed[0]), TargetBounds(lower, upper), weights, float(packed[1]), float(packed[2]))
+
+    def target(self, name):
+        # Daily (lower, upper) of a metric
+        i = METRIC_INDEX[name]
+        return float(self.bounds.lower[i]), float(self.bounds.upper[i])
+
+    def weight(self, name):
+        return float(self.weights[METRIC_INDEX[name]])
+
+
+def as_profile(profile):
+    """
+    Accept either a Profile or the session profile dict.
+    """
+    return profile if isinstance(profile, Profile) else Profile.from_dict(profile)
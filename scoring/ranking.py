@@ -0,0 +1,97 @@
+import re
+import warnings
+import numpy as np
+from typing import NamedTuple
+
+RANK_KEYS = ("final_score", "health_score", "environment_score")
+
+
+# ----------------------------------------------------------------------------------------------------
+# Filter attributes
+# ----------------------------------------------------------------------------------------------------
+class RecipeAttributes(NamedTuple):
+    # Arrays aligned with the catalogue rows
+    cuisine: np.ndarray
+    difficulty: np.ndarray
+    prep_minutes: np.ndarray
+
+
+def parse_minutes(text):
+    """
+    "1 hr and 10 mins min" -> 70.0; NaN when the text holds no duration.
+    """
+    hours = re.search(r"(\d+)\s*hrs?", text or "")
+    minutes = re.search(r"(\d+)\s*mins?", text or "")
+    if not hours and not minutes:
+        return np.nan
+    return float((int(hours.group(1)) * 60 if hours else 0) + (int(minutes.group(1)) if minutes else 0))
+
+
+def attributes_from_descriptions(recipe_ids, descriptions):
+    """
+    Align the cuisine, difficulty and prep time of the parsed description blocks with recipe_ids.
+    """
+    by_id = {int(d["Recipe ID"]): d for d in descriptions}
+    empty = {}
+    cuisine = np.array([by_id.get(int(i), empty).get("Cuisine", "") for i in recipe_ids], dtype=object)
+    difficulty = np.array([by_id.get(int(i), empty).get("Difficulty", "") for i in recipe_ids], dtype=object)
+    # Blocks without a difficulty line carry the prep time in its place
+    difficulty[[not np.isnan(parse_minutes(level)) for level in difficulty]] = ""
+    prep_minutes = np.array([parse_minutes(by_id.get(int(i), empty).get("Prep time")) for i in recipe_ids])
+    return RecipeAttributes(cuisine, difficulty, prep_minutes)
+
+
+def difficulty_levels(attributes):
+    """
+    The difficulties that occur, easiest first: ordered by the median prep time of their recipes.
+    """
+    levels = sorted(set(attributes.difficulty) - {""})
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # levels without any prep time
+        medians = [np.nanmedian(attributes.prep_minutes[attributes.difficulty == level]) for level in levels]
+    return [level for _, level in sorted(zip(np.nan_to_num(medians, nan=np.inf), levels))]
+
+
+def filter_mask(attributes, cuisines=None, difficulties=None, max_prep_minutes=None):
+    mask = np.ones(len(attributes.cuisine), dtype=bool)
+    if cuisines:
+        mask &= np.isin(attributes.cuisine, list(cuisines))
+    if difficulties:
+        mask &= np.isin(attributes.difficulty, list(difficulties))
+    if max_prep_minutes is not None:
+        mask &= attributes.prep_minutes <= max_prep_minutes
+    return mask
+
+
+# ----------------------------------------------------------------------------------------------------
+# Top-K
+# ----------------------------------------------------------------------------------------------------
+def top_k(values, k):
+    """
+    Indices of the k largest values in descending order, using a partial selection.
+    """
+    k = min(k, len(values))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(values):
+        top = np.argpartition(-values, k - 1)[:k]
+    else:
+        top = np.arange(len(values))
+    return top[np.argsort(-values[top], kind="stable")]
+
+
+def browse(catalogue, profile, attributes=None, k=20, by="final_score", **filters):
+    """
+    Best k recipes of the whole catalogue for the profile, ranked by one of RANK_KEYS.
+    Returns the catalogue rows and the ScoreResult of exactly those rows.
+    """
+    if by not in RANK_KEYS:
+        raise ValueError(f"Unknown ranking '{by}', expected one of {RANK_KEYS}")
+
+    rows = np.arange(len(catalogue))
+    if attributes is not None:
+        rows = np.flatnonzero(filter_mask(attributes, **filters))
+
+    scores = catalogue.score(profile, rows)
+    best = top_k(getattr(scores, by), k)
+    return rows[best], scores.take(best)
@@ -0,0 +1,217 @@
+import numpy as np
+from collections import Counter
+from typing import NamedTuple
+
+from scoring.engine import ScoreResult, score_matrix
+from scoring.ingredients import AGRIBALYSE_CODE, NEVO_CODE, normalize_code
+from scoring.metrics import SCORING_COLUMNS
+from scoring.profile import as_profile
+
+MIN_FOOD_RECIPES = 3  # a food is offered as a replacement once this many recipes use it
+GREENER_RESULTS = 5
+HEALTH_TOLERANCE = 5.0  # health rating points a greener variant may lose
+PRUNE_PER_INGREDIENT = 8  # best single swaps per ingredient that are combined into double swaps
+
+
+class Food(NamedTuple):
+    name: str
+    nevo_code: object        # normalised code, None when the food has none
+    agribalyse_code: object
+
+
+def food_choices(ingredients, min_recipes=MIN_FOOD_RECIPES):
+    """
+    Replacement foods from the ingredient rows (a DataFrame with `ingredient` and both code columns):
+    one Food per ingredient name used in at least `min_recipes` rows, with its most frequent pair of
+    codes. Sorted by name.
+    """
+    pairs = {}
+    for name, nevo, agribalyse in zip(ingredients["ingredient"], ingredients[NEVO_CODE], ingredients[AGRIBALYSE_CODE]):
+        codes = (normalize_code(nevo), normalize_code(agribalyse))
+        if name and codes != (None, None):
+            pairs.setdefault(name.strip(), Counter())[codes] += 1
+    return [
+        Food(name, *counts.most_common(1)[0][0])
+        for name, counts in sorted(pairs.items())
+        if sum(counts.values()) >= min_recipes
+    ]
+
+
+def food_category(agribalyse_code):
+    # Agribalyse (CIQUAL) codes are numbered by food group: 4xxx potatoes, 6xxx beef, 20xxx vegetables...
+    if agribalyse_code is None or not agribalyse_code.isdigit():
+        return None
+    return int(agribalyse_code) // 1000
+
+
+class FoodFactors:
+    """
+    Per-gram values (len(SCORING_COLUMNS)) of the replacement foods with an Agribalyse code, one per
+    distinct pair of codes, grouped by food category. Computed once per engine, so a search only
+    gathers rows of `values`. Needs a published Agribalyse table, the search ranks by environment.
+    """
+
+    def __init__(self, engine, foods):
+        if not self.available(engine):
+            raise ValueError("Greener alternatives need the published Agribalyse factor table.")
+        distinct = {}
+        for food in sorted(foods, key=lambda food: (len(food.name), food.name)):  # the shortest name of a food
+            if food_category(food.agribalyse_code) is not None:
+                distinct.setdefault((food.nevo_code, food.agribalyse_code), food)
+        self.foods = sorted(distinct.values())
+        self.values = np.array([
+            np.nan_to_num(engine.food_factors(food.nevo_code, food.agribalyse_code)) for food in self.foods
+        ]).reshape(len(self.foods), -1)
+        categories = np.array([food_category(food.agribalyse_code) for food in self.foods])
+        self.groups = {int(category): np.flatnonzero(categories == category) for category in np.unique(categories)}
+
+    @staticmethod
+    def available(engine):
+        # The search ranks by environment, so it needs the Agribalyse table; NEVO alone is not enough
+        return AGRIBALYSE_CODE in engine.factors
+
+    def candidates(self, food):
+        # Foods of the same category with other codes
+        members = self.groups.get(food_category(food.agribalyse_code), np.zeros(0, dtype=np.int64))
+        return np.array([i for i in members if self.foods[i][1:] != food[1:]], dtype=np.int64)
+
+
+def score_totals(totals, profile):
+    # Running deltas can leave rounding residue below zero, no recipe has negative nutrients or impacts
+    return score_matrix(np.maximum(totals, 0.0), profile)
+
+
+class Alternative(NamedTuple):
+    swaps: tuple          # ((ingredient position, Food), ...)
+    totals: np.ndarray    # per-serving values of the variant
+    scores: ScoreResult   # a single row
+
+
+class RecipeEdit:
+    """
+    Ingredient swaps and removals in one recipe, re-scored by deltas: the per-serving contribution of
+    the old ingredient leaves the recipe totals and the one of its replacement enters, so an edit is
+    a vector update and a one-row score instead of a recompute of the recipe.
+    Contributions come from the published factor tables of an IngredientEngine and only move the
+    columns those tables provide; in these columns the totals start from the same engine, so removing
+    every ingredient leaves zero. The other columns keep the catalogue values.
+    """
+
+    def __init__(self, engine, catalogue, row, ingredients, profile):
+        # ingredients: the recipe's ingredient rows (ingredient, gram_equivalent and both code columns)
+        if not engine.is_published:
+            raise ValueError("Ingredient swaps need the published NEVO or Agribalyse factor tables.")
+        self.engine = engine
+        self.row = row
+        self.profile = as_profile(profile)
+        self.servings = engine.servings[row]
+        self.names = [name.strip() for name in ingredients["ingredient"]]
+        self.grams = np.nan_to_num(np.asarray(ingredients["gram_equivalent"], dtype=np.float64))
+        self.foods = [
+            Food(name, normalize_code(nevo), normalize_code(agribalyse))
+            for name, nevo, agribalyse in zip(self.names, ingredients[NEVO_CODE], ingredients[AGRIBALYSE_CODE])
+        ]
+
+        self.original = catalogue.values[row].astype(np.float64)
+        covered = [SCORING_COLUMNS.index(column) for column in engine.covered]
+        self.original[covered] = engine.totals([row])[0, covered]
+        self.original_scores = score_totals(self.original[None], self.profile)
+        self.contributions = np.stack([self.contribution(food, grams) for food, grams in zip(self.foods, self.grams)]) \
+            if self.foods else np.zeros((0, len(self.original)))
+        self.reset()
+
+    def contribution(self, food, grams):
+        # Per-serving values of `grams` of a food; zero in the columns no factor table provides
+        if food is None or not grams:
+            return np.zeros(len(self.original))
+        factors = self.engine.food_factors(food.nevo_code, food.agribalyse_code)
+        return np.nan_to_num(factors * grams / self.servings)
+
+    def reset(self):
+        self.current = self.contributions.copy()
+        self.totals = self.original.copy()
+        self.edits = {}  # ingredient position -> (Food or None for removed, grams)
+        self.scores = self.original_scores
+
+    def rescore(self, profile):
+        # Targets or weights changed: the same totals scored against the new profile
+        self.profile = as_profile(profile)
+        self.original_scores = score_totals(self.original[None], self.profile)
+        self.scores = score_totals(self.totals[None], self.profile)
+
+    # ------------------------------------------------------------------------------------------------
+    def replace(self, position, food, grams=None):
+        """
+        Replace the ingredient at `position` by `grams` (default: the same amount) of `food`, or remove
+        it with food=None. Returns the new ScoreResult of the recipe.
+        """
+        grams = self.grams[position] if grams is None else grams
+        new = self.contribution(food, grams)
+        self.totals += new - self.current[position]
+        self.current[position] = new
+        if food == self.foods[position] and grams == self.grams[position]:
+            self.edits.pop(position, None)
+        else:
+            self.edits[position] = (food, grams)
+        if not self.edits:
+            self.totals = self.original.copy()  # no rounding drift once every edit is undone
+        self.scores = score_totals(self.totals[None], self.profile)
+        return self.scores
+
+    def remove(self, position):
+        return self.replace(position, None)
+
+    def restore(self, position):
+        return self.replace(position, self.foods[position])
+
+
+def greener_alternatives(edit, food_factors, k=GREENER_RESULTS, health_tolerance=HEALTH_TOLERANCE,
+                         prune=PRUNE_PER_INGREDIENT):
+    """
+    The `k` single and double same-category swaps of the not yet edited ingredients that raise the
+    environment rating of the edited recipe most, while its health rating drops by at most
+    `health_tolerance` points. All single swaps are scored in one batch; only the `prune` greenest
+    singles per ingredient are combined into doubles.
+    """
+    positions, members, deltas = [], [], []
+    for position, food in enumerate(edit.foods):
+        candidates = food_factors.candidates(food)
+        if position in edit.edits or not edit.grams[position] or not len(candidates):
+            continue
+        positions.append(np.full(len(candidates), position))
+        members.append(candidates)
+        deltas.append(edit.grams[position] * food_factors.values[candidates] / edit.servings - edit.current[position])
+    if not deltas:
+        return []
+    positions, members, deltas = np.concatenate(positions), np.concatenate(members), np.concatenate(deltas)
+    singles = score_totals(edit.totals + deltas, edit.profile)
+
+    # Doubles: pairs of the greenest singles of two different ingredients
+    pruned = np.concatenate([
+        np.flatnonzero(positions == position)[np.argsort(-singles.environment_score[positions == position], kind="stable")[:prune]]
+        for position in np.unique(positions)
+    ])
+    first, second = np.triu_indices(len(pruned), k=1)
+    first, second = pruned[first], pruned[second]
+    different = positions[first] != positions[second]
+    first, second = first[different], second[different]
+    doubles = score_totals(edit.totals + deltas[first] + deltas[second], edit.profile)
+
+    # Variants as (first single, second single or -1)
+    variants = np.concatenate([
+        np.stack([np.arange(len(positions)), np.full(len(positions), -1)], axis=1),
+        np.stack([first, second], axis=1),
+    ])
+    environment = np.concatenate([singles.environment_score, doubles.environment_score])
+    health = np.concatenate([singles.health_score, doubles.health_score])
+    final = np.concatenate([singles.final_score, doubles.final_score])
+    keep = np.flatnonzero((health >= edit.scores.health_score[0] - health_tolerance) & (environment > edit.scores.environment_score[0]))
+
+    # Greenest first, ties broken by the final score
+    alternatives = []
+    for i in keep[np.lexsort((-final[keep], -environment[keep]))][:k]:
+        chosen = [j for j in variants[i] if j >= 0]
+        totals = edit.totals + deltas[chosen].sum(axis=0)
+        swaps = tuple((int(positions[j]), food_factors.foods[members[j]]) for j in chosen)
+        alternatives.append(Alternative(swaps, totals, score_totals(totals[None], edit.profile)))
+    return alternatives
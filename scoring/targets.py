@@ -0,0 +1,207 @@
+import bisect
+
+import numpy as np
+
+from scoring.metrics import ENVIRONMENT_METRICS, MICROS_RDI, MICROS_UL, TargetBounds
+
+# Daily targets of a user, computed from the personal data of the Personal Information page
+
+ACTIVITY_FACTORS = {
+    "Sedentary: little or no exercise": 1.2,
+    "Light: exercise 1-3 times/week": 1.375,
+    "Moderate: exercise 3-5 times/week": 1.55,
+    "Active: daily exercise or intense exercise 3-4 times/week": 1.725,
+    "Very active: intense exercise 6-7 times/week": 1.9,
+}
+
+# Session profile name -> column of the micro-nutrient reference table
+MICROS_REFERENCE = {
+    "Calcium": "Calcium (mg)",
+    "Calcium UL": "Calcium UL (mg)",
+    "Iodine": "Iodine (µg)",
+    "Iodine UL": "Iodine UL (µg)",
+    "Iron": "Iron (mg)",
+    "Iron UL": "Iron UL (mg)",
+    "Magnesium": "Magnesium (mg)",
+    "Selenium": "Selenium (µg)",
+    "Selenium UL": "Selenium UL (µg)",
+    "Salt": "Salt (g)",
+    "Zinc": "Zinc (mg)",
+    "Zinc UL": "Zinc UL (mg)",
+    "Vitamin A": "Vitamin A RE (µg)",
+    "Vitamin A UL": "Vitamin A RE UL (µg)",
+    "Vitamin B1": "Vitamin B1 (mg)",
+    "Vitamin B2": "Vitamin B2 (mg)",
+    "Vitamin B3": "Vitamin B3 (mg)",
+    "Vitamin B6": "Vitamin B6 (mg)",
+    "Vitamin B9": "Vitamin B9 (µg)",
+    "Vitamin B12": "Vitamin B12 (µg)",
+    "Vitamin C": "Vitamin C (mg)",
+    "Vitamin D": "Vitamin D (µg)",
+    "Vitamin D UL": "Vitamin D UL (µg)",
+    "Vitamin E": "Vitamin E (mg)",
+    "Vitamin E UL": "Vitamin E UL (mg)",
+    "Vitamin K": "Vitamin K (µg)",
+}
+
+
+# Function to calculate the daily caloric intake
+def calculate_Macros(weight, height, age, gender, activity_level):
+    """
+    Calculate daily caloric intake based on TDEE using Mifflin-St Jeor Equation.
+    """
+    if gender.lower() == "male":
+        bmr = 10 * weight + 6.25 * height - 5 * age + 5
+    else:
+        bmr = 10 * weight + 6.25 * height - 5 * age - 161
+
+    factor = ACTIVITY_FACTORS.get(activity_level, 1.2)
+    tdee = bmr * factor
+
+    Macros_kcal = {
+        "protein": (0.10 * tdee, 0.15 * tdee),
+        "carbs": (0.45 * tdee, 0.65 * tdee),
+        "sugar": (0.10 * tdee, 0.10 * tdee),  # fixed %
+        "fat": (0.20 * tdee, 0.35 * tdee),
+        "saturated_fat": (0.10 * tdee, 0.10 * tdee),  # fixed %
+        "trans_fat": (0.01 * tdee, 0.01 * tdee),  # fixed %
+    }
+
+    # Convert kcal to grams
+    Macros_grams = {
+        "protein": (
+            int(Macros_kcal["protein"][0] / 4),
+            int(Macros_kcal["protein"][1] / 4),
+        ),
+        "carbs": (int(Macros_kcal["carbs"][0] / 4),
+                  int(Macros_kcal["carbs"][1] / 4)),
+        "sugar": (int(Macros_kcal["sugar"][0] / 4)),
+        "fat": (int(Macros_kcal["fat"][0] / 9),
+                int(Macros_kcal["fat"][1] / 9)),
+        "saturated_fat": (int(Macros_kcal["saturated_fat"][0] / 9)),
+        "trans_fat": (int(Macros_kcal["trans_fat"][0] / 9)),
+    }
+
+    return {"calories": round(tdee, 0), "Macros": Macros_grams}
+
+
+# ----------------------------------------------------------------------------------------------------
+# Micro-nutrient reference table
+# ----------------------------------------------------------------------------------------------------
+def parse_age_band(band):
+    # "19-50" -> (19, 50); "65+" means older than 65, so (66, inf) for whole years
+    if "+" in band:
+        return int(band.replace("+", "")) + 1, float("inf")
+    start, end = map(int, band.split("-"))
+    return start, end
+
+
+class MicronutrientTable:
+    """
+    The reference CSV compiled once into (gender, age band) -> target vector.
+    Age bands are searched with bisect on their sorted lower bounds.
+    """
+
+    def __init__(self, columns, bands):
+        # bands: gender -> list of (start, end, values) with values aligned with columns
+        self.columns = tuple(columns)
+        self.index = {column: i for i, column in enumerate(self.columns)}
+        self.starts, self.ends, self.values = {}, {}, {}
+        for gender, rows in bands.items():
+            rows = sorted(rows, key=lambda row: row[0])
+            self.starts[gender] = [start for start, _, _ in rows]
+            self.ends[gender] = [end for _, end, _ in rows]
+            self.values[gender] = np.array([values for _, _, values in rows], dtype=np.float64)
+
+        # Positions of the table-driven health metrics (Fiber and the micros) in a target vector,
+        # so their lower and upper bounds are a single gather
+        lower_columns = ["Fiber (g)"] + [MICROS_REFERENCE[name] for name in tuple(MICROS_UL) + tuple(MICROS_RDI)]
+        upper_columns = (["Fiber (g)"] + [MICROS_REFERENCE[f"{name} UL"] for name in MICROS_UL]
+                         + [MICROS_REFERENCE[name] for name in MICROS_RDI])
+        self.lower_positions = np.array([self.index[column] for column in lower_columns])
+        self.upper_positions = np.array([self.index[column] for column in upper_columns])
+
+    @classmethod
+    def from_frame(cls, df):
+        columns = [column for column in df.columns if column not in ("Gender", "Age")]
+        bands = {}
+        for record in df.to_dict("records"):
+            start, end = parse_age_band(str(record["Age"]))
+            values = [round(float(record[column]), 1) for column in columns]
+            bands.setdefault(str(record["Gender"]).lower(), []).append((start, end, values))
+        return cls(columns, bands)
+
+    def lookup(self, age, gender):
+        """
+        Target vector (aligned with columns) of the matching gender and age band, None if no band matches.
+        """
+        gender = "female" if gender.lower() == "female" else "male"
+        starts = self.starts.get(gender)
+        if not starts:
+            return None
+        i = bisect.bisect_right(starts, age) - 1
+        if i < 0 or age > self.ends[gender][i]:
+            return None
+        return self.values[gender][i]
+
+
+# Function to match the micro-nutrient
+def get_micronutrient_targets(age, gender, table):
+    # Reference values of the matching age group, keyed by reference column
+    values = table.lookup(age, gender)
+    if values is None:
+        return None  # Or raise an error
+    return dict(zip(table.columns, values.tolist()))
+
+
+# ----------------------------------------------------------------------------------------------------
+# Profile targets
+# ----------------------------------------------------------------------------------------------------
+def daily_targets(age, gender, weight, height, activity_level, table, environment=None):
+    """
+    Daily TargetBounds for the personal data, indexed by METRIC_INDEX, ready for Profile.bounds.
+    `environment` holds the daily thresholds, without it they are unbounded.
+    """
+    Macros = calculate_Macros(weight=weight, height=height, age=age, gender=gender, activity_level=activity_level)["Macros"]
+    micros = table.lookup(age, gender)
+    if micros is None:
+        raise ValueError(f"No micro-nutrient reference values for a {age} year old {gender.lower()}")
+
+    # Macros in the order of MACROS_INTERVAL and MACROS_UL
+    interval = [Macros["protein"], Macros["fat"], Macros["carbs"]]
+    limits = [Macros["saturated_fat"], Macros["trans_fat"], Macros["sugar"]]
+    thresholds = [environment[name] for name in ENVIRONMENT_METRICS] if environment else [np.inf] * len(ENVIRONMENT_METRICS)
+
+    lower = np.concatenate([
+        [low for low, _ in interval], np.full(len(limits), -np.inf),
+        micros[table.lower_positions], np.full(len(thresholds), -np.inf),
+    ])
+    upper = np.concatenate([
+        [high for _, high in interval], limits,
+        micros[table.upper_positions], thresholds,
+    ])
+    return TargetBounds(lower.astype(np.float64), upper.astype(np.float64))
+
+
+def profile_targets(age, gender, weight, height, activity_level, table):
+    """
+    The "Macros" and "Micros" sections of the session profile for the given personal data.
+    """
+    Macros = calculate_Macros(weight=weight, height=height, age=age, gender=gender, activity_level=activity_level)
+    values = table.lookup(age, gender)
+    if values is None:
+        raise ValueError(f"No micro-nutrient reference values for a {age} year old {gender.lower()}")
+    values = values.tolist()
+
+    macros = {
+        "Calories": Macros["calories"],
+        "Protein": Macros["Macros"]["protein"],
+        "Carbohydrates": Macros["Macros"]["carbs"],
+        "Sugar": Macros["Macros"]["sugar"],
+        "Fat": Macros["Macros"]["fat"],
+        "Saturated Fat": Macros["Macros"]["saturated_fat"],
+        "Trans Fat": Macros["Macros"]["trans_fat"],
+        "Fiber": values[table.index["Fiber (g)"]],
+    }
+    micros = {name: values[table.index[column]] for name, column in MICROS_REFERENCE.items()}
+    return {"Macros": macros, "Micros": micros}
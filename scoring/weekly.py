@@ -0,0 +1,153 @@
+import math
+import time
+import numpy as np
+from typing import NamedTuple
+
+from scoring.engine import METRIC_INDEX, ScoreResult, penalty_fractions, per_meal_targets, score_penalties
+from scoring.planner import candidate_pool, search_day
+from scoring.profile import as_profile
+
+DAYS = 7
+REPEAT_GAP = 3             # a planned recipe comes back at the earliest REPEAT_GAP days later
+MAX_CUISINE_SHARE = 0.4    # at most this share of the meals of the week from one cuisine
+WEEK_POOL_SIZE = 400
+WEEK_BEAM_WIDTH = 24
+WEEK_TIME_BUDGET = 0.8     # seconds for a whole week; a single re-planned day gets its share
+
+CLIMATE = METRIC_INDEX["Climate Change"]
+
+
+class WeekPlan(NamedTuple):
+    rows: np.ndarray        # (days, meals) catalogue rows
+    recipe_ids: np.ndarray  # (days, meals)
+    totals: np.ndarray      # (days, len(SCORING_COLUMNS)) summed values of every day
+    scores: ScoreResult     # one row per day, against the daily targets
+    complete: bool          # False when a time budget cut a day's search short
+
+    @property
+    def average_score(self):
+        return float(self.scores.final_score.mean())
+
+    @property
+    def climate_total(self):
+        return float(self.totals[:, CLIMATE].sum())
+
+
+class WeekPlanner:
+    """
+    Weekly plans for one profile, one day at a time with the beam search of scoring.planner, under
+      - repeat_gap:        a recipe is not planned again within repeat_gap days
+      - max_cuisine_share: share of the meals of the week one cuisine may fill (needs attributes)
+      - climate_budget:    Climate Change total (kg CO2 eq) of the week, by default the daily
+                           threshold of the profile times the number of days; a soft limit, see
+                           budget_feasible
+    The candidate pool and its value vectors are built once per planner, so swapping a meal only
+    searches the affected day against the fixed rest of the week.
+    """
+
+    def __init__(self, catalogue, profile, attributes=None, days=DAYS, meals=None, repeat_gap=REPEAT_GAP,
+                 max_cuisine_share=MAX_CUISINE_SHARE, climate_budget=None, pool_size=WEEK_POOL_SIZE,
+                 beam_width=WEEK_BEAM_WIDTH, time_budget=WEEK_TIME_BUDGET):
+        self.catalogue = catalogue
+        self.profile = as_profile(profile)
+        self.days = days
+        self.meals = meals or self.profile.meals
+        self.repeat_gap = repeat_gap
+        self.beam_width = beam_width
+        self.time_budget = time_budget
+
+        # The best recipes of every cuisine join the pool, so the cuisine mix can be met
+        groups = attributes.cuisine if attributes is not None else None
+        self.pool = candidate_pool(catalogue, self.profile, size=pool_size, groups=groups)
+        self.positions = {int(row): i for i, row in enumerate(self.pool)}
+        self.values = catalogue.values[self.pool].astype(np.float64)
+        self.targets = per_meal_targets(self.profile.bounds, self.meals)
+        self.excluded = np.zeros(len(self.pool), dtype=bool)  # recipes swapped out by the user
+
+        self.cuisine_codes = self.cuisine_caps = None
+        if attributes is not None and max_cuisine_share < 1:
+            names, self.cuisine_codes = np.unique(attributes.cuisine[self.pool], return_inverse=True)
+            cap = max(1, math.ceil(max_cuisine_share * days * self.meals))
+            self.cuisine_caps = np.where(names == "", np.inf, cap)  # recipes without a cuisine are not capped
+
+        if climate_budget is None:
+            climate_budget = days * self.profile.bounds.upper[CLIMATE]
+        self.climate_budget = climate_budget
+        # Lowest Climate Change total any week from the pool can reach: its lowest-emission meals every day
+        climate = np.sort(self.values[:, CLIMATE][np.isfinite(self.values[:, CLIMATE])])
+        self.climate_floor = days * climate[:self.meals].sum() if len(climate) >= self.meals else np.inf
+
+    @property
+    def budget_feasible(self):
+        # An infeasible budget is still applied softly, so the plans follow nutrition instead
+        return self.climate_floor <= self.climate_budget
+
+    # ------------------------------------------------------------------------------------------------
+    def plan(self):
+        """
+        A full week, day after day; the climate budget a day leaves unused carries over to the next.
+        """
+        start = time.perf_counter()
+        week = np.full((self.days, self.meals), -1, dtype=np.int64)
+        totals = np.zeros((self.days, self.values.shape[1]))
+        complete = True
+        for day in range(self.days):
+            deadline = start + self.time_budget * (day + 1) / self.days
+            week[day], totals[day], searched = self.search(week, totals, day, deadline)
+            complete &= searched
+        return self.result(week, totals, complete)
+
+    def swap(self, plan, day, meal):
+        """
+        Replace one meal: its recipe is excluded from this planner's future plans, the other meals of
+        the day stay, and only the free slot is searched again under the constraints of the rest of
+        the week.
+        """
+        week = np.array([[self.positions[int(row)] for row in rows] for rows in plan.rows])
+        totals = plan.totals.copy()
+        self.excluded[week[day, meal]] = True
+
+        pinned = [week[day, i] for i in range(self.meals) if i != meal]
+        deadline = time.perf_counter() + self.time_budget / self.days
+        week[day] = -1
+        found, totals[day], searched = self.search(week, totals, day, deadline, pinned)
+        # The new recipe takes the place of the swapped one
+        week[day] = np.insert(np.asarray(pinned, dtype=np.int64), meal, found[-1])
+        return self.result(week, totals, searched)
+
+    # ------------------------------------------------------------------------------------------------
+    def search(self, week, totals, day, deadline, pinned=()):
+        # Constraints of one day given the days planned so far (-1 marks unplanned days)
+        planned = np.array([d for d in range(self.days) if d != day and week[d, 0] >= 0], dtype=np.int64)
+
+        allowed = ~self.excluded
+        near = planned[np.abs(planned - day) < self.repeat_gap]
+        allowed[week[near].ravel()] = False
+
+        cuisine_room = None
+        if self.cuisine_codes is not None:
+            used = np.bincount(self.cuisine_codes[week[planned].ravel()], minlength=len(self.cuisine_caps))
+            cuisine_room = self.cuisine_caps - used
+
+        # The rest of the budget, spread evenly over the days still to plan
+        remaining = self.climate_budget - np.nansum(totals[planned, CLIMATE])
+        climate_limit = remaining / (self.days - len(planned))
+
+        try:
+            return search_day(
+                self.values, self.targets, self.profile, self.meals, self.beam_width, deadline,
+                allowed, self.cuisine_codes, cuisine_room, climate_limit, pinned,
+            )
+        except ValueError:
+            if cuisine_room is None:
+                raise
+        # A catalogue dominated by one cuisine cannot always meet the mix; the day is planned without it
+        return search_day(
+            self.values, self.targets, self.profile, self.meals, self.beam_width, deadline,
+            allowed, None, None, climate_limit, pinned,
+        )
+
+    def result(self, week, totals, complete):
+        rows = self.pool[week]
+        scores = score_penalties(penalty_fractions(totals / self.meals, *self.targets), self.profile)
+        return WeekPlan(rows, self.catalogue.recipe_ids[rows], totals, scores, bool(complete))
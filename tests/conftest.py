@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from scoring import Catalogue, Profile, TargetBounds
+from scoring.metrics import HEALTH_METRICS, METRIC_RULES, METRICS, RULE_RDI, RULE_UPPER, SCORING_COLUMNS
+
+
+def synthetic_catalogue(n_recipes, seed=0):
+    # Per-serving values between 0 and 100 in every scoring column
+    rng = np.random.default_rng(seed)
+    return Catalogue(np.arange(1, n_recipes + 1), rng.uniform(0, 100, (n_recipes, len(SCORING_COLUMNS))))
+
+
+def synthetic_profile(meals, seed=0):
+    """
+    Daily targets around `meals` average recipes of synthetic_catalogue, shaped by the rule of every
+    metric, with random weights that sum to 1 within health and within environment.
+    """
+    rng = np.random.default_rng(seed)
+    lower = meals * rng.uniform(30, 50, len(METRICS))
+    upper = lower + meals * rng.uniform(10, 30, len(METRICS))
+    lower = np.where(METRIC_RULES == RULE_UPPER, -np.inf, lower)
+    upper = np.where(METRIC_RULES == RULE_RDI, lower, upper)
+
+    weights = rng.uniform(0.5, 1.5, len(METRICS))
+    n_health = len(HEALTH_METRICS)
+    weights[:n_health] /= weights[:n_health].sum()
+    weights[n_health:] /= weights[n_health:].sum()
+    return Profile(meals, TargetBounds(lower, upper), weights, 50.0, 50.0)
+
+
+@pytest.fixture
+def catalogue():
+    return synthetic_catalogue(60)
+
+
+@pytest.fixture
+def profile():
+    return synthetic_profile(meals=3)
@@ -0,0 +1,108 @@
+import os
+
+import httpx
+import numpy as np
+import pytest
+from starlette.testclient import TestClient
+
+import api.stub
+from api import create_app
+from data.data_loader import RECIPES_SOURCE, store_path
+from data.recipe_store import store_exists
+from functions import default_profile
+from scoring.metrics import ENVIRONMENT_METRICS, HEALTH_METRICS
+
+# The service loads the real recipe and ingredient stores; searches go through the Langflow client
+# to the stub flow, which answers from the local index
+pytestmark = pytest.mark.skipif(
+    not (os.path.exists(RECIPES_SOURCE) or store_exists(store_path(RECIPES_SOURCE))),
+    reason="needs the recipe dataset",
+)
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(create_app(backend="langflow", transport=httpx.ASGITransport(api.stub.app))) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def session_profile(client):
+    # A new session's profile with the targets the service computes for it
+    profile = default_profile()
+    profile.update(client.post("/targets", json=profile["General"]).json())
+    return profile
+
+
+def assert_ranked(recipes, rank_by):
+    scores = [recipe[rank_by] for recipe in recipes]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_targets(client, session_profile):
+    assert set(session_profile["Macros"]) == set(default_profile()["Macros"])
+    assert set(session_profile["Micros"]) == set(default_profile()["Micros"])
+    low, high = session_profile["Macros"]["Protein"]
+    assert 0 < low < high
+
+    response = client.post("/targets", json={"Age": 30})
+    assert response.status_code == 422
+
+
+def test_recommendations_without_a_query_rank_the_catalogue(client, session_profile):
+    for rank_by in ("final_score", "health_score", "environment_score"):
+        response = client.post("/recommendations", json={"profile": session_profile, "k": 5, "rank_by": rank_by})
+        assert response.status_code == 200
+        recipes = response.json()["recipes"]
+        assert len(recipes) == 5
+        assert_ranked(recipes, rank_by)
+
+
+def test_recommendations_with_a_query(client, session_profile):
+    response = client.post("/recommendations", json={"query": "chicken curry", "profile": session_profile, "k": 5})
+    assert response.status_code == 200
+    recipes = response.json()["recipes"]
+    assert 0 < len(recipes) <= 5
+    assert len({recipe["recipe_id"] for recipe in recipes}) == len(recipes)
+    assert_ranked(recipes, "final_score")
+
+
+def test_recommendations_reject_invalid_requests(client, session_profile):
+    for k in (0, -3):
+        response = client.post("/recommendations", json={"profile": session_profile, "k": k})
+        assert response.status_code == 422
+    assert client.post("/recommendations", json={"profile": session_profile, "rank_by": "rating"}).status_code == 422
+    assert client.post("/recommendations", json={"k": 5}).status_code == 422
+    assert client.post("/recommendations", content=b"not json").status_code == 400
+
+
+def test_meal_plan(client, session_profile):
+    response = client.post("/meal-plan", json={"profile": session_profile, "meals": 3, "time_budget": 0.2})
+    assert response.status_code == 200
+    plan = response.json()
+    assert len(plan["recipes"]) == 3
+    assert set(plan["totals"]) == set(HEALTH_METRICS + ENVIRONMENT_METRICS)
+    assert 0 <= plan["final_score"] <= 100
+
+    response = client.post("/meal-plan", json={"profile": session_profile, "meals": -1})
+    assert response.status_code == 422
+
+
+def test_recipe(client, session_profile):
+    best = client.post("/recommendations", json={"profile": session_profile, "k": 1}).json()["recipes"][0]
+    recipe_id = best["recipe_id"]
+
+    response = client.get(f"/recipes/{recipe_id}")
+    assert response.status_code == 200
+    recipe = response.json()
+    assert set(recipe["nutrition"]) == set(HEALTH_METRICS)
+    assert set(recipe["environment"]) == set(ENVIRONMENT_METRICS)
+    assert "scores" not in recipe
+
+    response = client.post(f"/recipes/{recipe_id}", json={"profile": session_profile})
+    assert response.status_code == 200
+    scores = response.json()["scores"]
+    assert np.isclose(scores["final_score"], best["final_score"])
+    assert set(scores["health_contributions"]) == set(HEALTH_METRICS)
+
+    assert client.get("/recipes/0").status_code == 404
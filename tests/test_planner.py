@@ -0,0 +1,38 @@
+import itertools
+
+import numpy as np
+
+from conftest import synthetic_catalogue, synthetic_profile
+from scoring import per_meal_targets, plan_meals, score_penalties
+from scoring.engine import penalty_fractions
+
+
+def exhaustive_best(catalogue, profile, meals):
+    # Every set of `meals` distinct recipes, scored like a plan: the day's totals against the daily targets
+    targets = per_meal_targets(profile.bounds, meals)
+    values = catalogue.values.astype(np.float64)
+    combinations = np.array(list(itertools.combinations(range(len(catalogue)), meals)))
+    totals = values[combinations].sum(axis=1)
+    scores = score_penalties(penalty_fractions(totals / meals, *targets), profile).final_score
+    best = np.argmax(scores)
+    return set(combinations[best].tolist()), scores[best]
+
+
+def test_wide_beam_finds_the_exhaustive_best():
+    # A beam wider than the number of recipe sets keeps every partial plan, so the search is exact
+    catalogue, meals = synthetic_catalogue(14, seed=1), 3
+    profile = synthetic_profile(meals, seed=1)
+
+    plan = plan_meals(catalogue, profile, pool_size=len(catalogue), beam_width=1000, time_budget=60)
+    rows, score = exhaustive_best(catalogue, profile, meals)
+    assert plan.complete
+    assert set(plan.rows.tolist()) == rows
+    assert np.isclose(plan.scores.final_score[0], score)
+
+
+def test_narrow_beam_returns_a_full_plan_of_distinct_recipes(catalogue, profile):
+    plan = plan_meals(catalogue, profile, pool_size=len(catalogue), beam_width=2, time_budget=60)
+    _, best = exhaustive_best(catalogue, profile, profile.meals)
+    assert len(set(plan.rows.tolist())) == profile.meals
+    assert np.array_equal(plan.recipe_ids, catalogue.recipe_ids[plan.rows])
+    assert plan.scores.final_score[0] <= best + 1e-9
@@ -0,0 +1,55 @@
+import numpy as np
+
+from conftest import synthetic_profile
+from scoring import WeekPlanner
+from scoring.weekly import CLIMATE
+
+
+def assert_no_repeats(plan, repeat_gap):
+    for day, rows in enumerate(plan.rows):
+        assert len(set(rows.tolist())) == len(rows)
+        for later in range(day + 1, min(day + repeat_gap, len(plan.rows))):
+            assert not set(rows.tolist()) & set(plan.rows[later].tolist()), (day, later)
+
+
+def week_planner(catalogue, **kwargs):
+    profile = synthetic_profile(meals=2)
+    return WeekPlanner(catalogue, profile, pool_size=len(catalogue), time_budget=10, **kwargs)
+
+
+def test_no_recipe_comes_back_within_the_repeat_gap(catalogue):
+    for repeat_gap in (1, 3, 7):
+        planner = week_planner(catalogue, repeat_gap=repeat_gap, climate_budget=np.inf)
+        plan = planner.plan()
+        assert plan.rows.shape == (7, 2)
+        assert_no_repeats(plan, repeat_gap)
+
+
+def test_swap_keeps_the_other_meals(catalogue):
+    planner = week_planner(catalogue, repeat_gap=3, climate_budget=np.inf)
+    plan = planner.plan()
+
+    swapped = planner.swap(plan, 3, 1)
+    changed = np.argwhere(swapped.rows != plan.rows).tolist()
+    assert changed == [[3, 1]]
+    assert_no_repeats(swapped, 3)
+    assert np.allclose(np.delete(swapped.totals, 3, axis=0), np.delete(plan.totals, 3, axis=0))
+    assert np.allclose(swapped.totals[3], catalogue.values[swapped.rows[3]].astype(np.float64).sum(axis=0))
+
+
+def test_infeasible_climate_budget_still_ranks_by_nutrition(catalogue):
+    free = week_planner(catalogue, climate_budget=np.inf)
+    infeasible = week_planner(catalogue, climate_budget=0.0)
+    assert free.budget_feasible and not infeasible.budget_feasible
+    # Every plan exceeds a zero budget by the same clipped penalty, so the plans are the same
+    assert np.array_equal(infeasible.plan().rows, free.plan().rows)
+
+
+def test_feasible_climate_budget_is_met(catalogue):
+    free = week_planner(catalogue, climate_budget=np.inf).plan()
+    budget = 0.8 * free.climate_total
+    planner = week_planner(catalogue, climate_budget=budget)
+    assert planner.budget_feasible
+    plan = planner.plan()
+    assert plan.totals[:, CLIMATE].sum() <= budget
+    assert plan.climate_total <= free.climate_total
@@ -0,0 +1,190 @@
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Upper bounds (ms) of the latency histogram buckets; slower spans land in an overflow bucket
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+RECENT_TRACES = 20
+EXPORT_INTERVAL = 30.0  # seconds between automatic metric file exports
+
+current_trace = contextvars.ContextVar("current_trace", default=None)
+current_depth = contextvars.ContextVar("current_depth", default=0)
+
+
+# ----------------------------------------------------------------------------------------------------
+# Histograms
+# ----------------------------------------------------------------------------------------------------
+class Histogram:
+    """
+    Fixed-bucket latency histogram; quantiles are estimated as the upper bound of their bucket.
+    """
+
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, self.max), 3)
+        return round(self.max, 3)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else None,
+            "min_ms": round(self.min, 3) if self.count else None,
+            "max_ms": round(self.max, 3),
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "buckets": {str(bound): count for bound, count in zip(self.bounds + ("inf",), self.counts)},
+        }
+
+
+# ----------------------------------------------------------------------------------------------------
+# Spans
+# ----------------------------------------------------------------------------------------------------
+class Trace:
+    # The spans of one script run, in the order they finished: (name, depth, duration_ms)
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.last = self.start  # when the latest span finished
+        self.spans = []
+        self.duration_ms = None
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "started": self.started,
+            "duration_ms": self.duration_ms,
+            "spans": [{"name": name, "depth": depth, "ms": round(ms, 3)} for name, depth, ms in self.spans],
+        }
+
+
+class Span:
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.depth = current_depth.get()
+        self.token = current_depth.set(self.depth + 1)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ms = (time.perf_counter() - self.start) * 1000
+        current_depth.reset(self.token)
+        self.tracer.record(self.name, ms)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.spans.append((self.name, self.depth, ms))
+            trace.last = time.perf_counter()
+        return False
+
+
+class NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Tracer:
+    """
+    In-process tracing: spans feed one latency histogram per name, and the spans of a script run are
+    kept as a trace. When disabled, span() hands out a shared no-op context manager.
+    """
+
+    def __init__(self, enabled=False, export_path=None, export_interval=EXPORT_INTERVAL):
+        self.enabled = enabled
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.traces = deque(maxlen=RECENT_TRACES)
+        self.last_export = 0.0
+
+    def span(self, name):
+        return Span(self, name) if self.enabled else NOOP_SPAN
+
+    def record(self, name, ms):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(ms)
+
+    def start_trace(self, name):
+        if not self.enabled:
+            return None
+        trace = Trace(name)
+        current_trace.set(trace)
+        return trace
+
+    def finish_trace(self, trace, end=None):
+        # `end` defaults to now; a run that was cut short is finished at trace.last instead
+        if trace is None:
+            return
+        trace.duration_ms = round(((time.perf_counter() if end is None else end) - trace.start) * 1000, 3)
+        current_trace.set(None)
+        self.record(trace.name, trace.duration_ms)
+        with self.lock:
+            self.traces.append(trace)
+        self.maybe_export()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "exported": time.time(),
+                "spans": {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+                "recent_traces": [trace.to_dict() for trace in self.traces],
+            }
+
+    def export(self, path=None):
+        # Written to a temporary file first so readers never see a half-written file
+        path = path or self.export_path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as handle:
+            json.dump(self.snapshot(), handle, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def maybe_export(self):
+        if not self.export_path or time.monotonic() - self.last_export < self.export_interval:
+            return
+        self.last_export = time.monotonic()
+        self.export()
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.traces.clear()